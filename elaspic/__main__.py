@@ -4,7 +4,9 @@ import logging.config
 
 from elaspic.cli.elaspic_run import configure_run_parser
 from elaspic.cli.elaspic_train import configure_train_parser
+from elaspic.cli.elaspic_score import configure_score_parser
 from elaspic.cli.elaspic_database import configure_database_parser
+from elaspic.cli.elaspic_scan import configure_scan_parser
 
 
 logger = logging.getLogger(__name__)
@@ -33,6 +35,8 @@ def main():
     configure_run_parser(sub_parsers)
     configure_database_parser(sub_parsers)
     configure_train_parser(sub_parsers)
+    configure_score_parser(sub_parsers)
+    configure_scan_parser(sub_parsers)
     args = parser.parse_args()
     # default_format = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
     # default_format = '%(message)s'
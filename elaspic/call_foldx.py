@@ -80,6 +80,8 @@ class FoldX(object):
         .. _FoldX manual: http://foldx.crg.es/manual3.jsp
         """
         logger.debug('Running FoldX {}'.format(whatToRun))
+        if whatToRun == 'RepairPDB':
+            return self.__repair_pdb()
         self.__write_runfile(self.pdb_filename, self.chain_id, whatToRun, mutCodes)
         self.__run_runfile()
         if whatToRun == 'AnalyseComplex':
@@ -88,27 +90,78 @@ class FoldX(object):
         elif whatToRun == 'Stability':
             return self.__read_result(
                 op.join(self.foldx_dir, 'Stability.txt'), whatToRun)
-        elif whatToRun == 'RepairPDB':
-            return op.join(self.foldx_dir, 'RepairPDB_' + self.pdb_filename)
         elif whatToRun == 'BuildModel':
-            # see the FoldX manual for the naming of the generated structures
+            return self.build_models([mutCodes])[0]
+
+    def build_models(self, mutant_list):
+        """Introduce every mutant in `mutant_list` using a single FoldX `BuildModel` run.
+
+        Parameters
+        ----------
+        mutant_list : list
+            List of mutants, each of which is a list of FoldX mutation codes
+            (e.g. ``[['MA1A'], ['MA1C']]``).
+
+        Returns
+        -------
+        list
+            ``[wildtype, mutants]`` lists of structures for every mutant in `mutant_list`.
+        """
+        logger.debug('Running FoldX BuildModel for {} mutants'.format(len(mutant_list)))
+        self.__write_runfile(self.pdb_filename, self.chain_id, 'BuildModel', mutant_list)
+        self.__run_runfile()
+        # see the FoldX manual for the naming of the generated structures
+        results = []
+        for mutant_idx in range(1, len(mutant_list) + 1):
             if conf.CONFIGS['foldx_num_of_runs'] == 1:
-                mutants = [op.join(self.foldx_dir, self.pdb_filename[:-4] + '_1.pdb'), ]
-                wiltype = [op.join(self.foldx_dir, 'WT_' + self.pdb_filename[:-4] + '_1.pdb'), ]
-                results = [wiltype, mutants]
+                suffixes = ['_{}'.format(mutant_idx)]
             else:
-                mutants = [
-                    op.join(self.foldx_dir, self.pdb_filename[:-4] + '_1_' + str(x) + '.pdb')
-                    for x in range(0, conf.CONFIGS['foldx_num_of_runs'])
-                ]
-                wiltype = [
-                    op.join(
-                        self.foldx_dir,
-                        'WT_' + self.pdb_filename[:-4] + '_1_' + str(x) + '.pdb')
+                suffixes = [
+                    '_{}_{}'.format(mutant_idx, x)
                     for x in range(0, conf.CONFIGS['foldx_num_of_runs'])
                 ]
-                results = [wiltype, mutants]
-            return results
+            mutants = [
+                op.join(self.foldx_dir, self.pdb_filename[:-4] + suffix + '.pdb')
+                for suffix in suffixes
+            ]
+            wiltype = [
+                op.join(self.foldx_dir, 'WT_' + self.pdb_filename[:-4] + suffix + '.pdb')
+                for suffix in suffixes
+            ]
+            results.append([wiltype, mutants])
+        return results
+
+    def __repair_pdb(self):
+        """Run FoldX `RepairPDB`, reusing previous results for identical structures.
+
+        Repaired structures are stored in the `foldx_repair_cache_dir` folder, keyed by the hash
+        of the input structure, the FoldX options that affect the repair, and the FoldX version.
+        """
+        repaired_pdb_filename = 'RepairPDB_' + self.pdb_filename
+        repaired_pdb_file = op.join(self.foldx_dir, repaired_pdb_filename)
+
+        cache_dir = conf.CONFIGS.get('foldx_repair_cache_dir')
+        if not cache_dir:
+            self.__write_runfile(self.pdb_filename, self.chain_id, 'RepairPDB', [])
+            self.__run_runfile()
+            return repaired_pdb_file
+
+        cache = helper.FileCache(
+            cache_dir, max_size=conf.CONFIGS['foldx_repair_cache_size'] * 1024 ** 2)
+        key = helper.get_hash(
+            op.join(self.foldx_dir, self.pdb_filename),
+            water=conf.CONFIGS['foldx_water'],
+            numberOfRuns=conf.CONFIGS['foldx_num_of_runs'],
+            foldx_version=helper.get_version('foldx'))
+        if cache.copy(key, 'repaired.pdb', repaired_pdb_file):
+            logger.debug('Using cached FoldX RepairPDB results: {}'.format(key))
+            return repaired_pdb_file
+
+        self.__write_runfile(self.pdb_filename, self.chain_id, 'RepairPDB', [])
+        self.__run_runfile()
+        if op.isfile(repaired_pdb_file):
+            cache.put(key, {'repaired.pdb': repaired_pdb_file})
+        return repaired_pdb_file
 
     def __write_runfile(self, pdbFile, chainID, whatToRun, mutCodes):
         if whatToRun == 'AnalyseComplex':
@@ -128,8 +181,9 @@ class FoldX(object):
             copy_filename = 'run-build.txt'
             # file_with_mutations = 'mutant_file.txt'
             file_with_mutations = 'individual_list.txt'
+            # One line per mutant
             with open(op.join(self.foldx_dir, file_with_mutations), 'w') as fh:
-                fh.writelines(','.join(mutCodes) + ';\n')
+                fh.writelines(','.join(mutant) + ';\n' for mutant in mutCodes)
             command_line = '<BuildModel>BuildModel,{file_with_mutations};'\
                 .format(file_with_mutations=file_with_mutations)
             output_pdb = 'true'
@@ -176,7 +230,8 @@ class FoldX(object):
         import faketime.config
 
         # system_command = './FoldX.linux64 -runfile ' + self.foldx_runfile
-        system_command = "foldx -runfile '{}'".format(self.foldx_runfile)
+        system_command = "{} -runfile '{}'".format(
+            helper.get_executable('foldx'), self.foldx_runfile)
         logger.debug("FoldX system command: '{}'".format(system_command))
         env = os.environ.copy()
         env['LD_PRELOAD'] = faketime.config.libfaketime_so_file
@@ -51,7 +51,8 @@ class TCoffee(object):
             conf.CONFIGS['tcoffee_dir'], pdb_id + '.pdb')
 
         system_command = (
-            "t_coffee -other_pg extract_from_pdb {} > {}".format(pdb_file, pdb_file_new)
+            "{} -other_pg extract_from_pdb {} > {}"
+            .format(helper.get_executable('t_coffee'), pdb_file, pdb_file_new)
         )
         p = helper.run(system_command, cwd=conf.CONFIGS['tcoffee_dir'])
         if p.returncode != 0:
@@ -134,7 +135,7 @@ class TCoffee(object):
         pdb_db = op.join(conf.CONFIGS['blast_db_dir'], 'pdbaa')
         if mode == '3dcoffee':
             system_command = (
-                "t_coffee " +
+                helper.get_executable('t_coffee') +
                 " -seq " + alignment_fasta_file +
                 " -method=sap_pair,mustang_pair,TMalign_pair " +
                 " -blast_server=LOCAL " +
@@ -152,7 +153,7 @@ class TCoffee(object):
             )
         if mode == 'expresso':
             system_command = (
-                't_coffee' +
+                helper.get_executable('t_coffee') +
                 ' -mode expresso' +
                 ' -method sap_pair' +
                 ' -seq ' + alignment_fasta_file +
@@ -169,7 +170,7 @@ class TCoffee(object):
             )
         if mode == 't_coffee':
             system_command = (
-                't_coffee' +
+                helper.get_executable('t_coffee') +
                 ' -mode expresso' +
                 ' -method clustalw_pair,slow_pair' +
                 ' -seq ' + alignment_fasta_file +
@@ -185,7 +186,7 @@ class TCoffee(object):
             )
         if mode == 'quick':
             system_command = (
-                't_coffee' +
+                helper.get_executable('t_coffee') +
                 ' -mode quickaln' +
                 ' -method clustalw_pair,slow_pair' +
                 ' -seq ' + alignment_fasta_file +
@@ -0,0 +1,120 @@
+"""ELASPIC SCAN
+"""
+import os
+import os.path as op
+import logging
+import argparse
+
+from elaspic import conf
+
+
+logger = logging.getLogger(__name__)
+
+
+def parse_positions(positions):
+    """Parse a list of positions and position ranges (e.g. '10-50,60').
+
+    Returns
+    -------
+    list
+        Sorted positions, without duplicates.
+    """
+    if not positions:
+        return None
+    positions_out = set()
+    for position_range in positions.split(','):
+        if not position_range:
+            continue
+        start, _, end = position_range.partition('-')
+        positions_out.update(range(int(start), int(end or start) + 1))
+    return sorted(positions_out)
+
+
+def elaspic_scan(args):
+    """Predict the ddG of every substitution of every residue in the structure."""
+    if args.config_file and not os.path.isfile(args.config_file):
+        raise Exception('The configuration file {} does not exist!'.format(args.config_file))
+
+    # Read configurations
+    if args.config_file is not None:
+        conf.read_configuration_file(args.config_file)
+    else:
+        unique_temp_dir = op.abspath(op.join(os.getcwd(), '.elaspic'))
+        os.makedirs(unique_temp_dir, exist_ok=True)
+        conf.read_configuration_file(
+            DEFAULT={
+                'unique_temp_dir': unique_temp_dir
+            },
+            EXTERNAL_DIRS={
+                'pdb_dir': args.pdb_dir,
+                'blast_db_dir': args.blast_db_dir,
+                'archive_dir': None,
+            })
+
+    from elaspic import standalone_pipeline
+    pipeline = standalone_pipeline.StandalonePipeline(
+        args.structure_file, args.sequence_file,
+        run_type='model',
+        n_jobs=args.jobs,
+    )
+    pipeline.run_scan(
+        chain_ids=args.chain_ids.split(',') if args.chain_ids else None,
+        positions=parse_positions(args.positions),
+        output_dir=args.output_dir or os.getcwd(),
+    )
+
+
+def configure_scan_parser(sub_parsers):
+    help = "Predict the ddG of all substitutions of every residue (saturation mutagenesis)"
+    description = help + """
+
+Each mutated chain is aligned by PROVEAN only once, and all substitutions of the same residue
+are introduced by FoldX together. A position × amino acid matrix of predicted ddG values
+is saved for the core of every chain ('scan_{chain}.tsv') and for every interface
+of that chain ('scan_{chain}_{chains}.tsv').
+"""
+    example = r"""
+Examples
+--------
+$ elaspic scan -p 4DKL.pdb
+
+$ elaspic scan -p 4DKL.pdb --chain_ids A --positions 10-50,60 -o scan_results -j 4
+"""
+    parser = sub_parsers.add_parser(
+        'scan',
+        help=help,
+        description=description,
+        epilog=example,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '-p', '--structure_file', required=True,
+        help="Full filename (including path) of the PDB file that you wish to mutate.")
+    parser.add_argument(
+        '-s', '--sequence_file',
+        help="Full filename (including path) of the FASTA file containing the sequence that you "
+             "wish to model, using the PDB file as a template.")
+    parser.add_argument(
+        '-c', '--config_file', nargs='?', type=str,
+        help='ELASPIC configuration file.')
+    parser.add_argument(
+        '--pdb_dir', nargs='?', type=str,
+        help=("Folder containing PDB files in split format (e.g. 'ab/pdb1ab2.ent.gz')."))
+    parser.add_argument(
+        '--blast_db_dir', nargs='?', type=str,
+        help=("Folder containing NCBI `nr` and `pdbaa` databases."))
+    parser.add_argument(
+        '--chain_ids',
+        help="Comma-separated list of the chains that should be mutated (e.g. 'A,B'). "
+             "Defaults to all protein chains.")
+    parser.add_argument(
+        '--positions',
+        help="Positions that should be mutated, in sequence coordinates (e.g. '10-50,60'). "
+             "Defaults to all positions.")
+    parser.add_argument(
+        '-o', '--output_dir',
+        help="Folder in which to save the ddG matrices. Defaults to the current folder.")
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=1,
+        help="Number of models to build in parallel.")
+    parser.set_defaults(func=elaspic_scan)
@@ -0,0 +1,57 @@
+"""ELASPIC SCORE
+"""
+import logging
+import argparse
+import pandas as pd
+from elaspic import elaspic_predictor
+
+
+logger = logging.getLogger(__name__)
+
+
+def elaspic_score(args):
+    """Predict the ddG of mutations with precomputed features."""
+    input_chunks = pd.read_csv(
+        args.input_file, sep='\t', chunksize=args.chunksize, low_memory=False)
+    for i, df in enumerate(input_chunks):
+        logger.info('Scoring mutations {}-{}...'.format(
+            i * args.chunksize, i * args.chunksize + len(df)))
+        df['ddg'] = elaspic_predictor.score_features(df, args.core_or_interface)
+        df.to_csv(args.output_file, sep='\t', index=False, mode='w' if i == 0 else 'a',
+                  header=(i == 0))
+
+
+def configure_score_parser(sub_parsers):
+    help = "Predict the ddG of mutations with precomputed features"
+    description = help + """
+"""
+    example = r"""
+Examples
+--------
+$ elaspic score -i uniprot_domain_mutation.tsv -o uniprot_domain_mutation_ddg.tsv -t core
+
+$ elaspic score -i uniprot_domain_pair_mutation.tsv -o uniprot_domain_pair_mutation_ddg.tsv \
+    -t interface
+"""
+    parser = sub_parsers.add_parser(
+        'score',
+        help=help,
+        description=description,
+        epilog=example,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '-i', '--input_file', required=True,
+        help="Tab-separated file containing rows from the 'uniprot_domain_mutation' or "
+             "the 'uniprot_domain_pair_mutation' table (or any table with the same columns).")
+    parser.add_argument(
+        '-o', '--output_file', required=True,
+        help="Tab-separated file where the input rows, together with a 'ddg' column, "
+             "should be saved.")
+    parser.add_argument(
+        '-t', '--core_or_interface', choices=['core', 'interface'], required=True,
+        help="Whether to use the core or the interface classifier.")
+    parser.add_argument(
+        '--chunksize', type=int, default=100000,
+        help="Number of mutations to read and score at a time.")
+    parser.set_defaults(func=elaspic_score)
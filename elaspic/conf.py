@@ -75,6 +75,8 @@ def read_default_configs(config):
         _parse_look_for_interactions(CONFIGS['look_for_interactions'])
     )
     CONFIGS['temp_dir'] = get_temp_dir('elaspic')
+    # Paths and versions of external programs are shared by all jobs
+    helper.TOOLS.cache_dir = CONFIGS['temp_dir']
 
     # Temporary directories
     CONFIGS['unique_temp_dir'] = config.get(
@@ -99,6 +101,11 @@ def read_sequence_configs(config):
     CONFIGS['blast_db_dir_fallback'] = (
         config.get('blast_db_dir_fallback', fallback=''))
     _validate_blast_db_dir(CONFIGS)
+    CONFIGS['provean_supset_cache_dir'] = config.get(
+        'provean_supset_cache_dir',
+        fallback=op.join(CONFIGS['temp_dir'], 'provean_supset_cache')
+    )
+    CONFIGS['provean_supset_cache_size'] = config.getint('provean_supset_cache_size', 10240)
 
     CONFIGS['archive_dir'] = config.get('archive_dir')
     # Supported archive types are 'directory' and '7zip'
@@ -191,6 +198,22 @@ def read_model_configs(config):
     # FoldX
     CONFIGS['foldx_water'] = config.get('foldx_water', '-IGNORE')
     CONFIGS['foldx_num_of_runs'] = config.getint('foldx_num_of_runs', 1)
+    CONFIGS['foldx_repair_cache_dir'] = config.get(
+        'foldx_repair_cache_dir',
+        fallback=op.join(CONFIGS['temp_dir'], 'foldx_repair_cache')
+    )
+    CONFIGS['foldx_repair_cache_size'] = config.getint('foldx_repair_cache_size', 1024)
+    # Structure extraction
+    CONFIGS['structure_cache_dir'] = config.get(
+        'structure_cache_dir',
+        fallback=op.join(CONFIGS['temp_dir'], 'structure_cache')
+    )
+    CONFIGS['structure_cache_size'] = config.getint('structure_cache_size', 1024)
+    # Structure analysis
+    CONFIGS['sasa_method'] = config.get('sasa_method', 'shrake_rupley')
+    CONFIGS['interface_area_method'] = config.get('interface_area_method', 'shrake_rupley')
+    CONFIGS['secondary_structure_method'] = config.get('secondary_structure_method', 'dssp')
+
     CONFIGS['matrix_type'] = config.get('matrix_type', 'blosum80')
     CONFIGS['gap_start'] = config.getint('gap_start', -16)
     CONFIGS['gap_extend'] = config.getint('gap_extend', -4)
@@ -13,7 +13,7 @@ import numpy as np
 
 
 from elaspic import (
-    CACHE_DIR, conf, errors, structure_tools, elaspic_sequence, elaspic_model,
+    conf, errors, structure_tools, elaspic_sequence, elaspic_model,
     elaspic_predictor, elaspic_database, elaspic_database_tables
 )
 from elaspic.pipeline import Pipeline, execute_and_remember
@@ -25,13 +25,21 @@ class DatabasePipeline(Pipeline):
 
     def __init__(
             self, uniprot_id, mutations, configurations=None,
-            run_type='5', number_of_tries=[], uniprot_domain_pair_ids=[]):
+            run_type='5', number_of_tries=[], uniprot_domain_pair_ids=[],
+            db=None, uniprot_domains=None, uniprot_domain_pairs=None):
         """Run the main function of the program and parse errors.
 
         Parameters
         ----------
         uniprot_domain_pair_ids : list of integers
             List of uniprot_domain_pair_ids specifying which uniprot domain pairs to analyse.
+        db : elaspic_database.MyDatabase, optional
+            Database shared with other pipelines (see :func:`run_batch`).
+        uniprot_domains : list, optional
+            Prefetched domains of `uniprot_id` (see :meth:`MyDatabase.get_uniprot_domains`).
+        uniprot_domain_pairs : list, optional
+            Prefetched domain pairs of `uniprot_id`
+            (see :meth:`MyDatabase.get_uniprot_domain_pairs`).
         run_type : str
             1 / sequence: Calculate provean supporting set.
             2 / model: Calculate all homology models.
@@ -68,11 +76,14 @@ class DatabasePipeline(Pipeline):
         os.chdir(conf.CONFIGS['unique_temp_dir'])
 
         # Initialise the sql database for accessing all information
-        self.db = elaspic_database.MyDatabase()
+        self.db = db if db is not None else elaspic_database.MyDatabase()
 
         # Obtain all domains and interactions for a given uniprot
         logger.info('Obtaining protein domain information...')
-        self.uniprot_domains = self.db.get_uniprot_domain(self.uniprot_id, True)
+        if uniprot_domains is None:
+            uniprot_domains = self.db.get_uniprot_domain(self.uniprot_id, True)
+        self.uniprot_domains = uniprot_domains
+        self.uniprot_domain_pairs = uniprot_domain_pairs
         self._update_path_to_data(self.uniprot_domains)
         logger.info("Found {} domains.".format(len(self.uniprot_domains)))
 
@@ -107,10 +118,13 @@ class DatabasePipeline(Pipeline):
         if conf.CONFIGS['look_for_interactions']:
             logger.info('\n\n\n' + '*' * 110)
             logger.info('Obtaining protein domain pair information...')
-            self.uniprot_domain_pairs = self.db.get_uniprot_domain_pair(
-                self.uniprot_id, True, self.uniprot_domain_pair_ids)
+            if self.uniprot_domain_pairs is None:
+                self.uniprot_domain_pairs = self.db.get_uniprot_domain_pair(
+                    self.uniprot_id, True, self.uniprot_domain_pair_ids)
             self._update_path_to_data(self.uniprot_domain_pairs)
             logger.info("Found {} interfaces.".format(len(self.uniprot_domain_pairs)))
+        else:
+            self.uniprot_domain_pairs = []
 
         # Make models
         if self.run_type in ['2', '4', '5', '6', 'model']:
@@ -127,6 +141,7 @@ class DatabasePipeline(Pipeline):
         if self.run_type in ['3', '4', '5', 'mutation'] and self.mutations:
             logger.info('\n\n\n' + '*' * 110)
             logger.info("Analyzing mutations...")
+            self._mutate_sequences(self.uniprot_domains + self.uniprot_domain_pairs)
             for d in self.uniprot_domains + self.uniprot_domain_pairs:
                 for mutation in self.mutations:
                     self.get_mutation_score(d, mutation)
@@ -147,19 +162,95 @@ class DatabasePipeline(Pipeline):
     def get_mutation_score(self, d, mutation):
         logger.debug('-' * 80)
         logger.debug('get_mutation_score({}, {})'.format(d, mutation))
+        sequence = self._get_domain_sequence(d)
+        model = self.get_model(d)
+        return PrepareMutation(d, mutation, self.uniprot_id, sequence, model, self.db)
+
+    def _get_domain_sequence(self, d):
+        """Return the sequence of `self.uniprot_id` in domain or domain pair `d`."""
         if isinstance(d, elaspic_database_tables.UniprotDomain):
-            sequence = self.get_sequence(d)
+            return self.get_sequence(d)
         elif isinstance(d, elaspic_database_tables.UniprotDomainPair):
             if self.uniprot_id == d.uniprot_domain_1.uniprot_id:
-                sequence = self.get_sequence(d.uniprot_domain_1)
+                return self.get_sequence(d.uniprot_domain_1)
             elif self.uniprot_id == d.uniprot_domain_2.uniprot_id:
-                sequence = self.get_sequence(d.uniprot_domain_2)
+                return self.get_sequence(d.uniprot_domain_2)
             else:
                 raise Exception()
         else:
             raise Exception()
-        model = self.get_model(d)
-        return PrepareMutation(d, mutation, self.uniprot_id, sequence, model, self.db)
+
+    def _mutate_sequences(self, domains):
+        """Evaluate the sequence features of all mutations using one PROVEAN run per sequence.
+
+        Mutations that have a precalculated PROVEAN score, or which do not match the
+        sequence, are left for :class:`_PrepareMutation` to handle.
+        """
+        mutation_prototype = re.compile("^[A-z][0-9]+[A-z]$")
+        sequence_results = {}
+        for d in domains:
+            sequence = self._get_domain_sequence(d)
+            if sequence is None:
+                continue
+            # Different domains of the same protein share the PROVEAN scores
+            mutation_results = sequence_results.setdefault(sequence.sequence, {})
+            sequence.mutations.update(mutation_results)
+            mutations = []
+            for mutation in self.mutations:
+                if (not mutation_prototype.match(mutation) or
+                        not 0 < int(mutation[1:-1]) <= len(sequence.sequence) or
+                        sequence.sequence[int(mutation[1:-1]) - 1] != mutation[0]):
+                    continue
+                precalculated_mutation = self.db.get_uniprot_mutation(
+                    d, mutation, self.uniprot_id, True)
+                if precalculated_mutation and precalculated_mutation.provean_score:
+                    continue
+                mutations.append(mutation)
+            if mutations:
+                sequence.mutate_many(mutations)
+            mutation_results.update(sequence.mutations)
+
+
+def run_batch(uniprot_mutations, run_type='5', uniprot_domain_pair_ids=[]):
+    """Run :class:`DatabasePipeline` for many proteins.
+
+    Domains and domain pairs of all proteins are fetched using a few ``IN (...)`` queries,
+    and the pipelines share a single database engine and connection pool.
+    Precalculated data is copied from the archive one protein at a time, and a protein
+    that fails is logged and skipped, so that it does not abort the whole batch.
+
+    Parameters
+    ----------
+    uniprot_mutations : dict
+        Maps each uniprot id to a list of mutations.
+    """
+    db = elaspic_database.MyDatabase()
+    uniprot_ids = list(uniprot_mutations)
+    logger.info('Obtaining protein domain information for {} proteins...'.format(
+        len(uniprot_ids)))
+    uniprot_domains = db.get_uniprot_domains(uniprot_ids, False)
+    if conf.CONFIGS['look_for_interactions']:
+        uniprot_domain_pairs = db.get_uniprot_domain_pairs(
+            uniprot_ids, False, uniprot_domain_pair_ids)
+    else:
+        uniprot_domain_pairs = {uniprot_id: [] for uniprot_id in uniprot_ids}
+    copied_uniprot_domain_pair_ids = set()
+    for uniprot_id, mutations in uniprot_mutations.items():
+        try:
+            db.copy_uniprot_domain_data(uniprot_domains[uniprot_id])
+            db.copy_uniprot_domain_pair_data(
+                uniprot_id, uniprot_domain_pairs[uniprot_id], copied_uniprot_domain_pair_ids)
+            pipeline = DatabasePipeline(
+                uniprot_id, mutations,
+                run_type=run_type,
+                uniprot_domain_pair_ids=uniprot_domain_pair_ids,
+                db=db,
+                uniprot_domains=uniprot_domains[uniprot_id],
+                uniprot_domain_pairs=uniprot_domain_pairs[uniprot_id],
+            )
+            pipeline.run()
+        except Exception:
+            logger.exception('Failed to run the pipeline for protein {}!'.format(uniprot_id))
 
 
 class _PrepareSequence:
@@ -604,7 +695,10 @@ class _PrepareModel:
         pdb_file = structure_tools.get_pdb_file(pdb_id, conf.CONFIGS['pdb_dir'], 'ent')
         if not op.isfile(pdb_file) and conf.CONFIGS['allow_internet']:
             pdb_file = structure_tools.download_pdb_file(pdb_id, conf.CONFIGS['pdb_dir'])
-        sp = structure_tools.StructureParser(pdb_file, pdb_chains, pdb_domain_defs)
+        sp = structure_tools.StructureParser(
+            pdb_file, pdb_chains, pdb_domain_defs,
+            cache_dir=conf.CONFIGS['structure_cache_dir'],
+            cache_size=conf.CONFIGS['structure_cache_size'] * 1024 ** 2)
         sp.extract()
         sp.save_structure(conf.CONFIGS['unique_temp_dir'])
         sp.save_sequences(conf.CONFIGS['unique_temp_dir'])
@@ -792,13 +886,14 @@ class _PrepareMutation:
 
         # Machine learning
         if isinstance(d, elaspic_database_tables.UniprotDomain):
-            pred = elaspic_predictor.CorePredictor()
+            core_or_interface = 'core'
         else:
-            pred = elaspic_predictor.InterfacePredictor()
-        pred.load(CACHE_DIR)
+            core_or_interface = 'interface'
         row_idx = 0
         df = self.get_mutation_features(d, self.mut, row_idx=row_idx)
-        self.mut.ddg = pred.score(df)[0]
+        feature_df = elaspic_predictor.format_mutation_features(df)
+        feature_df = elaspic_predictor.convert_features_to_differences(feature_df)
+        self.mut.ddg = elaspic_predictor.predict_batch(feature_df, core_or_interface)[0]
         logger.debug('Predicted ddg: {}'.format(self.mut.ddg))
         df.loc[row_idx, 'ddg'] = self.mut.ddg
         # df.to_json()  # this seems to cause segfaults!?
@@ -5,6 +5,7 @@ import datetime
 import six
 import logging
 import shutil
+from collections import OrderedDict
 from contextlib import contextmanager
 import pandas as pd
 import sqlalchemy as sa
@@ -12,13 +13,22 @@ from kmtools.db_tools import parse_connection_string, make_connection_string
 from . import helper, errors, conf
 from .elaspic_database_tables import (
     Base,
-    UniprotDomain, UniprotDomainModel, UniprotDomainMutation,
-    UniprotDomainPair, UniprotDomainPairModel,
+    UniprotDomain, UniprotDomainTemplate, UniprotDomainModel, UniprotDomainMutation,
+    UniprotDomainPair, UniprotDomainPairTemplate, UniprotDomainPairModel,
     UniprotDomainPairMutation,
 )
 
 logger = logging.getLogger(__name__)
 
+# Engines are shared by all `MyDatabase` instances created in the same process
+_ENGINES = {}
+
+
+def _get_chunks(values, chunk_size=500):
+    """Split `values` into lists that fit inside an ``IN (...)`` clause."""
+    for i in range(0, len(values), chunk_size):
+        yield values[i:i + chunk_size]
+
 
 def enable_sqlite_foreign_key_checks(engine):
     from sqlalchemy import event
@@ -59,7 +69,14 @@ class MyDatabase(object):
         )
 
     def get_engine(self, echo=False):
-        """Get an SQLAlchemy engine that can be used to connect to the database."""
+        """Get an SQLAlchemy engine that can be used to connect to the database.
+
+        The engine (and its connection pool) is reused by subsequent calls with the same
+        connection string.
+        """
+        key = (conf.CONFIGS['connection_string'], echo)
+        if key in _ENGINES:
+            return _ENGINES[key]
         sa_opts = {
             'echo': echo,
             'pool_size': 1,
@@ -77,6 +94,7 @@ class MyDatabase(object):
         if conf.CONFIGS['db_type'] == 'sqlite':
             enable_sqlite_foreign_key_checks(engine)
         logger.info("Opened database connection using engine: '{}'".format(engine))
+        _ENGINES[key] = engine
         return engine
 
     def configure_session(self):
@@ -297,127 +315,175 @@ class MyDatabase(object):
                     .all())
             return row_instances
 
-    @helper.retry_database
     def get_uniprot_domain(self, uniprot_id, copy_data=False):
         """
         """
+        return self.get_uniprot_domains([uniprot_id], copy_data)[uniprot_id]
+
+    @helper.retry_database
+    def get_uniprot_domains(self, uniprot_ids, copy_data=False):
+        """Get the domains of many proteins using a few ``IN (...)`` queries.
+
+        Returns
+        -------
+        uniprot_domains : OrderedDict
+            Maps every uniprot id in `uniprot_ids` to a list of its domains that have
+            a structural template.
+        """
+        uniprot_ids = list(OrderedDict.fromkeys(uniprot_ids))
+        uniprot_domains = OrderedDict((uniprot_id, []) for uniprot_id in uniprot_ids)
         with self.session_scope() as session:
-            uniprot_domains = (
-                session
-                .query(UniprotDomain)
-                .filter(UniprotDomain.uniprot_id == uniprot_id)
-                # .options(sa.orm.joinedload('template').joinedload('model'))
-                # .options(sa.orm.joinedload('template', innerjoin=True))
-                .limit(100)
-                .all()
-            )
+            for uniprot_ids_chunk in _get_chunks(uniprot_ids):
+                query = (
+                    session
+                    .query(UniprotDomain)
+                    .filter(UniprotDomain.uniprot_id.in_(uniprot_ids_chunk))
+                    .options(
+                        sa.orm.joinedload(UniprotDomain.template)
+                        .joinedload(UniprotDomainTemplate.model))
+                )
+                for d in query:
+                    uniprot_domains[d.uniprot_id].append(d)
 
+        for uniprot_id in uniprot_ids:
+            uniprot_domains[uniprot_id] = [
+                d for d in uniprot_domains[uniprot_id] if self._has_template(d)]
+            if copy_data:
+                self.copy_uniprot_domain_data(uniprot_domains[uniprot_id])
+
+        return uniprot_domains
+
+    def copy_uniprot_domain_data(self, uniprot_domains):
+        """Copy precalculated Provean data and homology models of `uniprot_domains`.
+
+        Data that cannot be copied is marked as missing, so that it is calculated again.
+        """
         archive_dir = conf.CONFIGS['archive_dir']
         archive_type = conf.CONFIGS['archive_type']
-        d_idx = 0
-        while d_idx < len(uniprot_domains):
-            d = uniprot_domains[d_idx]
-            if not d.template:
-                logger.debug(
-                    'Skipping uniprot domain with id {} because it does not '
-                    'have a structural template...'
-                    .format(d.uniprot_domain_id))
-                del uniprot_domains[d_idx]
-                continue
+        for d in uniprot_domains:
             # Copy precalculated Provean data
-            if copy_data:
-                try:
-                    self._copy_provean(
-                        d, archive_dir, archive_type)
-                except subprocess.CalledProcessError as e:
-                    logger.error(e)
-                    logger.error('Failed to copy provean supporting set!')
-                    d.uniprot_sequence.provean.provean_supset_filename = ''
+            try:
+                self._copy_provean(
+                    d, archive_dir, archive_type)
+            except subprocess.CalledProcessError as e:
+                logger.error(e)
+                logger.error('Failed to copy provean supporting set!')
+                d.uniprot_sequence.provean.provean_supset_filename = ''
             # Copy precalculated homology models
-            if copy_data:
-                try:
-                    self._copy_uniprot_domain_data(
-                        d, d.path_to_data, archive_dir, archive_type)
-                except subprocess.CalledProcessError as e:
-                    logger.error(e)
-                    logger.error('Failed to copy the domain alignment and / or homology model!')
-                    d.template.model.alignment_filename = None
-                    d.template.model.model_filename = None
-            d_idx += 1
-
-        return uniprot_domains
+            try:
+                self._copy_uniprot_domain_data(
+                    d, d.path_to_data, archive_dir, archive_type)
+            except subprocess.CalledProcessError as e:
+                logger.error(e)
+                logger.error('Failed to copy the domain alignment and / or homology model!')
+                d.template.model.alignment_filename = None
+                d.template.model.model_filename = None
 
-    @helper.retry_database
     def get_uniprot_domain_pair(self, uniprot_id, copy_data=False, uniprot_domain_pair_ids=[]):
         """
         """
+        return self.get_uniprot_domain_pairs(
+            [uniprot_id], copy_data, uniprot_domain_pair_ids)[uniprot_id]
+
+    @helper.retry_database
+    def get_uniprot_domain_pairs(
+            self, uniprot_ids, copy_data=False, uniprot_domain_pair_ids=[]):
+        """Get the domain pairs of many proteins using a few ``IN (...)`` queries.
+
+        Returns
+        -------
+        uniprot_domain_pairs : OrderedDict
+            Maps every uniprot id in `uniprot_ids` to a list of its domain pairs that have
+            a structural template. Pairs between two proteins in `uniprot_ids` are listed
+            under both proteins.
+        """
+        uniprot_ids = list(OrderedDict.fromkeys(uniprot_ids))
+        uniprot_domain_pairs = OrderedDict((uniprot_id, []) for uniprot_id in uniprot_ids)
+        _seen = set()
         with self.session_scope() as session:
-            uniprot_domain_pairs_query = (
-                session.query(UniprotDomainPair)
-                .filter(sa.or_(
-                    sa.text("uniprot_id_1='{}'".format(uniprot_id)),
-                    sa.text("uniprot_id_2='{}'".format(uniprot_id))))
-            )
-            if uniprot_domain_pair_ids:
-                uniprot_domain_pairs_query = (
-                    uniprot_domain_pairs_query
-                    .filter(UniprotDomainPair.uniprot_domain_pair_id.in_(uniprot_domain_pair_ids))
+            for uniprot_ids_chunk in _get_chunks(uniprot_ids):
+                query = (
+                    session.query(UniprotDomainPair)
+                    .filter(sa.or_(
+                        UniprotDomainPair.uniprot_id_1.in_(uniprot_ids_chunk),
+                        UniprotDomainPair.uniprot_id_2.in_(uniprot_ids_chunk)))
+                    .options(
+                        sa.orm.joinedload(UniprotDomainPair.template)
+                        .joinedload(UniprotDomainPairTemplate.model))
                 )
-            uniprot_domain_pairs = (
-                uniprot_domain_pairs_query
-                # .options(sa.orm.joinedload('template', innerjoin=True).joinedload('model'))
-                # .options(sa.orm.joinedload('template', innerjoin=True))
-                .limit(100)
-                .all()
-            )
+                if uniprot_domain_pair_ids:
+                    query = query.filter(
+                        UniprotDomainPair.uniprot_domain_pair_id.in_(uniprot_domain_pair_ids))
+                # The above SQL query may result in duplicates if we have homodimers
+                # or if both proteins are in the batch, so we need to remove those.
+                for d in query:
+                    for uniprot_id in [d.uniprot_id_1, d.uniprot_id_2]:
+                        key = (uniprot_id, d.uniprot_domain_pair_id)
+                        if uniprot_id in uniprot_domain_pairs and key not in _seen:
+                            _seen.add(key)
+                            uniprot_domain_pairs[uniprot_id].append(d)
+
+        copied_uniprot_domain_pair_ids = set()
+        for uniprot_id in uniprot_ids:
+            uniprot_domain_pairs[uniprot_id] = [
+                d for d in uniprot_domain_pairs[uniprot_id] if self._has_template(d)]
+            if copy_data:
+                self.copy_uniprot_domain_pair_data(
+                    uniprot_id, uniprot_domain_pairs[uniprot_id], copied_uniprot_domain_pair_ids)
 
-        # The above SQL query may result in duplicates if we have homodimers.
-        # So we need to remove possible dimers.
-        _seen = set()
-        uniprot_domain_pairs = [
-            d for d in uniprot_domain_pairs
-            if d.uniprot_domain_pair_id not in _seen and
-            not _seen.add(d.uniprot_domain_pair_id)
-        ]
-        #
+        return uniprot_domain_pairs
+
+    def copy_uniprot_domain_pair_data(
+            self, uniprot_id, uniprot_domain_pairs, copied_uniprot_domain_pair_ids=None):
+        """Copy precalculated Provean data and homology models of `uniprot_domain_pairs`.
+
+        Parameters
+        ----------
+        uniprot_id : str
+            The protein whose Provean data should be copied.
+        uniprot_domain_pairs : list
+            Domain pairs of the protein `uniprot_id`.
+        copied_uniprot_domain_pair_ids : set, optional
+            Ids of the domain pairs whose homology models have already been copied.
+            Updated in place.
+        """
+        if copied_uniprot_domain_pair_ids is None:
+            copied_uniprot_domain_pair_ids = set()
         archive_dir = conf.CONFIGS['archive_dir']
         archive_type = conf.CONFIGS['archive_type']
-        d_idx = 0
-        while d_idx < len(uniprot_domain_pairs):
-            d = uniprot_domain_pairs[d_idx]
-            if not d.template:
-                logger.debug(
-                    'Skipping uniprot domain pair with id {} because it does not '
-                    'have a structural template...'
-                    .format(d.uniprot_domain_pair_id))
-                del uniprot_domain_pairs[d_idx]
-                continue
+        for d in uniprot_domain_pairs:
             # Copy precalculated Provean data
-            if copy_data:
-                if d.uniprot_id_1 == uniprot_id:
-                    ud = d.uniprot_domain_1
-                elif d.uniprot_id_2 == uniprot_id:
-                    ud = d.uniprot_domain_2
-                try:
-                    self._copy_provean(ud, archive_dir, archive_type)
-                except subprocess.CalledProcessError as e:
-                    logger.error(e)
-                    logger.error('Failed to copy provean supporting set!')
-                    d.uniprot_sequence.provean.provean_supset_filename = ''
+            if d.uniprot_id_1 == uniprot_id:
+                ud = d.uniprot_domain_1
+            elif d.uniprot_id_2 == uniprot_id:
+                ud = d.uniprot_domain_2
+            try:
+                self._copy_provean(ud, archive_dir, archive_type)
+            except subprocess.CalledProcessError as e:
+                logger.error(e)
+                logger.error('Failed to copy provean supporting set!')
+                ud.uniprot_sequence.provean.provean_supset_filename = ''
             # Copy precalculated homology models
-            if copy_data:
-                try:
-                    self._copy_uniprot_domain_pair_data(
-                        d, d.path_to_data, archive_dir, archive_type)
-                except subprocess.CalledProcessError as e:
-                    logger.error(e)
-                    logger.error('Failed to copy domain pair alignments and / or homology model!')
-                    d.template.model.alignment_filename_1 = None
-                    d.template.model.alignment_filename_2 = None
-                    d.template.model.model_filename = None
-            d_idx += 1
-
-        return uniprot_domain_pairs
+            if d.uniprot_domain_pair_id in copied_uniprot_domain_pair_ids:
+                continue
+            copied_uniprot_domain_pair_ids.add(d.uniprot_domain_pair_id)
+            try:
+                self._copy_uniprot_domain_pair_data(
+                    d, d.path_to_data, archive_dir, archive_type)
+            except subprocess.CalledProcessError as e:
+                logger.error(e)
+                logger.error('Failed to copy domain pair alignments and / or homology model!')
+                d.template.model.alignment_filename_1 = None
+                d.template.model.alignment_filename_2 = None
+                d.template.model.model_filename = None
+
+    @staticmethod
+    def _has_template(d):
+        if not d.template:
+            logger.debug(
+                'Skipping {} because it does not have a structural template...'.format(d))
+            return False
+        return True
 
     def _copy_uniprot_domain_data(self, d, path_to_data, archive_dir, archive_type):
         if path_to_data is None:
@@ -576,7 +642,8 @@ class MyDatabase(object):
         if not filenames:
             logger.debug("All files already been extracted. Done!")
             return
-        system_command = "7za x '{path_to_7zip}' '{files}' -y".format(
+        system_command = "{seven_zip} x '{path_to_7zip}' '{files}' -y".format(
+            seven_zip=helper.get_executable('7za'),
             path_to_7zip=path_to_7zip,
             files="' '".join(filenames)
         )
@@ -4,13 +4,16 @@ import logging
 import shutil
 import json
 import subprocess
+import tempfile
+import concurrent.futures
+from collections import OrderedDict
 from Bio import SeqIO, AlignIO
 from Bio.Seq import Seq
 from Bio.SeqRecord import SeqRecord
 from Bio.PDB import PDBIO
 from kmtools.system_tools import switch_paths
 from . import (
-    conf, errors, structure_tools, structure_analysis,
+    conf, errors, helper, structure_tools, structure_analysis,
     call_modeller, call_tcoffee, call_foldx
 )
 
@@ -44,17 +47,18 @@ class Model:
 
         # Template structures
         self.structure_file = structure_file
-        self.structure = structure_tools.get_pdb_structure(self.structure_file)
-        self.structure_id = self.structure.id.replace(':', '.')
+        self.structure = structure_tools.read_structure_array(
+            self.structure_file, sequence_only=True)
+        self.structure_id = self.structure.structure_id.replace(':', '.')
         self.structure_seqrecords = [
             SeqRecord(
-                id='{}{}'.format(self.structure_id, chain.id),
+                id='{}{}'.format(self.structure_id, chain_id),
                 seq=Seq(
-                    structure_tools
-                    .get_chain_sequence_and_numbering(chain, include_hetatms=True)[0])
-            ) for chain in self.structure[0].child_list
+                    self.structure
+                    .get_chain_sequence_and_numbering(chain_id, include_hetatms=True)[0])
+            ) for chain_id in self.structure.chain_ids
         ]
-        self.chain_ids = [chain.id for chain in self.structure.child_list[0].child_list]
+        self.chain_ids = list(self.structure.chain_ids)
         logger.debug('structure_seqrecords: {}'.format(self.structure_seqrecords))
 
         # Homology modelling
@@ -86,19 +90,21 @@ class Model:
                 json.dump(self.modeller_results, ofh)
 
         # Get interacting amino acids and interface area
-        self.modeller_structure = (
-            structure_tools.get_pdb_structure(
-                op.join(conf.CONFIGS['unique_temp_dir'], self.modeller_results['model_file']))
-        )
-        self.modeller_chain_ids = [
-            chain.id for chain in self.modeller_structure[0]
-        ]
-        self._analyse_core()
-        if len(self.sequence_seqrecords) > 1:
-            self._analyse_interface()
+        self._modeller_structure = None
+        self._load_model_analysis()
 
         self.mutations = {}
         self.errors = []
+        self._repaired_model_file = None
+
+    @property
+    def modeller_structure(self):
+        """Homology model parsed into a Bio.PDB structure (loaded on first use)."""
+        if self._modeller_structure is None:
+            self._modeller_structure = structure_tools.get_pdb_structure(
+                op.join(conf.CONFIGS['unique_temp_dir'], self.modeller_results['model_file']),
+                get_header=False)
+        return self._modeller_structure
 
     @property
     def core_or_interface(self):
@@ -236,38 +242,74 @@ class Model:
         self.modeller_results['model_domain_defs'] = model_domain_defs
         self.modeller_results['alignment_stats'] = alignment_stats
 
+    def _get_model_hash(self):
+        """Hash of the homology model and of the options used to analyse it."""
+        return helper.get_hash(
+            op.join(conf.CONFIGS['unique_temp_dir'], self.modeller_results['model_file']),
+            core_or_interface=self.core_or_interface,
+            sasa_method=conf.CONFIGS.get('sasa_method', 'shrake_rupley'),
+            interface_area_method=conf.CONFIGS.get('interface_area_method', 'shrake_rupley'),
+        )
+
+    def _load_model_analysis(self):
+        """Restore model SASA and interface data from the modeller results, if possible.
+
+        The data is stored in the ``model_analysis`` entry of the modeller results file,
+        together with the hash of the model that it was calculated for.
+        If the hash does not match the current model, the model is analysed again
+        and the modeller results file is updated.
+        """
+        model_hash = self._get_model_hash()
+        model_analysis = self.modeller_results.get('model_analysis')
+        if model_analysis is not None and model_analysis.get('model_hash') == model_hash:
+            logger.debug('Loading precalculated model analysis: %s', model_hash)
+            for key, value in model_analysis.items():
+                if key != 'model_hash':
+                    setattr(self, key, value)
+            return
+
+        self.modeller_chain_ids = [
+            chain.id for chain in self.modeller_structure[0]
+        ]
+        self._analyse_core()
+        model_analysis = dict(
+            model_hash=model_hash,
+            modeller_chain_ids=self.modeller_chain_ids,
+            relative_sasa_scores=self.relative_sasa_scores,
+        )
+        if len(self.sequence_seqrecords) > 1:
+            self._analyse_interface()
+            model_analysis.update(
+                interacting_aa_1=self.interacting_aa_1,
+                interacting_aa_2=self.interacting_aa_2,
+                interface_area_hydrophobic=self.interface_area_hydrophobic,
+                interface_area_hydrophilic=self.interface_area_hydrophilic,
+                interface_area_total=self.interface_area_total,
+            )
+        self.modeller_results['model_analysis'] = model_analysis
+        with helper.atomic_open(self.modeller_results_file) as ofh:
+            json.dump(self.modeller_results, ofh)
+
     def _analyse_core(self):
-        # Run the homology model through msms and get dataframes with all the
-        # per atom and per residue SASA values
+        # Calculate the relative SASA of every residue in the homology model
         analyze_structure = structure_analysis.AnalyzeStructure(
             op.join(conf.CONFIGS['unique_temp_dir'], self.modeller_results['model_file']),
             conf.CONFIGS['modeller_dir']
         )
-        __, seasa_by_chain_separately, __, seasa_by_residue_separately = (
-            analyze_structure.get_seasa()
-        )
+        residue_sasa = analyze_structure.get_residue_sasa()
 
         # Get SASA only for amino acids in the chain of interest
-        def _filter_df(df, chain_id, resname, resnum):
-            df2 = df[
-                (df['pdb_chain'] == chain_id) &
-                (df['res_name'] == resname) &
-                (df['res_num'] == resnum)
-            ]
-            return df2.iloc[0]['rel_sasa']
-
         self.relative_sasa_scores = {}
         for chain_id in self.modeller_chain_ids:
             self.relative_sasa_scores[chain_id] = []
             chain = self.modeller_structure[0][chain_id]
             for residue in chain:
                 if residue.resname in structure_tools.AAA_DICT:
-                    relative_sasa_score = _filter_df(
-                        seasa_by_residue_separately,
-                        chain_id=chain_id,
-                        resname=residue.resname,
-                        resnum=(str(residue.id[1]) + residue.id[2].strip())
-                    )
+                    resnum = str(residue.id[1]) + residue.id[2].strip()
+                    resname, relative_sasa_score = (
+                        residue_sasa.get((chain_id, resnum), (None, None)))
+                    if resname != residue.resname:
+                        continue
                     self.relative_sasa_scores[chain_id].append(relative_sasa_score)
             number_of_aa = len(structure_tools.get_chain_sequence_and_numbering(chain)[0])
             if (number_of_aa != len(self.relative_sasa_scores[chain_id])):
@@ -356,6 +398,90 @@ class Model:
              analyze_structure.get_interface_area(self.modeller_chain_ids[:2])
         )
 
+    def repair_model(self):
+        """Optimise the homology model using the FoldX `RepairPDB` command.
+
+        The repair is performed only once per model and the repaired structure is reused
+        by all mutations.
+
+        Returns
+        -------
+        repaired_model_file : str
+            Full path to the repaired homology model.
+        """
+        if self._repaired_model_file is not None:
+            return self._repaired_model_file
+
+        os.makedirs(op.join(conf.CONFIGS['model_dir'], 'repair'), exist_ok=True)
+        repair_dir = tempfile.mkdtemp(
+            prefix=self.model_id + '_', dir=op.join(conf.CONFIGS['model_dir'], 'repair'))
+        shutil.copy(op.join(conf.CONFIGS['data_dir'], 'rotabase.txt'), repair_dir)
+
+        model_file = op.join(repair_dir, op.basename(self.modeller_results['model_file']))
+        shutil.copy(
+            op.join(conf.CONFIGS['unique_temp_dir'], self.modeller_results['model_file']),
+            model_file)
+
+        chain_id = self.modeller_structure.child_list[0].child_list[0].id
+        fX = call_foldx.FoldX(model_file, chain_id, repair_dir)
+        self._repaired_model_file = fX('RepairPDB')
+        return self._repaired_model_file
+
+    def mutate_many(self, mutations, n_jobs=None):
+        """Introduce many mutations into the model.
+
+        The model is repaired only once, after which the mutations are evaluated by a pool
+        of FoldX workers. Substitutions of the same residue are evaluated together,
+        using :meth:`mutate_position`, and each residue gets its own working directory.
+
+        Parameters
+        ----------
+        mutations : list
+            List of ``(sequence_idx, mutation)`` tuples.
+        n_jobs : int, optional
+            The maximum number of mutations to evaluate at the same time.
+            Defaults to the `n_cores` configuration option.
+
+        Yields
+        ------
+        key : tuple
+            ``(sequence_idx, mutation)`` tuple.
+        results : dict
+            The same results that would be returned by :meth:`mutate`.
+            Results are yielded in the order in which the mutations finish.
+            Mutations that fall outside the domain or the interface are skipped.
+        """
+        if n_jobs is None:
+            n_jobs = int(conf.CONFIGS.get('n_cores') or 1)
+        mutations = list(OrderedDict.fromkeys(mutations))
+        handled_errors = (
+            errors.MutationOutsideDomainError,
+            errors.MutationOutsideInterfaceError,
+        )
+
+        self.repair_model()
+
+        position_mutations = OrderedDict()
+        for sequence_idx, mutation in mutations:
+            position_mutations.setdefault((sequence_idx, mutation[:-1]), []).append(mutation)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            futures = {
+                executor.submit(self.mutate_position, sequence_idx, position_mutation_list):
+                (sequence_idx, position_mutation_list)
+                for (sequence_idx, _), position_mutation_list in position_mutations.items()
+            }
+            for future in concurrent.futures.as_completed(futures):
+                sequence_idx, position_mutation_list = futures[future]
+                try:
+                    results_list = future.result()
+                except handled_errors as e:
+                    logger.debug("Skipping mutations {} in sequence {}: {}".format(
+                        position_mutation_list, sequence_idx, type(e).__name__))
+                    continue
+                for mutation, results in zip(position_mutation_list, results_list):
+                    yield (sequence_idx, mutation), results
+
     def mutate(self, sequence_idx, mutation):
         """Introduce mutation into model.
 
@@ -372,7 +498,45 @@ class Model:
         """
         if (sequence_idx, mutation) in self.mutations:
             return self.mutations[(sequence_idx, mutation)]
+        return self.mutate_position(sequence_idx, [mutation])[0]
+
+    def mutate_position(self, sequence_idx, mutations):
+        """Introduce several substitutions of the same residue into model.
+
+        All mutants are built by a single FoldX `BuildModel` run, and the features of the
+        wildtype structure are calculated only once, using the wildtype structure
+        produced for the first mutant.
+
+        Parameters
+        ----------
+        sequence_idx : int
+            Integer describing whether the mutation is on the first domain (`0`)
+            or on the second domain (`1`).
+        mutations : list
+            Mutations of the same residue (e.g. ``['M1A', 'M1C']``).
+
+        Returns
+        -------
+        list
+            The results of every mutation in `mutations`, as returned by :meth:`mutate`.
 
+        Raises
+        ------
+        MutationOutsideDomainError
+        MutationOutsideInterfaceError
+        """
+        if len({mutation[:-1] for mutation in mutations}) != 1:
+            raise ValueError(
+                "All mutations must affect the same residue: '{}'".format(mutations))
+        new_mutations = [
+            mutation for mutation in OrderedDict.fromkeys(mutations)
+            if (sequence_idx, mutation) not in self.mutations
+        ]
+        if new_mutations:
+            self._mutate_position(sequence_idx, new_mutations)
+        return [self.mutations[(sequence_idx, mutation)] for mutation in mutations]
+
+    def _mutate_position(self, sequence_idx, mutations):
         protein_id = self.sequence_seqrecords[sequence_idx].id
         chain_id = self.modeller_structure.child_list[0].child_list[sequence_idx].id
 
@@ -388,7 +552,7 @@ class Model:
         #     len(self.sequence_seqrecords[sequence_idx].seq) - domain_def_offset[1]
         # )
 
-        mutation_pos = int(mutation[1:-1]) - domain_def[0] + 1
+        mutation_pos = int(mutations[0][1:-1]) - domain_def[0] + 1
         if mutation_pos > (domain_def[1] - domain_def[0] + 1):
             raise errors.MutationOutsideDomainError()
 
@@ -397,10 +561,12 @@ class Model:
                 self.modeller_structure[0][chain_id],
                 [mutation_pos])[0]
         )
-        mutation_modeller = (mutation[0] + str(position_modeller) + mutation[-1])
-        logger.debug('mutation: {}'.format(mutation))
+        mutations_modeller = [
+            mutation[0] + str(position_modeller) + mutation[-1] for mutation in mutations
+        ]
+        logger.debug('mutations: {}'.format(mutations))
         logger.debug('position_modeller: {}'.format(position_modeller))
-        logger.debug('mutation_modeller: {}'.format(mutation_modeller))
+        logger.debug('mutations_modeller: {}'.format(mutations_modeller))
 
         if len(self.sequence_seqrecords) == 1:
             partner_chain_idx = None
@@ -419,11 +585,11 @@ class Model:
             logger.debug('partner_chain_idx: {}'.format(partner_chain_idx))
             if sequence_idx == 0:
                 logger.debug('interacting_aa_1: {}'.format(self.interacting_aa_1))
-                if int(mutation[1:-1]) not in self.interacting_aa_1:
+                if int(mutations[0][1:-1]) not in self.interacting_aa_1:
                     raise errors.MutationOutsideInterfaceError()
             elif sequence_idx == 1:
                 logger.debug('interacting_aa_2: {}'.format(self.interacting_aa_2))
-                if int(mutation[1:-1]) not in self.interacting_aa_2:
+                if int(mutations[0][1:-1]) not in self.interacting_aa_2:
                     raise errors.MutationOutsideInterfaceError()
             else:
                 logger.warning(
@@ -431,150 +597,170 @@ class Model:
                     "two chains!"
                 )
 
-        mutation_id = '{}-{}-{}'.format(protein_id, partner_protein_id, mutation)
+        mutation_ids = [
+            '{}-{}-{}'.format(protein_id, partner_protein_id, mutation)
+            for mutation in mutations
+        ]
 
         if mutation_errors:
-            results = dict(
-                protein_id=protein_id,
-                sequence_idx=sequence_idx,
-                chain_modeller=chain_id,
-                partner_chain_id=partner_chain_id,
-                mutation_id=mutation_id,
-                mutation_domain=mutation,
-                mutation_errors=mutation_errors,
-            )
-            self.mutations[(sequence_idx, mutation)] = results
-            return results
+            for mutation, mutation_id in zip(mutations, mutation_ids):
+                results = dict(
+                    protein_id=protein_id,
+                    sequence_idx=sequence_idx,
+                    chain_modeller=chain_id,
+                    partner_chain_id=partner_chain_id,
+                    mutation_id=mutation_id,
+                    mutation_domain=mutation,
+                    mutation_errors=mutation_errors,
+                )
+                self.mutations[(sequence_idx, mutation)] = results
+            return
 
         # ...
-        logger.debug('Running mutation with mutation_id: {}'.format(mutation_id))
+        logger.debug('Running mutations with mutation_ids: {}'.format(mutation_ids))
         logger.debug('chain_id: {}'.format(chain_id))
         logger.debug('partner_chain_id: {}'.format(partner_chain_id))
 
         #######################################################################
         # Create a folder for all mutation data.
-        mutation_dir = op.join(conf.CONFIGS['model_dir'], 'mutations', mutation_id)
-        os.makedirs(mutation_dir, exist_ok=True)
+        # (substitutions of the same residue share a folder, e.g. '{protein_id}--M1X')
+        if len(mutations) == 1:
+            mutation_dir_name = mutation_ids[0]
+        else:
+            mutation_dir_name = '{}-{}-{}X'.format(
+                protein_id, partner_protein_id, mutations[0][:-1])
+        mutation_dir = op.join(conf.CONFIGS['model_dir'], 'mutations', mutation_dir_name)
         os.makedirs(mutation_dir, exist_ok=True)
         shutil.copy(op.join(conf.CONFIGS['data_dir'], 'rotabase.txt'), mutation_dir)
 
         #######################################################################
-        # Copy the homology model to the mutation folder
-        model_file = op.join(mutation_dir, op.basename(self.modeller_results['model_file']))
-        shutil.copy(
-            op.join(conf.CONFIGS['unique_temp_dir'], self.modeller_results['model_file']),
-            model_file)
-
-        #######################################################################
-        # 2nd: use the 'Repair' feature of FoldX to optimise the structure
-        fX = call_foldx.FoldX(model_file, chain_id, mutation_dir)
-        repairedPDB_wt = fX('RepairPDB')
+        # 2nd: copy the homology model, optimised using the 'Repair' feature of FoldX,
+        # to the mutation folder
+        repairedPDB_wt = op.join(mutation_dir, op.basename(self.repair_model()))
+        shutil.copy(self.repair_model(), repairedPDB_wt)
 
         #######################################################################
-        # 3rd: introduce the mutation using FoldX
-        mutCodes = [mutation_modeller[0] + chain_id + mutation_modeller[1:], ]
-        logger.debug('Mutcodes for foldx: {}'.format(mutCodes))
+        # 3rd: introduce the mutations using FoldX (one mutant per mutation)
+        mutant_list = [
+            [mutation_modeller[0] + chain_id + mutation_modeller[1:]]
+            for mutation_modeller in mutations_modeller
+        ]
+        logger.debug('Mutcodes for foldx: {}'.format(mutant_list))
 
-        # Introduce the mutation using foldX
+        # Introduce the mutations using foldX
         fX_wt = call_foldx.FoldX(repairedPDB_wt, chain_id, mutation_dir)
-        repairedPDB_wt_list, repairedPDB_mut_list = fX_wt('BuildModel', mutCodes)
+        build_model_results = fX_wt.build_models(mutant_list)
 
+        #######################################################################
+        # 4th: calculate the energies and other properties of the wildtype structure
+        # (These only depend on the mutated position, so they are shared by all mutants).
+        repairedPDB_wt_list = build_model_results[0][0]
         logger.debug('repairedPDB_wt_list: %s' % str(repairedPDB_wt_list))
-        logger.debug('repairedPDB_mut_list: %s' % str(repairedPDB_mut_list))
-
         wt_chain_sequences = structure_tools.get_structure_sequences(repairedPDB_wt_list[0])
-        mut_chain_sequences = structure_tools.get_structure_sequences(repairedPDB_mut_list[0])
-
         logger.debug('wt_chain_sequences: %s' % str(wt_chain_sequences))
-        logger.debug('mut_chain_sequences: %s' % str(mut_chain_sequences))
 
-        # Copy the foldX wildtype and mutant pdb files (use the first model if there are multiple)
-        model_file_wt = op.join(mutation_dir, mutation_id + '-wt.pdb')
-        model_file_mut = op.join(mutation_dir, mutation_id + '-mut.pdb')
-        shutil.copy(repairedPDB_wt_list[0], model_file_wt)
-        shutil.copy(repairedPDB_mut_list[0], model_file_mut)
-
-        #######################################################################
-        # 4th: set up the classes for the wildtype and the mutant structures
         fX_wt_list = list()
         for wPDB in repairedPDB_wt_list:
             fX_wt_list.append(call_foldx.FoldX(wPDB, chain_id, mutation_dir))
 
-        fX_mut_list = list()
-        for mPDB in repairedPDB_mut_list:
-            fX_mut_list.append(call_foldx.FoldX(mPDB, chain_id, mutation_dir))
-
-        #######################################################################
-        # 5th: Calculate energies
         assert len(fX_wt_list) == 1
         stability_values_wt = ','.join(
             '{}'.format(f) for f in fX_wt_list[0]('Stability')
         )
-        assert len(fX_wt_list) == 1
-        stability_values_mut = ','.join(
-            '{}'.format(f) for f in fX_mut_list[0]('Stability')
-        )
 
         if len(self.sequence_seqrecords) == 1:
             complex_stability_values_wt = None
-            complex_stability_values_mut = None
         else:
             assert len(fX_wt_list) == 1
             complex_stability_values_wt = ','.join(
                 '{}'.format(f) for f in fX_wt_list[0]('AnalyseComplex')
             )
-            assert len(fX_mut_list) == 1
-            complex_stability_values_mut = ','.join(
-                '{}'.format(f) for f in fX_mut_list[0]('AnalyseComplex')
-            )
 
-        #######################################################################
-        # 6: Calculate all other relevant properties
         # (This also verifies that mutations match mutated residues in pdb structures).
         analyze_structure_wt = structure_analysis.AnalyzeStructure(
             repairedPDB_wt_list[0], mutation_dir,
         )
         analyze_structure_results_wt = analyze_structure_wt(
-            chain_id, mutation_modeller, partner_chain_id)
+            chain_id, mutations_modeller[0], partner_chain_id)
+        logger.debug('analyze_structure_results_wt: {}'.format(analyze_structure_results_wt))
 
-        analyze_structure_mut = structure_analysis.AnalyzeStructure(
-            repairedPDB_mut_list[0], mutation_dir,
-        )
-        analyze_structure_results_mut = analyze_structure_mut(
-            chain_id, mutation_modeller, partner_chain_id)
+        for i, (repairedPDB_wt_list, repairedPDB_mut_list) in enumerate(build_model_results):
+            mutation = mutations[i]
+            mutation_id = mutation_ids[i]
+            mutation_modeller = mutations_modeller[i]
+            logger.debug('repairedPDB_mut_list: %s' % str(repairedPDB_mut_list))
+
+            mut_chain_sequences = structure_tools.get_structure_sequences(
+                repairedPDB_mut_list[0])
+            logger.debug('mut_chain_sequences: %s' % str(mut_chain_sequences))
+
+            # Copy the foldX wildtype and mutant pdb files
+            # (use the first model if there are multiple)
+            model_file_wt = op.join(mutation_dir, mutation_id + '-wt.pdb')
+            model_file_mut = op.join(mutation_dir, mutation_id + '-mut.pdb')
+            shutil.copy(repairedPDB_wt_list[0], model_file_wt)
+            shutil.copy(repairedPDB_mut_list[0], model_file_mut)
+
+            ###################################################################
+            # 5th: set up the classes for the mutant structures
+            fX_mut_list = list()
+            for mPDB in repairedPDB_mut_list:
+                fX_mut_list.append(call_foldx.FoldX(mPDB, chain_id, mutation_dir))
+
+            ###################################################################
+            # 6th: Calculate energies
+            assert len(fX_mut_list) == 1
+            stability_values_mut = ','.join(
+                '{}'.format(f) for f in fX_mut_list[0]('Stability')
+            )
 
-        logger.debug('analyze_structure_results_wt: {}'.format(analyze_structure_results_wt))
-        logger.debug('analyze_structure_results_mut: {}'.format(analyze_structure_results_mut))
+            if len(self.sequence_seqrecords) == 1:
+                complex_stability_values_mut = None
+            else:
+                assert len(fX_mut_list) == 1
+                complex_stability_values_mut = ','.join(
+                    '{}'.format(f) for f in fX_mut_list[0]('AnalyseComplex')
+                )
 
-        #######################################################################
-        # 5th: calculate the energy for the wildtype
-        results = dict(
-            protein_id=protein_id,
-            sequence_idx=sequence_idx,
-            chain_modeller=chain_id,
-            partner_chain_id=partner_chain_id,
-            mutation_id=mutation_id,
-            mutation_domain=mutation,
-            mutation_errors=mutation_errors,
-            #
-            mutation_dir=mutation_dir,
-            mutation_modeller=mutation_modeller,
-            mutation_foldx=','.join(mutCodes),
-            model_file_wt=model_file_wt,
-            model_file_mut=model_file_mut,
-            stability_energy_wt=stability_values_wt,
-            stability_energy_mut=stability_values_mut,
-            analyse_complex_energy_wt=complex_stability_values_wt,
-            analyse_complex_energy_mut=complex_stability_values_mut,
-        )
-        for key, value in analyze_structure_results_wt.items():
-            results[key + '_wt'] = value
-        for key, value in analyze_structure_results_mut.items():
-            results[key + '_mut'] = value
+            ###################################################################
+            # 7th: Calculate all other relevant properties
+            # (This also verifies that mutations match mutated residues in pdb structures).
+            analyze_structure_mut = structure_analysis.AnalyzeStructure(
+                repairedPDB_mut_list[0], mutation_dir,
+            )
+            analyze_structure_results_mut = analyze_structure_mut(
+                chain_id, mutation_modeller, partner_chain_id)
+            logger.debug(
+                'analyze_structure_results_mut: {}'.format(analyze_structure_results_mut))
 
-        # Another exit point
-        self.mutations[(sequence_idx, mutation)] = results
-        return results
+            ###################################################################
+            # 8th: save the results
+            results = dict(
+                protein_id=protein_id,
+                sequence_idx=sequence_idx,
+                chain_modeller=chain_id,
+                partner_chain_id=partner_chain_id,
+                mutation_id=mutation_id,
+                mutation_domain=mutation,
+                mutation_errors=mutation_errors,
+                #
+                mutation_dir=mutation_dir,
+                mutation_modeller=mutation_modeller,
+                mutation_foldx=','.join(mutant_list[i]),
+                model_file_wt=model_file_wt,
+                model_file_mut=model_file_mut,
+                stability_energy_wt=stability_values_wt,
+                stability_energy_mut=stability_values_mut,
+                analyse_complex_energy_wt=complex_stability_values_wt,
+                analyse_complex_energy_mut=complex_stability_values_mut,
+            )
+            for key, value in analyze_structure_results_wt.items():
+                results[key + '_wt'] = value
+            for key, value in analyze_structure_results_mut.items():
+                results[key + '_mut'] = value
+
+            # Another exit point
+            self.mutations[(sequence_idx, mutation)] = results
 
     @property
     def result(self):
@@ -594,7 +780,8 @@ class Model:
         )
         # Dump modeller resutls
         for key, value in self.modeller_results.items():
-            result[key] = value
+            if key != 'model_analysis':
+                result[key] = value
         # For interfaces
         if len(self.sequence_seqrecords) > 1:
             result_interface = dict(
@@ -768,7 +955,7 @@ def run_modeller(
 
     # If there is only one chain in the pdb, label that chain 'A'
     io = PDBIO()
-    structure = structure_tools.get_pdb_structure(raw_model_file)
+    structure = structure_tools.get_pdb_structure(raw_model_file, get_header=False)
     chains = structure[0].child_list
     logger.debug('Modeller chain ids: ' + ', '.join(chain.id for chain in chains))
     for i in range(len(chains)):
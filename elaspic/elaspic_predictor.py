@@ -1,10 +1,12 @@
+import os.path as op
 import logging
+import pickle
 
 import numpy as np
 import pandas as pd
 import sklearn.ensemble
 
-from . import call_foldx
+from . import CACHE_DIR, call_foldx, errors
 
 logger = logging.getLogger(__name__)
 
@@ -79,15 +81,130 @@ FEATURE_COLUMNS_INTERFACE = (
 )
 
 
-def _split_foldx_features(df, foldx_column_name, foldx_feature_names):
-    df = df.copy()
-    for column_index, column_name in enumerate(foldx_feature_names):
-        df[column_name] = [
-            (float(x.split(',')[column_index]) if pd.notnull(x) else np.nan)
-            for x in df[foldx_column_name].values
-        ]
-    del df[foldx_column_name]
-    return df
+# Predictor registry
+#: Classifiers that have already been loaded, keyed by ``(core_or_interface, data_dir)``
+_CLASSIFIERS = {}
+
+
+def _get_core_or_interface(core_or_interface):
+    if core_or_interface in [False, 0, 'core']:
+        return 'core'
+    elif core_or_interface in [True, 1, 'interface']:
+        return 'interface'
+    else:
+        raise errors.ParameterError(
+            "Wrong core_or_interface: '{}'".format(core_or_interface))
+
+
+def _validate_classifier(clf, core_or_interface):
+    """Make sure that `clf` was trained using features that we know how to calculate."""
+    if core_or_interface == 'core':
+        feature_columns = FEATURE_COLUMNS_CORE
+    else:
+        feature_columns = FEATURE_COLUMNS_INTERFACE
+    features = getattr(clf, 'features', None)
+    if not features:
+        raise errors.PredictorError(
+            "The {} classifier does not specify its features!".format(core_or_interface))
+    unknown_features = [f for f in features if f not in feature_columns]
+    if unknown_features:
+        raise errors.PredictorError(
+            "The {} classifier uses unknown features: {}"
+            .format(core_or_interface, unknown_features))
+
+
+def get_classifier(core_or_interface, data_dir=CACHE_DIR):
+    """Return the core or the interface classifier.
+
+    Each classifier is unpickled from `data_dir` only once per process.
+
+    Parameters
+    ----------
+    core_or_interface : str
+        Either 'core' or 'interface'.
+    data_dir : str
+        Folder containing the ``core_clf.pickle`` and ``interface_clf.pickle`` files.
+
+    Raises
+    ------
+    errors.PredictorError
+        If the classifier uses features not in :data:`FEATURE_COLUMNS_CORE`
+        (or :data:`FEATURE_COLUMNS_INTERFACE`).
+    """
+    core_or_interface = _get_core_or_interface(core_or_interface)
+    key = (core_or_interface, data_dir)
+    if key not in _CLASSIFIERS:
+        logger.debug("Loading the {} classifier from '{}'...".format(core_or_interface, data_dir))
+        with open(op.join(data_dir, '{}_clf.pickle'.format(core_or_interface)), 'rb') as fh:
+            clf = pickle.load(fh)
+        _validate_classifier(clf, core_or_interface)
+        _CLASSIFIERS[key] = clf
+    return _CLASSIFIERS[key]
+
+
+def predict_batch(df, core_or_interface, data_dir=CACHE_DIR):
+    """Predict the ddG of every mutation in `df`.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Mutation features, as returned by :func:`format_mutation_features`
+        followed by :func:`convert_features_to_differences`.
+    core_or_interface : str
+        Whether to use the 'core' or the 'interface' classifier.
+
+    Returns
+    -------
+    ndarray
+        Predicted ddG values, in the same order as the rows in `df`.
+    """
+    clf = get_classifier(core_or_interface, data_dir)
+    if df.empty:
+        return np.array([], dtype=float)
+    return clf.predict(df[clf.features].values)
+
+
+def _split_packed_column(column, column_names):
+    """Parse a column of comma-separated values into a DataFrame of floats.
+
+    Each value is split only once. Rows where `column` is null are filled with NaNs.
+
+    Parameters
+    ----------
+    column : Series
+        Column of comma-separated values.
+    column_names : list
+        Names of the columns in the returned DataFrame, one for each value in the list.
+        Names may be repeated, in which case the last value is kept.
+    """
+    values = (
+        column.astype(object).str.split(',', expand=True)
+        .reindex(columns=range(len(column_names)))
+        .astype(float)
+    )
+    values.columns = column_names
+    return values.loc[:, ~values.columns.duplicated(keep='last')]
+
+
+def _split_packed_columns(df, packed_columns):
+    """Replace packed columns in `df` with columns containing a single feature each.
+
+    Parameters
+    ----------
+    df : DataFrame
+        DataFrame containing the packed columns.
+    packed_columns : list
+        List of ``(packed_column_name, column_names)`` tuples. If different packed columns
+        contain features with the same name, the value from the later column is kept.
+    """
+    features = {}
+    for packed_column_name, column_names in packed_columns:
+        split_df = _split_packed_column(df[packed_column_name], column_names)
+        for column_name in split_df.columns:
+            features[column_name] = split_df[column_name]
+    df = df.drop([c for c, _ in packed_columns], axis=1)
+    df = df.drop([c for c in features if c in df.columns], axis=1)
+    return pd.concat([df, pd.DataFrame(features, index=df.index)], axis=1)
 
 
 def format_mutation_features(df):
@@ -107,81 +224,60 @@ def format_mutation_features(df):
     DataFrame
         Contains the same data as `feature_df`, but with columns containing comma-separated lists
         of features converted to columns containing a single feature each.
+        Rows are kept in the same order and with the same index.
 
     """
-    df = df.copy()
-
     # PhysicoChemical properties
     names_phys_chem = ['pcv_salt_equal', 'pcv_salt_opposite', 'pcv_hbond', 'pcv_vdw']
-    for column_index, column_name in enumerate(names_phys_chem):
-        df[column_name + '_wt'] = (
-            df['physchem_wt']
-            .apply(lambda x: float(x.split(',')[column_index]) if pd.notnull(x) else np.nan)
-        )
-        df[column_name + '_self_wt'] = (
-            df['physchem_wt_ownchain']
-            .apply(lambda x: float(x.split(',')[column_index]) if pd.notnull(x) else np.nan)
-        )
-        df[column_name + '_mut'] = (
-            df['physchem_mut']
-            .apply(lambda x: float(x.split(',')[column_index]) if pd.notnull(x) else np.nan)
-        )
-        df[column_name + '_self_mut'] = (
-            df['physchem_mut_ownchain']
-            .apply(lambda x: float(x.split(',')[column_index]) if pd.notnull(x) else np.nan)
-        )
-    del df['physchem_wt']
-    del df['physchem_wt_ownchain']
-    del df['physchem_mut']
-    del df['physchem_mut_ownchain']
+    df = _split_packed_columns(df, [
+        ('physchem_wt', [c + '_wt' for c in names_phys_chem]),
+        ('physchem_wt_ownchain', [c + '_self_wt' for c in names_phys_chem]),
+        ('physchem_mut', [c + '_mut' for c in names_phys_chem]),
+        ('physchem_mut_ownchain', [c + '_self_mut' for c in names_phys_chem]),
+    ])
 
     # Secondary structure
     for col in df.columns:
         if 'secondary_structure' in col:
-            df[col] = (
-                df[col]
-                .apply(lambda x: float(secondary_structure_to_int[x]) if pd.notnull(x) else np.nan)
-            )
+            df[col] = df[col].map(secondary_structure_to_int).astype(float)
 
     # FoldX
-    result = []
-
     foldx_core_column_name = 'stability_energy'
     foldx_interface_column_name = 'analyse_complex_energy'
 
-    # Check to see if we have any interface mutations
-    if ((foldx_interface_column_name + '_wt') in df.columns and
-            df[(foldx_interface_column_name + '_wt')].notnull().any()):
-
-        # Parse FoldX interface features
-        df_interface = df[df[(foldx_interface_column_name + '_wt')].notnull()]
-        df_interface = _split_foldx_features(
-            df_interface,
-            foldx_interface_column_name + '_wt',
-            call_foldx.names_stability_complex_wt)
-        df_interface = _split_foldx_features(
-            df_interface,
-            foldx_interface_column_name + '_mut',
-            call_foldx.names_stability_complex_mut)
-        result.append(df_interface)
-
-        df_core = df[df[(foldx_interface_column_name + '_wt')].isnull()]
-
+    # Interface mutations are described by the FoldX AnalyseComplex features,
+    # and core mutations by the FoldX Stability features
+    if (foldx_interface_column_name + '_wt') in df.columns:
+        is_interface = df[foldx_interface_column_name + '_wt'].notnull()
+    else:
+        is_interface = pd.Series(False, index=df.index)
+
+    foldx_core_df = df[[foldx_core_column_name + '_wt', foldx_core_column_name + '_mut']].copy()
+    foldx_core_df[is_interface] = np.nan
+    foldx_core_df = _split_packed_columns(foldx_core_df, [
+        (foldx_core_column_name + '_wt', call_foldx.names_stability_wt),
+        (foldx_core_column_name + '_mut', call_foldx.names_stability_mut),
+    ])
+    df = df.drop([foldx_core_column_name + '_wt', foldx_core_column_name + '_mut'], axis=1)
+
+    if is_interface.any():
+        foldx_interface_df = _split_packed_columns(
+            df[[foldx_interface_column_name + '_wt', foldx_interface_column_name + '_mut']], [
+                (foldx_interface_column_name + '_wt', call_foldx.names_stability_complex_wt),
+                (foldx_interface_column_name + '_mut', call_foldx.names_stability_complex_mut),
+            ])
+        df = df.drop(
+            [foldx_interface_column_name + '_wt', foldx_interface_column_name + '_mut'], axis=1)
+        foldx_df = foldx_interface_df.combine_first(foldx_core_df).reindex(df.index)
+        foldx_df = foldx_df[
+            [c for c in foldx_interface_df.columns] +
+            [c for c in foldx_core_df.columns if c not in foldx_interface_df.columns]
+        ]
     else:
-        df_core = df
-
-    # Parse FoldX core features
-    df_core = _split_foldx_features(
-        df_core,
-        foldx_core_column_name + '_wt',
-        call_foldx.names_stability_wt)
-    df_core = _split_foldx_features(
-        df_core,
-        foldx_core_column_name + '_mut',
-        call_foldx.names_stability_mut)
-    result.append(df_core)
-
-    result_df = pd.concat(result, ignore_index=True)
+        foldx_df = foldx_core_df
+
+    result_df = pd.concat(
+        [df.drop([c for c in foldx_df.columns if c in df.columns], axis=1), foldx_df], axis=1)
     assert result_df.shape[0] == df.shape[0]
 
     return result_df
@@ -203,7 +299,7 @@ def convert_features_to_differences(df, keep_mut=False):
                 column_list.append(column)
             new_column = column - df[column_name.replace('_mut', '_wt')]
             if 'secondary_structure' in column_name:
-                new_column = new_column.apply(lambda x: 1 if x else 0)
+                new_column = (new_column != 0).astype(int)
             new_column.name = column_name.replace('_mut', '_change')
             column_list.append(new_column)
         else:
@@ -250,15 +346,7 @@ WHERE (mut.uniprot_id, mut.mutation) in ({values})
 
     # Format alignment features
     results_df = pd.read_sql_query(sql_query, engine)
-    results_df['alignment_identity'] = (
-        np.sqrt(results_df['identical_1'] * results_df['identical_2'])
-    )
-    results_df['alignment_coverage'] = (
-        np.sqrt(results_df['coverage_1'] * results_df['coverage_2'])
-    )
-    results_df['alignment_score'] = (
-        np.sqrt(results_df['score_1'] * results_df['score_2'])
-    )
+    results_df = _add_interface_alignment_features(results_df)
 
     # Format predictor features
     results_df = format_mutation_features(results_df)
@@ -268,6 +356,62 @@ WHERE (mut.uniprot_id, mut.mutation) in ({values})
     return results_df
 
 
+def _add_interface_alignment_features(df):
+    """Combine the alignment statistics of both domains in a domain pair."""
+    df['alignment_identity'] = np.sqrt(df['identical_1'] * df['identical_2'])
+    df['alignment_coverage'] = np.sqrt(df['coverage_1'] * df['coverage_2'])
+    df['alignment_score'] = np.sqrt(df['score_1'] * df['score_2'])
+    return df
+
+
+def score_features(df, core_or_interface, data_dir=CACHE_DIR):
+    """Predict the ddG of mutations described by precomputed features.
+
+    Parameters
+    ----------
+    df : DataFrame
+        A pandas DataFrame containing a subset of rows from the :ref:`uniprot_domain_mutation`
+        or the :ref:`uniprot_domain_pair_mutation` tables (or any other table containing
+        the same columns).
+    core_or_interface : str
+        Whether to use the 'core' or the 'interface' classifier.
+
+    Returns
+    -------
+    Series
+        Predicted ddG values, with the same index as `df`.
+        Mutations that are missing some of the required features are assigned a ddG of NaN.
+    """
+    core_or_interface = _get_core_or_interface(core_or_interface)
+    clf = get_classifier(core_or_interface, data_dir)
+    ddg = pd.Series(np.nan, index=df.index, name='ddg')
+
+    if core_or_interface == 'core':
+        # Make sure that all mutations are parsed as core mutations
+        df = df.drop(
+            [c for c in df.columns if c.startswith('analyse_complex_energy')], axis=1)
+    else:
+        df = df[df['analyse_complex_energy_wt'].notnull()].copy()
+        if 'alignment_identity' not in df.columns and 'identical_1' in df.columns:
+            df = _add_interface_alignment_features(df)
+    if df.empty:
+        return ddg
+
+    feature_df = format_mutation_features(df)
+    feature_df = convert_features_to_differences(feature_df)
+    feature_df.index = df.index
+
+    is_usable = feature_df[clf.features].notnull().all(axis=1)
+    if not is_usable.all():
+        logger.warning(
+            '{} mutations are missing some of the required features and will not be scored!'
+            .format((~is_usable).sum()))
+    ddg[is_usable[is_usable].index] = (
+        predict_batch(feature_df[is_usable], core_or_interface, data_dir)
+    )
+    return ddg
+
+
 def get_final_predictor(data, features, options):
     """Train a predictor using the entire dataset."""
     CLF = sklearn.ensemble.GradientBoostingRegressor
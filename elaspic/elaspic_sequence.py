@@ -3,13 +3,19 @@ import os
 import os.path as op
 import requests
 import psutil
-import time
 import shutil
+import tempfile
 import logging
 import atexit
+import functools
+import signal
 import subprocess
+import threading
 import shlex
 import six
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
 
 from Bio import SeqIO
 from Bio.Seq import Seq
@@ -22,6 +28,9 @@ logger = logging.getLogger(__name__)
 
 CANONICAL_AMINO_ACIDS = 'ARNDCEQGHILKMFPSTWYV'
 
+# Seconds to wait for a process group to exit after SIGTERM, before sending SIGKILL
+KILL_TIMEOUT = 10
+
 
 # %% Sequence tools
 def download_uniport_sequence(uniprot_id, output_dir):
@@ -43,6 +52,75 @@ def download_uniport_sequence(uniprot_id, output_dir):
         return output_file
 
 
+def get_saturation_mutations(sequence, positions=None):
+    """Return all substitutions of the residues in `sequence` by canonical amino acids.
+
+    Parameters
+    ----------
+    sequence : str
+        Protein sequence.
+    positions : list, optional
+        Positions that should be mutated (starting from 1). Defaults to all positions.
+        Non-canonical residues are skipped.
+
+    Returns
+    -------
+    list
+        Mutations in sequence coordinates, ordered by position (e.g. ``['M1A', 'M1R', ...]``).
+    """
+    if positions is None:
+        positions = range(1, len(sequence) + 1)
+    mutations = []
+    for position in positions:
+        if not 1 <= position <= len(sequence):
+            raise ValueError("Position {} is outside of the sequence (length {})".format(
+                position, len(sequence)))
+        wt_aa = sequence[position - 1]
+        if wt_aa not in CANONICAL_AMINO_ACIDS:
+            continue
+        mutations.extend(
+            '{}{}{}'.format(wt_aa, position, mut_aa)
+            for mut_aa in CANONICAL_AMINO_ACIDS if mut_aa != wt_aa)
+    return mutations
+
+
+def get_mutation_matrix(sequence, mutation_scores, positions=None):
+    """Arrange scores of single amino acid substitutions into a position × amino acid matrix.
+
+    Parameters
+    ----------
+    sequence : str
+        Protein sequence.
+    mutation_scores : dict
+        Maps mutations in sequence coordinates (e.g. ``'M1A'``) to their scores.
+    positions : list, optional
+        Positions to include in the matrix (starting from 1).
+        Defaults to all positions with at least one score.
+
+    Returns
+    -------
+    DataFrame
+        Has one row for every position, with the 'position' and the wildtype amino acid
+        ('wt'), followed by one column for every canonical amino acid. The score of the
+        wildtype amino acid is zero, and substitutions without a score are NaN.
+    """
+    amino_acids = sorted(CANONICAL_AMINO_ACIDS)
+    if positions is None:
+        positions = sorted({int(mutation[1:-1]) for mutation in mutation_scores})
+    rows = []
+    for position in positions:
+        wt_aa = sequence[position - 1]
+        row = [position, wt_aa]
+        for mut_aa in amino_acids:
+            if mut_aa == wt_aa:
+                row.append(0.0)
+            else:
+                row.append(mutation_scores.get(
+                    '{}{}{}'.format(wt_aa, position, mut_aa), np.nan))
+        rows.append(row)
+    return pd.DataFrame(rows, columns=['position', 'wt'] + amino_acids)
+
+
 def convert_basestring_to_seqrecord(sequence, sequence_id='id'):
     if any([isinstance(sequence, string_type) for string_type in six.string_types]):
         seqrec = SeqRecord(Seq(sequence), id=str(sequence_id))
@@ -55,6 +133,25 @@ def convert_basestring_to_seqrecord(sequence, sequence_id='id'):
     return seqrec
 
 
+@functools.lru_cache()
+def get_blast_db_id(blast_db_dir, db_name='nr'):
+    """Identify the version of the BLAST database `db_name` in `blast_db_dir`.
+
+    The identifier is the hash of the alias file and of the names and sizes of all
+    database volumes, so it changes whenever the database is updated.
+    """
+    if blast_db_dir is None or not op.isdir(blast_db_dir):
+        return None
+    db_files = []
+    for filename in sorted(os.listdir(blast_db_dir)):
+        if filename.startswith(db_name + '.'):
+            db_files.append((filename, os.stat(op.join(blast_db_dir, filename)).st_size))
+    alias_file = op.join(blast_db_dir, db_name + '.pal')
+    if op.isfile(alias_file):
+        return helper.get_hash(alias_file, db_files=db_files)
+    return helper.get_hash(db_files=db_files)
+
+
 # %%
 class Sequence:
     """Class for calculating sequence level features."""
@@ -83,11 +180,14 @@ class Sequence:
         if provean_supset_file is not None and provean_supset_file != self.provean_supset_file:
             shutil.copy(provean_supset_file, self.provean_supset_file)
             shutil.copy(provean_supset_file, self.provean_supset_file + '.fasta')
-        if not self.provean_supset_exists:
+        if self.provean_supset_exists:
+            logger.debug('Provean supset is already calculated!')
+        elif self._load_cached_provean_supset():
+            logger.debug('Using cached provean supset: {}'.format(self.provean_supset_key))
+        else:
             logger.debug('Calculating provean supset...')
             self._build_provean_supset()
-        else:
-            logger.debug('Provean supset is already calculated!')
+            self._cache_provean_supset()
         self.provean_supset_length = self._get_provean_supset_length()
 
         # Mutations
@@ -96,19 +196,42 @@ class Sequence:
     def mutate(self, mutation):
         if mutation in self.mutations:
             return self.mutations[mutation]
+        return self.mutate_many([mutation])[0]
 
-        if mutation[0] != self.sequence[int(mutation[1:-1]) - 1]:
-            logger.error('sequence: {}'.format(self.sequence))
-            logger.error('mutation: {}'.format(mutation))
-            raise errors.MutationMismatchError()
+    def mutate_many(self, mutations):
+        """Evaluate many mutations, scoring all of them using a single PROVEAN run.
 
-        results = dict(
-            protein_id=self.protein_id,
-            mutation=mutation,
-            provean_score=self.run_provean(mutation),
-            matrix_score=self.score_pairwise(mutation[0], mutation[-1])
-        )
-        return results
+        Parameters
+        ----------
+        mutations : list
+            List of mutations in sequence coordinates (e.g. ``['M1A', 'Q2W']``).
+
+        Returns
+        -------
+        list
+            The results of each mutation, in the same order as `mutations`.
+            Results are also stored in ``self.mutations``.
+        """
+        for mutation in mutations:
+            if mutation[0] != self.sequence[int(mutation[1:-1]) - 1]:
+                logger.error('sequence: {}'.format(self.sequence))
+                logger.error('mutation: {}'.format(mutation))
+                raise errors.MutationMismatchError()
+
+        new_mutations = [
+            mutation for mutation in OrderedDict.fromkeys(mutations)
+            if mutation not in self.mutations
+        ]
+        if new_mutations:
+            provean_scores = self.run_provean_many(new_mutations)
+            for mutation in new_mutations:
+                self.mutations[mutation] = dict(
+                    protein_id=self.protein_id,
+                    mutation=mutation,
+                    provean_score=provean_scores[mutation],
+                    matrix_score=self.score_pairwise(mutation[0], mutation[-1])
+                )
+        return [self.mutations[mutation] for mutation in mutations]
 
     @property
     def provean_supset_file(self):
@@ -117,6 +240,57 @@ class Sequence:
             helper.slugify(self.protein_id + '_provean_supset')
         )
 
+    @property
+    def provean_supset_key(self):
+        """Key of the Provean supporting set in the `provean_supset_cache_dir` cache.
+
+        Depends only on the protein sequence, the BLAST database, and the versions of the
+        programs used to build the supporting set.
+        """
+        return helper.get_hash(
+            sequence=self.sequence,
+            blast_db=get_blast_db_id(conf.CONFIGS.get('blast_db_dir')),
+            psiblast=helper.get_version('psiblast'),
+            cd_hit=helper.get_version('cd-hit'))
+
+    @property
+    def provean_supset_cache(self):
+        cache_dir = conf.CONFIGS.get('provean_supset_cache_dir')
+        if not cache_dir:
+            return None
+        return helper.FileCache(
+            cache_dir, max_size=conf.CONFIGS['provean_supset_cache_size'] * 1024 ** 2)
+
+    def _load_cached_provean_supset(self):
+        """Copy the Provean supporting set for this sequence from the cache, if it is there.
+
+        Returns
+        -------
+        bool
+            ``True`` if the supporting set was found in the cache and ``False`` otherwise.
+        """
+        cache = self.provean_supset_cache
+        if cache is None:
+            return False
+        key = self.provean_supset_key
+        return (
+            cache.copy(key, 'provean_supset', self.provean_supset_file) and
+            cache.copy(key, 'provean_supset.fasta', self.provean_supset_file + '.fasta')
+        )
+
+    def _cache_provean_supset(self, replace=False):
+        """Publish the Provean supporting set of this sequence to the cache."""
+        cache = self.provean_supset_cache
+        if cache is None or not self.provean_supset_exists:
+            return
+        key = self.provean_supset_key
+        if replace:
+            cache.remove(key)
+        cache.put(key, {
+            'provean_supset': self.provean_supset_file,
+            'provean_supset.fasta': self.provean_supset_file + '.fasta',
+        })
+
     @property
     def provean_supset_exists(self):
         return (
@@ -138,7 +312,7 @@ class Sequence:
         )
         return result
 
-    def _build_provean_supset(self, mutation=None):
+    def _build_provean_supset(self, mutations=None):
         """
         """
         logger.debug('Building Provean supporting set. This might take a while...')
@@ -149,14 +323,14 @@ class Sequence:
         while self.sequence[any_position] not in CANONICAL_AMINO_ACIDS:
             any_position += 1
         first_aa = self.sequence[any_position]
-        if mutation is None:
-            mutation = '{0}{1}{0}'.format(first_aa, any_position + 1)
+        if mutations is None:
+            mutations = ['{0}{1}{0}'.format(first_aa, any_position + 1)]
 
         # Run provean
-        provean_score = self._run_provean(
-            mutation, save_supporting_set=True, check_mem_usage=True
+        provean_scores = self._run_provean(
+            mutations, save_supporting_set=True, check_mem_usage=True
         )
-        return provean_score
+        return provean_scores
 
     def _get_provean_supset_length(self):
         provean_supset_length = 0
@@ -167,12 +341,22 @@ class Sequence:
         return provean_supset_length
 
     def run_provean(self, mutation, *args, **kwargs):
+        return self.run_provean_many([mutation], *args, **kwargs)[mutation]
+
+    def run_provean_many(self, mutations, *args, **kwargs):
+        """Score `mutations` using a single PROVEAN run.
+
+        Returns
+        -------
+        dict
+            Maps every mutation in `mutations` to its PROVEAN score.
+        """
         n_tries = 0
-        provean_score = None
+        provean_scores = None
         while n_tries < 5:
             n_tries += 1
             try:
-                provean_score = self._run_provean(mutation, *args, **kwargs)
+                provean_scores = self._run_provean(mutations, *args, **kwargs)
                 break
             except errors.ProveanError as e:
                 bad_ids = re.findall("Entry not found in BLAST database: '(.*)'", e.args[0])
@@ -187,12 +371,13 @@ class Sequence:
                             provean_supset_data.append(line)
                 with open(self.provean_supset_file, 'wt') as ofh:
                     ofh.writelines(provean_supset_data)
-        if provean_score is None:
+        if provean_scores is None:
             # Recalculate provean supporting set
-            provean_score = self._build_provean_supset(mutation)
-        return provean_score
+            provean_scores = self._build_provean_supset(mutations)
+            self._cache_provean_supset(replace=True)
+        return provean_scores
 
-    def _run_provean(self, mutation, save_supporting_set=False, check_mem_usage=False):
+    def _run_provean(self, mutations, save_supporting_set=False, check_mem_usage=False):
         """.
 
         Provean results look something like this::
@@ -210,17 +395,18 @@ class Sequence:
             ### PROVEAN scores ##
             ## VARIATION	SCORE
             #M1A	-6.000
+            #Q2W	-2.000
 
         Parameters
         ----------
-        domain_mutation : string
-            Mutation in domain coordinates (i.e. relative to the start of the domain)
+        mutations : list
+            Mutations in sequence coordinates. All of them are scored by a single
+            PROVEAN process.
 
         Returns
         -------
-        list
-            [result, error_message, return_code] --
-            The output from running a provean system command.
+        dict
+            Maps every mutation in `mutations` to its PROVEAN score.
 
         Raises
         ------
@@ -243,14 +429,17 @@ class Sequence:
                     'Not enough memory ({:.2f} GB) to run provean'
                     .format(memory_availible))
 
-        # Create a file with mutation
-        mutation_file = op.join(conf.CONFIGS['sequence_dir'], '{}.var'.format(mutation))
-        with open(mutation_file, 'w') as ofh:
-            ofh.write(mutation)
+        # Create a file with all mutations, one per line
+        # (file names must be unique because several processes can share `sequence_dir`)
+        fd, mutation_file = tempfile.mkstemp(
+            prefix='{}_'.format(self.protein_id), suffix='.var',
+            dir=conf.CONFIGS['sequence_dir'])
+        with os.fdopen(fd, 'w') as ofh:
+            ofh.write('\n'.join(mutations) + '\n')
 
         # Run provean
         system_command = (
-            "provean " +
+            helper.get_executable('provean') +
             " -q '{}' ".format(self.sequence_file) +
             " -v '{}' ".format(mutation_file) +
             " -d " + op.join(conf.CONFIGS['blast_db_dir'], 'nr') +
@@ -268,60 +457,57 @@ class Sequence:
             system_command += " --save_supporting_set '{}' ".format(self.provean_supset_file)
 
         logger.debug(system_command)
+        # Provean gets its own process group, so that it can be terminated together
+        # with the psiblast and cd-hit processes that it spawns
         p = subprocess.Popen(
             shlex.split(system_command),
             cwd=conf.CONFIGS['sequence_dir'],
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            universal_newlines=True
+            universal_newlines=True,
+            start_new_session=True,
         )
-
-        logger.debug('Parent group id: {}'.format(os.getpgrp()))
-        child_process_group_id = os.getpgid(p.pid)
+        child_process_group_id = p.pid
         logger.debug('Child group id: {}'.format(child_process_group_id))
 
         # Keep an eye on provean to make sure it doesn't do anything crazy
-        time.sleep(5)
-        while check_mem_usage and p.poll() is None:
-            disk_space_availible_now = (
-                psutil.disk_usage(conf.CONFIGS['provean_temp_dir']).free / float(1024)**3
-            )
-            if disk_space_availible_now < 5:  # less than 5 GB of free disk space left
-                raise errors.ProveanResourceError(
-                    'Ran out of disk space and provean had to be terminated ({} GB used)'
-                    .format(disk_space_availible - disk_space_availible_now),
-                    child_process_group_id)
-            memory_availible_now = (
-                psutil.virtual_memory().available / float(1024)**3
-            )
-            if memory_availible_now < 0.5:
-                raise errors.ProveanResourceError(
-                    'Ran out of RAM and provean had to be terminated ({} GB left)'
-                    .format(memory_availible - memory_availible_now),
-                    child_process_group_id)
-            time.sleep(60)  # Wait for 1 minute before checking again
-
-        # Collect the results and check for errors
-        stdout, stderr = p.communicate()
+        monitor = None
+        if check_mem_usage:
+            monitor = ResourceMonitor(
+                child_process_group_id, conf.CONFIGS['provean_temp_dir'],
+                disk_space_availible, memory_availible)
+            monitor.start()
+
+        # Collect the results (as soon as provean exits) and check for errors
+        try:
+            stdout, stderr = p.communicate()
+        finally:
+            if monitor is not None:
+                monitor.stop()
+            if p.poll() is None:
+                _kill_process_group(child_process_group_id)
+                try:
+                    p.wait(timeout=KILL_TIMEOUT)
+                except subprocess.TimeoutExpired:
+                    _kill_process_group(child_process_group_id, signal.SIGKILL)
+                    p.wait()
+            os.remove(mutation_file)
+        if monitor is not None and monitor.error is not None:
+            raise monitor.error
         stdout = stdout.strip()
         stderr = stderr.strip()
         logger.debug(stdout)
 
-        # Extract provean score from the results message
-        provean_score = None
-        result_list = stdout.split('\n')
-        for i in range(len(result_list)):
-            if re.findall('# VARIATION\s*SCORE', result_list[i]):
-                provean_score = float(result_list[i + 1].split()[-1])
-                break
+        # Extract provean scores from the results message
+        provean_scores = _parse_provean_scores(stdout)
 
-        if p.returncode != 0 or provean_score is None:
+        if p.returncode != 0 or any(mutation not in provean_scores for mutation in mutations):
             logger.error('return_code: {}'.format(p.returncode))
-            logger.error('provean_score: {}'.format(provean_score))
+            logger.error('provean_scores: {}'.format(provean_scores))
             logger.error('error_message: {}'.format(stderr))
             raise errors.ProveanError(stderr)
 
-        return provean_score
+        return provean_scores
 
     # === Other sequence scores ===
 
@@ -358,6 +544,116 @@ class Sequence:
             return matrix_match[pair_match]
 
 
+class ResourceMonitor(threading.Thread):
+    """Terminate a process group if it is about to run out of disk space or memory.
+
+    Resources are checked in a background thread, first every `min_interval` seconds and
+    then progressively less often, up to every `max_interval` seconds.
+
+    Parameters
+    ----------
+    process_group_id : int
+        Process group to terminate.
+    disk_dir : str
+        Folder on the disk which is being monitored.
+    disk_space_availible : float
+        Free disk space in `disk_dir` when the process was started, in GB.
+    memory_availible : float
+        Available memory when the process was started, in GB.
+    min_disk_space : float
+        Terminate the process group when there is less than this much free disk space, in GB.
+    min_memory : float
+        Terminate the process group when there is less than this much available memory, in GB.
+    kill_timeout : float
+        Kill the process group if it is still running this many seconds after
+        it was asked to terminate.
+
+    Attributes
+    ----------
+    error : errors.ProveanResourceError | None
+        The reason why the process group was terminated.
+    """
+
+    def __init__(
+            self, process_group_id, disk_dir, disk_space_availible, memory_availible,
+            min_disk_space=5, min_memory=0.5, min_interval=0.1, max_interval=10,
+            kill_timeout=KILL_TIMEOUT):
+        super().__init__(daemon=True)
+        self.process_group_id = process_group_id
+        self.disk_dir = disk_dir
+        self.disk_space_availible = disk_space_availible
+        self.memory_availible = memory_availible
+        self.min_disk_space = min_disk_space
+        self.min_memory = min_memory
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.kill_timeout = kill_timeout
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        interval = self.min_interval
+        while not self._stop_event.wait(interval):
+            self.error = self.check_resources()
+            if self.error is not None:
+                logger.error(self.error)
+                _kill_process_group(self.error.child_process_group_id)
+                # `stop` is called once the process group has exited
+                if not self._stop_event.wait(self.kill_timeout):
+                    _kill_process_group(self.error.child_process_group_id, signal.SIGKILL)
+                return
+            interval = min(interval * 2, self.max_interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def check_resources(self):
+        """Return a :class:`errors.ProveanResourceError` if we are running out of resources."""
+        disk_space_availible_now = psutil.disk_usage(self.disk_dir).free / float(1024)**3
+        if disk_space_availible_now < self.min_disk_space:
+            return errors.ProveanResourceError(
+                'Ran out of disk space and provean had to be terminated ({} GB used)'
+                .format(self.disk_space_availible - disk_space_availible_now),
+                self.process_group_id)
+        memory_availible_now = psutil.virtual_memory().available / float(1024)**3
+        if memory_availible_now < self.min_memory:
+            return errors.ProveanResourceError(
+                'Ran out of RAM and provean had to be terminated ({} GB left)'
+                .format(self.memory_availible - memory_availible_now),
+                self.process_group_id)
+        return None
+
+
+def _kill_process_group(process_group_id, sig=signal.SIGTERM):
+    try:
+        os.killpg(process_group_id, sig)
+    except ProcessLookupError:
+        pass
+
+
+def _parse_provean_scores(provean_output):
+    """Parse the VARIATION / SCORE table printed by PROVEAN.
+
+    Returns
+    -------
+    OrderedDict
+        Maps each variation to its PROVEAN score.
+    """
+    provean_scores = OrderedDict()
+    result_list = provean_output.split('\n')
+    for i in range(len(result_list)):
+        if re.findall(r'# VARIATION\s*SCORE', result_list[i]):
+            for line in result_list[i + 1:]:
+                row = line.split()
+                try:
+                    provean_scores[row[0].lstrip('#')] = float(row[1])
+                except (IndexError, ValueError):
+                    break
+            break
+    return provean_scores
+
+
 def _clear_provean_temp():
     provean_temp_dir = conf.CONFIGS['provean_temp_dir']
     logger.info("Clearning provean temporary files from '{}'...".format(provean_temp_dir))
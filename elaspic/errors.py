@@ -98,6 +98,11 @@ class MutationOutsideInterfaceError(Exception):
     pass
 
 
+# Predicting ddG
+class PredictorError(Exception):
+    pass
+
+
 # Database
 class Archive7zipError(Exception):
     def __init__(self, result, error_message, return_code):
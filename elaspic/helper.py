@@ -1,4 +1,6 @@
 import os
+import os.path as op
+import re
 import sys
 import shlex
 import shutil
@@ -7,6 +9,11 @@ import logging
 import json
 import string
 import functools
+import hashlib
+import tempfile
+import socket
+import threading
+from collections import namedtuple, OrderedDict
 from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
@@ -75,11 +82,138 @@ def run(system_command, **vargs):
 
 
 def get_hostname():
-    return run('hostname | cut -d. -f1').stdout
+    return socket.gethostname().split('.')[0]
 
 
 def get_which(bin_name):
-    return run('which ' + bin_name).stdout
+    """Return the full path to the program `bin_name`, or an empty string if it is not found."""
+    return TOOLS.get(bin_name).path or ''
+
+
+def get_executable(bin_name):
+    """Return the program that should be called in place of `bin_name` in a system command."""
+    return TOOLS.get(bin_name).path or bin_name
+
+
+def get_version(bin_name):
+    """Return the version string of the program `bin_name`, or ``None`` if it is not known."""
+    return TOOLS.get(bin_name).version
+
+
+# External tools
+Tool = namedtuple('Tool', ['name', 'path', 'version'])
+
+#: Arguments which make each external program print its version.
+TOOL_VERSION_ARGS = OrderedDict([
+    ('foldx', ['--version']),
+    ('provean', ['--version']),
+    ('psiblast', ['-version']),
+    ('blastdbcmd', ['-version']),
+    ('cd-hit', ['-h']),
+    ('msms', ['-h']),
+    ('pdb_to_xyzrn', None),
+    ('stride', ['-h']),
+    ('pops', ['--version']),
+    ('t_coffee', ['-version']),
+    ('7za', []),
+])
+
+
+class ToolRegistry:
+    """Paths and versions of the external programs used by ELASPIC.
+
+    Each program is looked up in :envvar:`PATH` and probed for its version only once.
+    If `cache_dir` is set, the results are also saved to a file in that folder, keyed by
+    the value of :envvar:`PATH`, so that they can be reused by other processes.
+    A cached program is probed again if its executable has been modified.
+
+    Parameters
+    ----------
+    cache_dir : str, optional
+        Folder in which to save the paths and versions of the programs.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self._tools = {}
+        self._cached_tools = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_file(self):
+        if not self.cache_dir:
+            return None
+        path_hash = hashlib.sha256(os.environ.get('PATH', '').encode('utf-8')).hexdigest()
+        return op.join(self.cache_dir, 'tools_{}.json'.format(path_hash[:16]))
+
+    def get(self, name):
+        """Return the :class:`Tool` for program `name`."""
+        with self._lock:
+            if name not in self._tools:
+                self._tools[name] = self._resolve(name)
+            return self._tools[name]
+
+    def clear(self):
+        """Forget all resolved programs (e.g. after :envvar:`PATH` is changed)."""
+        with self._lock:
+            self._tools = {}
+            self._cached_tools = None
+
+    def _resolve(self, name):
+        path = shutil.which(name)
+        if path is None:
+            logger.debug("Program '{}' was not found!".format(name))
+            return Tool(name, None, None)
+        mtime = os.stat(path).st_mtime
+        cached_tools = self._read_cache()
+        cached_tool = cached_tools.get(name)
+        if cached_tool and cached_tool['path'] == path and cached_tool['mtime'] == mtime:
+            return Tool(name, path, cached_tool['version'])
+        version = self._probe_version(name, path)
+        logger.debug("Found program '{}' ({}): {}".format(name, version, path))
+        cached_tools[name] = dict(path=path, mtime=mtime, version=version)
+        self._write_cache(cached_tools)
+        return Tool(name, path, version)
+
+    def _probe_version(self, name, path):
+        version_args = TOOL_VERSION_ARGS.get(name)
+        if version_args is None:
+            return None
+        try:
+            p = subprocess.run(
+                [path] + version_args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT, universal_newlines=True, timeout=10)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.debug("Could not get the version of program '{}': {}".format(name, e))
+            return None
+        for line in p.stdout.split('\n'):
+            if re.search(r'\d+\.\d+', line):
+                return line.strip()[:200]
+        return None
+
+    def _read_cache(self):
+        if self._cached_tools is None:
+            self._cached_tools = {}
+            if self.cache_file is not None:
+                try:
+                    with open(self.cache_file) as ifh:
+                        self._cached_tools = json.load(ifh)
+                except (OSError, ValueError):
+                    pass
+        return self._cached_tools
+
+    def _write_cache(self, cached_tools):
+        if self.cache_file is None:
+            return
+        try:
+            with atomic_open(self.cache_file) as ofh:
+                json.dump(cached_tools, ofh, indent=4, sort_keys=True)
+        except OSError as e:
+            logger.debug("Could not save the tool cache file: {}".format(e))
+
+
+#: Programs used by all modules (the cache folder is set by :mod:`elaspic.conf`).
+TOOLS = ToolRegistry()
 
 
 # Retry
@@ -134,6 +268,144 @@ def makedirs(path, mode=None, exist_ok=True):
             os.umask(original_umask)
 
 
+@contextmanager
+def atomic_open(filename, mode='w'):
+    """Open a temporary file which replaces `filename` once it is closed.
+
+    Other processes reading `filename` never see a partially written file.
+    """
+    fd, temp_filename = tempfile.mkstemp(
+        prefix='.' + op.basename(filename) + '.', dir=op.dirname(op.abspath(filename)))
+    try:
+        with os.fdopen(fd, mode) as fh:
+            yield fh
+        os.chmod(temp_filename, 0o644)
+        os.replace(temp_filename, filename)
+    except BaseException:
+        if op.isfile(temp_filename):
+            os.remove(temp_filename)
+        raise
+
+
+# Content-addressed cache
+def get_hash(*filenames, **options):
+    """Calculate the SHA-256 hash of the contents of `filenames` and of keyword `options`."""
+    sha256 = hashlib.sha256()
+    for filename in filenames:
+        with open(filename, 'rb') as ifh:
+            for chunk in iter(functools.partial(ifh.read, 1024 * 1024), b''):
+                sha256.update(chunk)
+    sha256.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+    return sha256.hexdigest()
+
+
+class FileCache:
+    """A folder which stores files under content-based keys.
+
+    Each cache entry is a subfolder of `cache_dir` named after its key.
+    Entries are written to a temporary folder first and then renamed, so that
+    several processes can share the same cache. Once the total size of the cache
+    exceeds `max_size` bytes, the least recently used entries are removed.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Folder in which the cache entries are stored.
+    max_size : int, optional
+        Maximum size of the cache, in bytes. Unlimited if ``None``.
+    """
+
+    def __init__(self, cache_dir, max_size=None):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get(self, key):
+        """Return the folder of the entry for `key`, or ``None`` if there is no such entry."""
+        entry_dir = op.join(self.cache_dir, key)
+        try:
+            # Update the modification time, which is used to evict old entries
+            os.utime(entry_dir)
+        except FileNotFoundError:
+            return None
+        return entry_dir
+
+    def copy(self, key, filename, output_file):
+        """Copy `filename` from the entry for `key` to `output_file`.
+
+        Returns
+        -------
+        bool
+            ``True`` if the file was found in the cache and ``False`` otherwise.
+        """
+        entry_dir = self.get(key)
+        if entry_dir is None:
+            return False
+        try:
+            shutil.copyfile(op.join(entry_dir, filename), output_file)
+        except FileNotFoundError:
+            # The entry was evicted by another process
+            return False
+        return True
+
+    def put(self, key, filenames):
+        """Store copies of `filenames` in the entry for `key`.
+
+        Parameters
+        ----------
+        key : str
+            Key of the new entry.
+        filenames : list | dict
+            List of files to store, or a dictionary mapping names inside the entry
+            to the files that should be stored under those names.
+
+        Returns
+        -------
+        entry_dir : str
+            The folder of the new entry.
+        """
+        entry_dir = op.join(self.cache_dir, key)
+        temp_dir = tempfile.mkdtemp(prefix='.{}.'.format(key), dir=self.cache_dir)
+        try:
+            if not isinstance(filenames, dict):
+                filenames = {op.basename(filename): filename for filename in filenames}
+            for name, filename in filenames.items():
+                shutil.copyfile(filename, op.join(temp_dir, name))
+            os.rename(temp_dir, entry_dir)
+        except OSError:
+            # Another process has already created this entry
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            if not op.isdir(entry_dir):
+                raise
+        self.evict()
+        return entry_dir
+
+    def remove(self, key):
+        """Remove the entry for `key`, if it exists."""
+        shutil.rmtree(op.join(self.cache_dir, key), ignore_errors=True)
+
+    def evict(self):
+        """Remove the least recently used entries until the cache is smaller than `max_size`."""
+        if self.max_size is None:
+            return
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.startswith('.') or not entry.is_dir():
+                continue
+            try:
+                size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                entries.append((entry.stat().st_mtime, size, entry.path))
+            except FileNotFoundError:
+                continue
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            logger.debug("Removing cache entry '{}'...".format(entry_dir))
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_size -= size
+
+
 # Locks
 def lock(fn):
     """Allow only a single instance of function `fn`, and save results to a lock file."""
@@ -4,18 +4,21 @@ TODO: The model object has two serialization steps:
     1. Inside the modeller class to save modeller results.
     2. In the local_pipeline to save all results.
 """
+import os
 import os.path as op
 import logging
 import json
-import pickle
+import concurrent.futures
+from collections import OrderedDict, Counter
 
+import numpy as np
 import pandas as pd
 from Bio import SeqIO
 from Bio.Seq import Seq
 from Bio.SeqRecord import SeqRecord
 
 from . import (
-    CACHE_DIR, conf, helper, errors, structure_tools, elaspic_sequence,
+    conf, helper, errors, structure_tools, elaspic_sequence,
     elaspic_model, elaspic_predictor
 )
 from .pipeline import Pipeline, execute_and_remember
@@ -47,26 +50,33 @@ class StandalonePipeline(Pipeline):
         3. {sequence_pos}_{sequence_mutation}...
 
         If `sequence_file` is None, this does not matter (always {pdb_chain}_{pdb_mutation}).
+    n_jobs : int, default 1
+        Number of worker processes to use for building models and evaluating mutations.
 
-    .. todo:: Add an option to store provean results based on sequence hash.
+    Provean supporting sets are stored in the `provean_supset_cache_dir` folder, keyed by
+    the hash of the sequence, so that they are reused by other jobs.
     """
 
     def __init__(
             self, structure_file, sequence_file=None, mutations=None, configurations=None,
-            mutation_format=None, run_type='5'):
+            mutation_format=None, run_type='5', n_jobs=1):
         super().__init__(configurations)
 
         # Input parameters
         self.pdb_id = op.splitext(op.basename(structure_file))[0]
         self.pdb_file = structure_file
         self.run_type = self._validate_run_type(run_type)
+        self.n_jobs = n_jobs
 
         logger.info('pdb_file: {}'.format(self.pdb_file))
         logger.info('pwd: {}'.format(self.PWD))
 
         # Load PDB structure and extract required sequences and chains.
         # fix_pdb(self.pdb_file, self.pdb_file)
-        self.sp = structure_tools.StructureParser(self.pdb_file)
+        self.sp = structure_tools.StructureParser(
+            self.pdb_file,
+            cache_dir=conf.CONFIGS['structure_cache_dir'],
+            cache_size=conf.CONFIGS['structure_cache_size'] * 1024 ** 2)
         self.sp.extract()
         self.sp.save_structure(conf.CONFIGS['unique_temp_dir'])
         self.sp.save_sequences(conf.CONFIGS['unique_temp_dir'])
@@ -184,6 +194,13 @@ class StandalonePipeline(Pipeline):
             mutations_out[(mutation_idx, mutation,)] = mutation_in
         return mutations_out
 
+    def __getstate__(self):
+        # Worker processes load sequences and models from files (see `_init_worker`)
+        state = self.__dict__.copy()
+        state['sequences'] = {}
+        state['models'] = {}
+        return state
+
     # === Run methods ===
 
     def run(self):
@@ -235,6 +252,8 @@ class StandalonePipeline(Pipeline):
             logger.debug(
                 'Results file for model already exists: %s', self.model_results_file)
             return
+        if self.n_jobs > 1:
+            self._build_models_in_parallel()
         for chain_id, _ in zip(self.sp.chain_ids, self.seqrecords):
             if chain_id == self.sp.hetatm_chain_id:
                 continue
@@ -260,6 +279,36 @@ class StandalonePipeline(Pipeline):
         with open(self.model_results_file, 'w') as ofh:
             json.dump(model_results, ofh)
 
+    def _build_models_in_parallel(self):
+        """Build the models for all chains and interacting chain pairs using `n_jobs` processes.
+
+        The models are stored in ``self.models``, where they are found by :meth:`get_model`.
+        """
+        model_idxs = [
+            self._sort_chain_idxs(self._get_chain_idx(chain_id))
+            for chain_id, _ in zip(self.sp.chain_ids, self.seqrecords)
+            if chain_id != self.sp.hetatm_chain_id
+        ]
+        model_idxs += [
+            self._sort_chain_idxs(idxs) for idxs in self.sp.interacting_chain_idxs
+            if all(i in range(len(self.seqrecords)) for i in idxs)
+        ]
+        model_idxs = [idxs for idxs in model_idxs if idxs not in self.models]
+        if len(model_idxs) < 2:
+            return
+        logger.info('Building {} models using {} processes...'.format(
+            len(model_idxs), self.n_jobs))
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.n_jobs,
+                initializer=_init_worker,
+                initargs=(conf.CONFIGS, self)) as executor:
+            futures = {
+                executor.submit(_run_model_in_worker, idxs): idxs
+                for idxs in model_idxs
+            }
+            for future in concurrent.futures.as_completed(futures):
+                self.models[futures[future]] = future.result()
+
     def get_mutation_results_file(self, mutation):
         """All mutations have been precalculated."""
         return op.join(conf.CONFIGS['unique_temp_dir'], 'mutation_{}.json'.format(mutation))
@@ -277,41 +326,274 @@ class StandalonePipeline(Pipeline):
             errors.MutationOutsideDomainError,
             errors.MutationOutsideInterfaceError,
         )
-        for (mutation_idx, mutation), mutation_in in self.mutations.items():
-            mutation_results = []
-            mutation_results_file = self.get_mutation_results_file(mutation_in)
-            if op.isfile(mutation_results_file):
-                logger.debug(
-                    'Results file for mutation {} already exists: {}'
-                    .format(mutation_in, mutation_results_file)
-                )
-                continue
+        mutations = OrderedDict(
+            (key, mutation_in) for key, mutation_in in self.mutations.items()
+            if not op.isfile(self.get_mutation_results_file(mutation_in))
+        )
+        # Score all mutations of each sequence using a single PROVEAN run
+        self._mutate_sequences(mutations)
+        if self.n_jobs > 1 and len(mutations) > 1:
+            self._run_mutations_in_parallel(mutations)
+            return
+        # Introduce all mutations into each model using a pool of FoldX workers,
+        # and save the results of each mutation as soon as all of its models are done
+        model_mutations = self._group_mutations_by_model(mutations)
+        mutation_results = OrderedDict((key, []) for key in mutations)
+        num_remaining_models = Counter(
+            (idxs[model_idx], mutation)
+            for idxs, model_mutation_list in model_mutations.items()
+            for model_idx, mutation in model_mutation_list
+        )
+
+        def finish_model(key):
+            num_remaining_models[key] -= 1
+            if num_remaining_models[key] == 0:
+                self._save_mutation_results(mutations[key], mutation_results[key])
+
+        for idxs, model_mutation_list in model_mutations.items():
             try:
-                mutation_result = self.get_mutation_score(mutation_idx, mutation_idx, mutation)
+                model = self.get_model(idxs)
             except handled_errors as e:
                 logger.error(e)
+                model = None
+            finished_mutations = set()
+            if model is not None:
+                for (model_idx, mutation), results in model.mutate_many(model_mutation_list):
+                    key = (idxs[model_idx], mutation)
+                    mutation_result = score_mutation(
+                        self.get_sequence(key[0]).mutate(mutation), model, model_idx, results)
+                    mutation_result['idx'] = key[0]
+                    if len(idxs) > 1:
+                        mutation_result['idxs'] = idxs
+                    mutation_results[key].append(mutation_result)
+                    finished_mutations.add((model_idx, mutation))
+                    finish_model(key)
+            # Mutations that could not be introduced into this model
+            for model_idx, mutation in model_mutation_list:
+                if (model_idx, mutation) not in finished_mutations:
+                    finish_model((idxs[model_idx], mutation))
+
+    def _save_mutation_results(self, mutation_in, mutation_results):
+        """Save the results of a mutation in all models, core model first.
+
+        Like :meth:`run_mutation`, nothing is saved if the mutation could not be evaluated
+        in the core model.
+        """
+        if not any('idxs' not in mutation_result for mutation_result in mutation_results):
+            logger.error('Could not evaluate mutation {} in the core model!'.format(mutation_in))
+            return
+        mutation_results = sorted(
+            mutation_results, key=lambda mutation_result: mutation_result.get('idxs', ()))
+        with open(self.get_mutation_results_file(mutation_in), 'w') as ofh:
+            json.dump(mutation_results, ofh)
+        logger.debug('Finished evaluating mutation {}'.format(mutation_in))
+
+    def run_mutation(self, mutation_idx, mutation, mutation_in):
+        """Evaluate a single mutation in all models and save the results."""
+        handled_errors = (
+            errors.ChainsNotInteractingError,
+            errors.MutationOutsideDomainError,
+            errors.MutationOutsideInterfaceError,
+        )
+        mutation_results = []
+        mutation_results_file = self.get_mutation_results_file(mutation_in)
+        try:
+            mutation_result = self.get_mutation_score(mutation_idx, mutation_idx, mutation)
+        except handled_errors as e:
+            logger.error(e)
+            return
+        mutation_result['idx'] = mutation_idx
+        mutation_results.append(mutation_result)
+        for idxs in self.sp.interacting_chain_idxs:
+            if not all(i in range(len(self.seqrecords)) for i in idxs):
+                warning = (
+                    "Skipping idxs: '{}' because we lack the corresponding seqrecord!"
+                    .format(idxs)
+                )
+                logger.warning(warning)
                 continue
-            mutation_result['idx'] = mutation_idx
-            mutation_results.append(mutation_result)
-            for idxs in self.sp.interacting_chain_idxs:
-                if not all(i in range(len(self.seqrecords)) for i in idxs):
-                    warning = (
-                        "Skipping idxs: '{}' because we lack the corresponding seqrecord!"
-                        .format(idxs)
-                    )
-                    logger.warning(warning)
+            if mutation_idx in idxs:
+                try:
+                    mutation_result = self.get_mutation_score(idxs, mutation_idx, mutation)
+                except handled_errors as e:
+                    logger.error(e)
+                    continue
+                mutation_result['idx'] = mutation_idx
+                mutation_result['idxs'] = tuple(idxs)
+                mutation_results.append(mutation_result)
+        with open(mutation_results_file, 'w') as ofh:
+            json.dump(mutation_results, ofh)
+
+    def run_scan(self, chain_ids=None, positions=None, output_dir=None):
+        """Evaluate all substitutions of every residue (saturation mutagenesis).
+
+        For each mutated chain, all mutations are scored by a single PROVEAN run,
+        substitutions of the same residue are introduced by a single FoldX `BuildModel` run
+        (see :meth:`elaspic_model.Model.mutate_position`), and the ddG of all mutations
+        in a model is predicted at once.
+
+        Parameters
+        ----------
+        chain_ids : list, optional
+            Chains that should be mutated. Defaults to all protein chains.
+        positions : list, optional
+            Positions that should be mutated, in sequence coordinates (starting from 1).
+            Defaults to all positions.
+        output_dir : str, optional
+            Folder in which to save the ddG matrices. Defaults to `unique_temp_dir`.
+
+        Returns
+        -------
+        ddg_matrices : OrderedDict
+            Maps the chain idxs of each model to a position × amino acid matrix of
+            predicted ddG values (see :func:`elaspic_sequence.get_mutation_matrix`).
+            Each matrix is also saved to `output_dir` as ``scan_{chains}.tsv``.
+        """
+        if output_dir is None:
+            output_dir = conf.CONFIGS['unique_temp_dir']
+        os.makedirs(output_dir, exist_ok=True)
+        if self.n_jobs > 1:
+            self._build_models_in_parallel()
+        if chain_ids is None:
+            chain_ids = [
+                chain_id for chain_id, _ in zip(self.sp.chain_ids, self.seqrecords)
+                if chain_id != self.sp.hetatm_chain_id
+            ]
+        ddg_matrices = OrderedDict()
+        for chain_id in chain_ids:
+            mutation_idx = self._get_chain_idx(chain_id)
+            sequence = self.get_sequence(mutation_idx)
+            mutations = elaspic_sequence.get_saturation_mutations(sequence.sequence, positions)
+            logger.info('Scanning {} mutations in chain {}...'.format(len(mutations), chain_id))
+            sequence_results = OrderedDict(zip(mutations, sequence.mutate_many(mutations)))
+
+            all_idxs = [(mutation_idx, )] + [
+                idxs for idxs in self.sp.interacting_chain_idxs
+                if mutation_idx in idxs and all(i in range(len(self.seqrecords)) for i in idxs)
+            ]
+            for idxs in all_idxs:
+                idxs = self._sort_chain_idxs(idxs)
+                try:
+                    model = self.get_model(idxs)
+                except errors.ChainsNotInteractingError as e:
+                    logger.error(e)
+                    continue
+                if model is None:
+                    continue
+                model_idx = idxs.index(mutation_idx)
+                features_list = [
+                    get_mutation_features(sequence_results[mutation], model, model_idx, results)
+                    for (_, mutation), results
+                    in model.mutate_many([(model_idx, mutation) for mutation in mutations])
+                ]
+                if not features_list:
                     continue
-                if mutation_idx in idxs:
-                    try:
-                        mutation_result = self.get_mutation_score(idxs, mutation_idx, mutation)
-                    except handled_errors as e:
-                        logger.error(e)
-                        continue
-                    mutation_result['idx'] = mutation_idx
-                    mutation_result['idxs'] = tuple(idxs)
-                    mutation_results.append(mutation_result)
-            with open(mutation_results_file, 'w') as ofh:
-                json.dump(mutation_results, ofh)
+                feature_df = pd.DataFrame(features_list)
+                feature_df = elaspic_predictor.format_mutation_features(feature_df)
+                feature_df = elaspic_predictor.convert_features_to_differences(feature_df)
+                # Mutations that are missing some features get a ddG of NaN,
+                # so that they do not prevent the other mutations from being scored
+                clf = elaspic_predictor.get_classifier(model.core_or_interface)
+                is_usable = feature_df[clf.features].notnull().all(axis=1).values
+                if not is_usable.all():
+                    logger.warning(
+                        '{} mutations are missing some of the required features '
+                        'and will not be scored!'.format((~is_usable).sum()))
+                ddgs = np.full(len(feature_df), np.nan)
+                if is_usable.any():
+                    ddgs[is_usable] = elaspic_predictor.predict_batch(
+                        feature_df[is_usable], model.core_or_interface)
+                ddg_matrix = elaspic_sequence.get_mutation_matrix(
+                    sequence.sequence,
+                    {features['mutation']: ddg for features, ddg in zip(features_list, ddgs)},
+                    sorted({int(mutation[1:-1]) for mutation in mutations}))
+                if not self.sequence_file:
+                    # Sequences were extracted from the PDB, so we also know residue ids
+                    resnums = self.sp.chain_numbering_extended_dict[chain_id]
+                    ddg_matrix.insert(
+                        1, 'resnum', [resnums[pos - 1] for pos in ddg_matrix['position']])
+                chains = ''.join(self.sp.chain_ids[idx] for idx in idxs)
+                ddg_matrix.insert(0, 'chain', chain_id)
+                ddg_matrix_file = op.join(
+                    output_dir, 'scan_{}.tsv'.format(chains if len(idxs) == 1 else
+                                                     chain_id + '_' + chains))
+                ddg_matrix.to_csv(ddg_matrix_file, sep='\t', index=False)
+                logger.info('Saved ddG matrix to {}'.format(ddg_matrix_file))
+                ddg_matrices[idxs] = ddg_matrix
+        return ddg_matrices
+
+    def _run_mutations_in_parallel(self, mutations):
+        """Evaluate `mutations` using a pool of `n_jobs` worker processes.
+
+        Sequences (including their PROVEAN scores, see :meth:`_mutate_sequences`) and models
+        are prepared in this process first. The workers do not share the memory of this
+        process, so they load them from the files saved by :class:`elaspic_sequence.Sequence`
+        and :class:`elaspic_model.Model` (see :func:`_init_worker`).
+        """
+        sequence_files = OrderedDict()
+        for mutation_idx, _ in mutations:
+            if mutation_idx not in sequence_files:
+                sequence = self.get_sequence(mutation_idx)
+                sequence_files[mutation_idx] = (sequence.sequence_file, sequence.mutations)
+        model_files = OrderedDict()
+        for idxs in self._group_mutations_by_model(mutations):
+            try:
+                model = self.get_model(idxs)
+            except errors.ChainsNotInteractingError as e:
+                logger.error(e)
+                continue
+            if model is not None:
+                # Populates the FoldX repair cache shared by all workers
+                model.repair_model()
+                model_files[idxs] = (
+                    model.sequence_file, model.structure_file, model.modeller_results_file)
+        logger.info('Evaluating {} mutations using {} processes...'.format(
+            len(mutations), self.n_jobs))
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.n_jobs,
+                initializer=_init_worker,
+                initargs=(conf.CONFIGS, self, sequence_files, model_files)) as executor:
+            futures = {
+                executor.submit(_run_mutation_in_worker, mutation_idx, mutation, mutation_in):
+                mutation_in
+                for (mutation_idx, mutation), mutation_in in mutations.items()
+            }
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+                logger.debug('Finished evaluating mutation {}'.format(futures[future]))
+
+    def _mutate_sequences(self, mutations):
+        """Evaluate the sequence features of `mutations`, one sequence at a time.
+
+        The results are stored in the :class:`elaspic_sequence.Sequence` instances returned by
+        :meth:`get_sequence`, so that :class:`PrepareMutation` does not have to run PROVEAN.
+        """
+        sequence_mutations = OrderedDict()
+        for mutation_idx, mutation in mutations:
+            sequence_mutations.setdefault(mutation_idx, []).append(mutation)
+        for mutation_idx, mutation_list in sequence_mutations.items():
+            sequence = self.get_sequence(mutation_idx)
+            sequence.mutate_many(mutation_list)
+
+    def _group_mutations_by_model(self, mutations):
+        """Group mutations by the chain idxs of the models into which they are introduced.
+
+        Returns
+        -------
+        model_mutations : OrderedDict
+            ``{idxs: [(sequence_idx, mutation), ...]}``, where `sequence_idx` is the
+            position of the mutated chain in the model.
+        """
+        model_mutations = OrderedDict()
+        for mutation_idx, mutation in mutations:
+            all_idxs = [(mutation_idx, )] + [
+                idxs for idxs in self.sp.interacting_chain_idxs
+                if mutation_idx in idxs and all(i in range(len(self.seqrecords)) for i in idxs)
+            ]
+            for idxs in all_idxs:
+                idxs = self._sort_chain_idxs(idxs)
+                model_mutations.setdefault(idxs, []).append((idxs.index(mutation_idx), mutation))
+        return model_mutations
 
     # === Get methods ===
 
@@ -320,6 +602,8 @@ class StandalonePipeline(Pipeline):
         """
         logger.debug('-' * 80)
         logger.debug('get_sequence({})'.format(idx))
+        if idx in self.sequences:
+            return self.sequences[idx]
         return PrepareSequence(self.seqrecords, idx, None)
 
     def get_model(self, idxs):
@@ -327,6 +611,8 @@ class StandalonePipeline(Pipeline):
         logger.debug('-' * 80)
         logger.debug('get_model({})'.format(idxs))
         idxs = self._sort_chain_idxs(idxs)
+        if idxs in self.models:
+            return self.models[idxs]
         return PrepareModel(self.seqrecords, self.sp, idxs)
 
     def get_mutation_score(self, idxs, mutation_idx, mutation):
@@ -363,6 +649,63 @@ class StandalonePipeline(Pipeline):
         return idxs
 
 
+# Worker processes
+_worker_pipeline = None
+
+
+def _init_worker(configs, pipeline, sequence_files=None, model_files=None):
+    """Initialize a process that builds models or evaluates mutations.
+
+    Each worker gets its own scratch folders for the tools that do not run
+    inside the mutation folder.
+
+    Parameters
+    ----------
+    configs : dict
+        Configuration options of the main process.
+    pipeline : StandalonePipeline
+        Pipeline that is being run.
+    sequence_files : dict, optional
+        ``{idx: (sequence_file, sequence_results)}``, where `sequence_results` are the
+        precalculated results of :meth:`elaspic_sequence.Sequence.mutate_many`.
+    model_files : dict, optional
+        ``{idxs: (sequence_file, structure_file, modeller_results_file)}`` for every
+        model that was built by the main process.
+    """
+    global _worker_pipeline
+    conf.CONFIGS.update(configs)
+    _set_scratch_dirs('worker_{}'.format(os.getpid()))
+    # Reload sequences and models from their files, so that the worker does not depend on
+    # the memory it may (fork) or may not (spawn, forkserver) inherit from the main process
+    for idx, (sequence_file, sequence_results) in (sequence_files or {}).items():
+        sequence = elaspic_sequence.Sequence(sequence_file)
+        sequence.mutations.update(sequence_results)
+        pipeline.sequences[idx] = sequence
+    for idxs, (sequence_file, structure_file, modeller_results_file) in (
+            (model_files or {}).items()):
+        pipeline.models[idxs] = elaspic_model.Model(
+            sequence_file, structure_file, modeller_results_file)
+    _worker_pipeline = pipeline
+
+
+def _set_scratch_dirs(name):
+    """Point `tcoffee_dir` and `modeller_dir` to subfolders of `model_dir/{name}`."""
+    scratch_dir = op.join(conf.CONFIGS['model_dir'], name)
+    for key in ['tcoffee_dir', 'modeller_dir']:
+        conf.CONFIGS[key] = op.join(scratch_dir, op.basename(conf.CONFIGS[key]))
+        os.makedirs(conf.CONFIGS[key], exist_ok=True)
+
+
+def _run_model_in_worker(idxs):
+    # T-Coffee and MODELLER write files with fixed names, so every model gets its own folders
+    _set_scratch_dirs('job_{}'.format('_'.join(str(idx) for idx in idxs)))
+    return _worker_pipeline.get_model(idxs)
+
+
+def _run_mutation_in_worker(mutation_idx, mutation, mutation_in):
+    _worker_pipeline.run_mutation(mutation_idx, mutation, mutation_in)
+
+
 @execute_and_remember
 class PrepareSequence:
     """.
@@ -386,7 +729,7 @@ class PrepareSequence:
         sequence_file = op.join(
             conf.CONFIGS['sequence_dir'],
             helper.slugify(self.seqrecord.id + '.fasta'))
-        with open(sequence_file, 'w') as ofh:
+        with helper.atomic_open(sequence_file) as ofh:
             SeqIO.write(self.seqrecord, ofh, 'fasta')
         self.sequence_file = sequence_file
 
@@ -435,7 +778,7 @@ class PrepareModel:
             conf.CONFIGS['model_dir'],
             helper.slugify('_'.join(seqrec.id for seqrec in self.seqrecords) + '.fasta')
         )
-        with open(self.sequence_file, 'w') as ofh:
+        with helper.atomic_open(self.sequence_file) as ofh:
             SeqIO.write(self.seqrecords, ofh, 'fasta')
         assert op.isfile(self.sequence_file)
 
@@ -464,6 +807,107 @@ class PrepareModel:
         return self.model
 
 
+def get_mutation_features(sequence_results, model, mutation_idx, model_results):
+    """Combine the sequence and the structure features of a mutation.
+
+    Parameters
+    ----------
+    sequence_results : dict
+        Results returned by :meth:`elaspic_sequence.Sequence.mutate`.
+    model : elaspic_model.Model
+        Model into which the mutation was introduced.
+    mutation_idx : int
+        Position of the mutated chain in `model`.
+    model_results : dict
+        Results returned by :meth:`elaspic_model.Model.mutate`.
+
+    Returns
+    -------
+    features : dict
+        Features of the mutation, which can be used to predict its ddG.
+    """
+    features = dict()
+    features['mutation'] = sequence_results['mutation']
+
+    # Sequence features
+    features['provean_score'] = sequence_results['provean_score']
+    features['matrix_score'] = sequence_results['matrix_score']
+
+    # Structure features
+    features['norm_dope'] = model.modeller_results['norm_dope']
+    (features['alignment_identity'],
+     features['alignment_coverage'],
+     features['alignment_score']) = (
+         model.modeller_results['alignment_stats'][mutation_idx]
+    )
+    assert features['alignment_identity'] > 0.01 and features['alignment_identity'] <= 1
+    assert features['alignment_coverage'] > 0.01 and features['alignment_coverage'] <= 1
+
+    features['model_file_wt'] = model_results['model_file_wt']
+    features['model_file_mut'] = model_results['model_file_mut']
+
+    features['stability_energy_wt'] = model_results['stability_energy_wt']
+    features['stability_energy_mut'] = model_results['stability_energy_mut']
+
+    features['physchem_wt'] = (
+        '{},{},{},{}'.format(*model_results['physchem_wt'])
+    )
+    features['physchem_wt_ownchain'] = (
+        '{},{},{},{}'.format(*model_results['physchem_ownchain_wt'])
+    )
+    features['physchem_mut'] = (
+        '{},{},{},{}'.format(*model_results['physchem_mut'])
+    )
+    features['physchem_mut_ownchain'] = (
+        '{},{},{},{}'.format(*model_results['physchem_ownchain_mut'])
+    )
+
+    features['secondary_structure_wt'] = model_results['secondary_structure_wt']
+    features['solvent_accessibility_wt'] = model_results['solvent_accessibility_wt']
+    features['secondary_structure_mut'] = model_results['secondary_structure_mut']
+    features['solvent_accessibility_mut'] = model_results['solvent_accessibility_mut']
+
+    # new additions
+    features['mutation_errors'] = model_results['mutation_errors']
+    features['chain_modeller'] = model_results['chain_modeller']
+    features['mutation_modeller'] = model_results['mutation_modeller']
+
+    if len(model.sequence_seqrecords) > 1:
+        features['interface_area_hydrophobic'] = model.interface_area_hydrophobic
+        features['interface_area_hydrophilic'] = model.interface_area_hydrophilic
+        features['interface_area_total'] = model.interface_area_total
+
+        features['analyse_complex_energy_wt'] = model_results['analyse_complex_energy_wt']
+        features['analyse_complex_energy_mut'] = model_results['analyse_complex_energy_mut']
+        features['contact_distance_wt'] = model_results['contact_distance_wt']
+        features['contact_distance_mut'] = model_results['contact_distance_mut']
+    return features
+
+
+def score_mutation(sequence_results, model, mutation_idx, model_results):
+    """Predict the ddG of a mutation.
+
+    Takes the same parameters as :func:`get_mutation_features`.
+
+    Returns
+    -------
+    features : dict
+        Features of the mutation, together with the predicted 'ddg'.
+    """
+    features = get_mutation_features(sequence_results, model, mutation_idx, model_results)
+
+    logger.debug('feature_dict: {}'.format(features))
+    feature_df = pd.DataFrame(features, index=[0])
+    feature_df = elaspic_predictor.format_mutation_features(feature_df)
+    feature_df = elaspic_predictor.convert_features_to_differences(feature_df)
+
+    features['ddg'] = (
+        elaspic_predictor.predict_batch(feature_df, model.core_or_interface)[0]
+    )
+    logger.info('Predicted ddG: {}'.format(features['ddg']))
+    return features
+
+
 @execute_and_remember
 class PrepareMutation:
     """.
@@ -495,80 +939,11 @@ class PrepareMutation:
         if not self.sequence or not self.model:
             raise errors.ChainsNotInteractingError
 
-        features = dict()
-        features['mutation'] = self.mutation
-
-        # Sequence features
-        results = self.sequence.mutate(self.mutation)
-        features['provean_score'] = results['provean_score']
-        features['matrix_score'] = results['matrix_score']
-
-        # Structure features
-        results = self.model.mutate(self.mutation_idx, self.mutation)
-
-        features['norm_dope'] = self.model.modeller_results['norm_dope']
-        (features['alignment_identity'],
-         features['alignment_coverage'],
-         features['alignment_score']) = (
-             self.model.modeller_results['alignment_stats'][self.mutation_idx]
-        )
-        assert features['alignment_identity'] > 0.01 and features['alignment_identity'] <= 1
-        assert features['alignment_coverage'] > 0.01 and features['alignment_coverage'] <= 1
-
-        features['model_file_wt'] = results['model_file_wt']
-        features['model_file_mut'] = results['model_file_mut']
-
-        features['stability_energy_wt'] = results['stability_energy_wt']
-        features['stability_energy_mut'] = results['stability_energy_mut']
-
-        features['physchem_wt'] = (
-            '{},{},{},{}'.format(*results['physchem_wt'])
-        )
-        features['physchem_wt_ownchain'] = (
-            '{},{},{},{}'.format(*results['physchem_ownchain_wt'])
-        )
-        features['physchem_mut'] = (
-            '{},{},{},{}'.format(*results['physchem_mut'])
-        )
-        features['physchem_mut_ownchain'] = (
-            '{},{},{},{}'.format(*results['physchem_ownchain_mut'])
-        )
-
-        features['secondary_structure_wt'] = results['secondary_structure_wt']
-        features['solvent_accessibility_wt'] = results['solvent_accessibility_wt']
-        features['secondary_structure_mut'] = results['secondary_structure_mut']
-        features['solvent_accessibility_mut'] = results['solvent_accessibility_mut']
-
-        # new additions
-        features['mutation_errors'] = results['mutation_errors']
-        features['chain_modeller'] = results['chain_modeller']
-        features['mutation_modeller'] = results['mutation_modeller']
-
-        if len(self.model.sequence_seqrecords) > 1:
-            features['interface_area_hydrophobic'] = self.model.interface_area_hydrophobic
-            features['interface_area_hydrophilic'] = self.model.interface_area_hydrophilic
-            features['interface_area_total'] = self.model.interface_area_total
-
-            features['analyse_complex_energy_wt'] = results['analyse_complex_energy_wt']
-            features['analyse_complex_energy_mut'] = results['analyse_complex_energy_mut']
-            features['contact_distance_wt'] = results['contact_distance_wt']
-            features['contact_distance_mut'] = results['contact_distance_mut']
-
-        logger.debug('feature_dict: {}'.format(features))
-        feature_df = pd.DataFrame(features, index=[0])
-        feature_df = elaspic_predictor.format_mutation_features(feature_df)
-        feature_df = elaspic_predictor.convert_features_to_differences(feature_df)
-
-        if len(self.model.sequence_seqrecords) == 1:
-            with open(op.join(CACHE_DIR, 'core_clf.pickle'), 'rb') as fh:
-                clf = pickle.load(fh)
-        else:
-            with open(op.join(CACHE_DIR, 'interface_clf.pickle'), 'rb') as fh:
-                clf = pickle.load(fh)
-        features['ddg'] = clf.predict(feature_df[clf.features])[0]
-        logger.info('Predicted ddG: {}'.format(features['ddg']))
-
-        self.mutation_features = features
+        self.mutation_features = score_mutation(
+            self.sequence.mutate(self.mutation),
+            self.model,
+            self.mutation_idx,
+            self.model.mutate(self.mutation_idx, self.mutation))
 
     def __exit__(self, exc_type, exc_value, traceback):
         return False
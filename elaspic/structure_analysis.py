@@ -2,10 +2,15 @@ import os
 import os.path as op
 import logging
 import tempfile
+import itertools
+import functools
+import concurrent.futures
 
+import numpy as np
 import pandas as pd
+from scipy.spatial import cKDTree
 
-from . import errors, helper, structure_tools
+from . import conf, errors, helper, structure_tools
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +45,331 @@ STANDARD_SASA_ALL = [
 ]
 STANDARD_SASA = {x[3]: float(x[4]) for x in STANDARD_SASA_ALL}
 
+#: Atom type codes used when counting atomic contacts
+ATOM_TYPES = {
+    'ignore': 0,
+    'charged_plus': 1,
+    'charged_minus': 2,
+    'polar': 3,
+    'carbon': 4,
+}
+#: Label of positively charged atoms (in ARG and LYS)
+CHARGED_PLUS_ATOMS = {'NH1', 'NH2', 'NZ'}
+#: Label of negatively charged atoms (in ASP and GLU)
+CHARGED_MINUS_ATOMS = {'OD1', 'OD2', 'OE1', 'OE2'}
+#: Label of polar atoms
+POLAR_ATOMS = {
+    'OG', 'OG1', 'OD1', 'OD2', 'ND1', 'OE1', 'NE', 'NE1', 'NE2', 'ND1', 'ND2', 'SG', 'OH', 'O', 'N'
+}
+#: Label of main chain atoms (ignored in the mutated residue)
+MAIN_CHAIN_ATOMS = {'CA', 'C', 'N', 'O'}
+
+#: Van der Waals radii of atoms, by element (similar to the NACCESS ``vdw.radii`` file)
+VDW_RADII = {'C': 1.87, 'N': 1.65, 'O': 1.40, 'S': 1.85, 'P': 1.90, 'SE': 1.90}
+#: Van der Waals radius of the main chain carbonyl carbon
+CARBONYL_CARBON_RADIUS = 1.76
+#: Van der Waals radius of atoms of other elements
+DEFAULT_VDW_RADIUS = 1.80
+#: Radius of the water probe used to calculate SASA
+PROBE_RADIUS = 1.4
+#: Number of test points placed on the surface of every atom when calculating SASA
+SASA_N_POINTS = 200
+#: Per-atom values that are summed over residues and chains
+SEASA_VALUE_COLUMNS = ['atom_num', 'abs_sesa', 'abs_sasa', 'rel_sasa']
+#: Elements of atoms that are hydrophobic when calculating the interface area
+HYDROPHOBIC_ELEMENTS = {'C', 'S'}
+
+
+def get_sasa_shrake_rupley(coords, radii, probe_radius=PROBE_RADIUS, n_points=SASA_N_POINTS):
+    """Calculate the solvent accessible surface area of every atom.
+
+    Uses the Shrake-Rupley algorithm: `n_points` test points are placed on the
+    surface of every atom (inflated by `probe_radius`), and the points that are
+    not buried inside any other atom are counted.
+
+    Parameters
+    ----------
+    coords : array_like
+        Atom coordinates, with shape ``(n_atoms, 3)``.
+    radii : array_like
+        Van der Waals radius of every atom.
+
+    Returns
+    -------
+    sasa : ndarray
+        Solvent accessible surface area of every atom, in square angstroms.
+    """
+    coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+    radii = np.asarray(radii, dtype=float) + probe_radius
+    if not len(coords):
+        return np.zeros(0)
+    sphere_points = _get_sphere_points(n_points)
+
+    # Pairs of overlapping atoms, in both directions, sorted by the first atom
+    pairs = cKDTree(coords).query_pairs(2 * radii.max(), output_type='ndarray')
+    idx_1 = np.r_[pairs[:, 0], pairs[:, 1]]
+    idx_2 = np.r_[pairs[:, 1], pairs[:, 0]]
+    vectors = coords[idx_2] - coords[idx_1]
+    distances = np.sqrt((vectors**2).sum(axis=1))
+    keep = (distances > 0) & (distances < radii[idx_1] + radii[idx_2])
+    order = np.argsort(idx_1[keep], kind='stable')
+    idx_1, idx_2, vectors, distances = (
+        x[keep][order] for x in [idx_1, idx_2, vectors, distances])
+
+    # Point `u` on the sphere of atom 1 is inside the sphere of atom 2 if the angle
+    # between `u` and the vector from atom 1 to atom 2 is small enough
+    cos_thresholds = (
+        (radii[idx_1]**2 + distances**2 - radii[idx_2]**2) / (2 * radii[idx_1] * distances)
+    )
+    is_buried = np.zeros((len(coords), n_points), dtype=bool)
+    chunk_size = max(1, 2**22 // n_points)
+    for start in range(0, len(idx_1), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        buried = (
+            (vectors[chunk] / distances[chunk, None]) @ sphere_points.T >
+            cos_thresholds[chunk, None]
+        )
+        atom_idxs, first_pair_idxs = np.unique(idx_1[chunk], return_index=True)
+        is_buried[atom_idxs] |= np.logical_or.reduceat(buried, first_pair_idxs, axis=0)
+    exposed_fraction = 1 - is_buried.mean(axis=1)
+    return 4 * np.pi * radii**2 * exposed_fraction
+
+
+def _get_sphere_points(n_points):
+    """Spread `n_points` evenly on the surface of a unit sphere (golden spiral)."""
+    idxs = np.arange(n_points) + 0.5
+    z = 1 - 2 * idxs / n_points
+    r = np.sqrt(1 - z**2)
+    phi = np.pi * (3 - np.sqrt(5)) * idxs
+    return np.column_stack([r * np.cos(phi), r * np.sin(phi), z])
+
+
+def assign_secondary_structure(backbone_coords, chain_idxs, is_proline):
+    """Assign secondary structure using backbone hydrogen bonds, like DSSP.
+
+    Hydrogen bond energies are calculated using the electrostatic model of
+    Kabsch & Sander (1983), and residues are assigned to alpha helices ('H'),
+    3-10 helices ('G'), pi helices ('I'), strands ('E'), isolated bridges ('B'),
+    and turns ('T'). Bends are not assigned, so all other residues are coil ('C'),
+    like in the output of ``stride``.
+
+    Parameters
+    ----------
+    backbone_coords : array_like
+        Coordinates of the N, CA, C and O atoms of every residue, with shape
+        ``(n_residues, 4, 3)``. Missing atoms should be NaN.
+    chain_idxs : array_like
+        Index of the chain of every residue.
+    is_proline : array_like
+        Whether or not every residue is a proline (prolines have no amide hydrogen).
+
+    Returns
+    -------
+    ss_codes : ndarray
+        Secondary structure code of every residue.
+    """
+    backbone_coords = np.asarray(backbone_coords, dtype=float).reshape(-1, 4, 3)
+    chain_idxs = np.asarray(chain_idxs)
+    n_residues = len(backbone_coords)
+    ss_codes = np.full(n_residues, 'C', dtype='<U1')
+    if n_residues == 0:
+        return ss_codes
+    n, ca, c, o = (backbone_coords[:, i, :] for i in range(4))
+
+    # Residues `i` and `i + 1` are linked by a peptide bond
+    with np.errstate(invalid='ignore'):
+        is_linked = (
+            (chain_idxs[1:] == chain_idxs[:-1]) &
+            (np.sqrt(((c[:-1] - n[1:])**2).sum(axis=1)) < 2.5)
+        )
+    fragment_ids = np.r_[0, np.cumsum(~is_linked)]
+
+    def same_fragment(*idxs):
+        idxs = np.array(idxs)
+        if idxs.min() < 0 or idxs.max() >= n_residues:
+            return False
+        return bool((fragment_ids[idxs] == fragment_ids[idxs[0]]).all())
+
+    # Amide hydrogens are placed opposite to the carbonyl oxygen of the previous residue
+    h = np.full_like(n, np.nan)
+    co = c[:-1] - o[:-1]
+    h[1:] = n[1:] + co / np.sqrt((co**2).sum(axis=1))[:, None]
+    h[np.r_[True, ~is_linked] | np.asarray(is_proline, dtype=bool)] = np.nan
+
+    # Hydrogen bonds from the C=O of residue `i` to the N-H of residue `j`
+    has_atoms = np.isfinite(backbone_coords).all(axis=(1, 2))
+    residue_idxs = np.flatnonzero(has_atoms)
+    pairs = residue_idxs[
+        cKDTree(ca[residue_idxs]).query_pairs(9.0, output_type='ndarray')].reshape(-1, 2)
+    idx_1 = np.r_[pairs[:, 0], pairs[:, 1]]
+    idx_2 = np.r_[pairs[:, 1], pairs[:, 0]]
+    keep = (np.abs(idx_1 - idx_2) > 1) & np.isfinite(h[idx_2]).all(axis=1)
+    idx_1, idx_2 = idx_1[keep], idx_2[keep]
+
+    def get_distance(coords_1, coords_2):
+        return np.sqrt(((coords_1 - coords_2)**2).sum(axis=1))
+
+    energies = 0.084 * 332 * (
+        1 / get_distance(o[idx_1], n[idx_2]) + 1 / get_distance(c[idx_1], h[idx_2]) -
+        1 / get_distance(o[idx_1], h[idx_2]) - 1 / get_distance(c[idx_1], n[idx_2])
+    )
+    hbonds = set(zip(idx_1[energies < -0.5].tolist(), idx_2[energies < -0.5].tolist()))
+
+    def is_turn(i, turn_length):
+        return (i, i + turn_length) in hbonds and same_fragment(*range(i, i + turn_length + 1))
+
+    turns = {
+        turn_length: [is_turn(i, turn_length) for i in range(n_residues)]
+        for turn_length in [3, 4, 5]
+    }
+
+    def assign_helices(turn_length, code, overwrite):
+        for i in range(1, n_residues):
+            if not (turns[turn_length][i - 1] and turns[turn_length][i]):
+                continue
+            helix_idxs = range(i, i + turn_length)
+            if overwrite or all(ss_codes[k] == 'C' for k in helix_idxs):
+                ss_codes[list(helix_idxs)] = code
+
+    # Alpha helices have the highest priority
+    assign_helices(4, 'H', True)
+
+    # Bridges between residues `i` and `j` (`i` < `j`), and ladders of consecutive bridges
+    bridge_candidates = set()
+    for (i, j) in hbonds:
+        bridge_candidates.update([(i, j), (j, i), (i + 1, j), (j, i + 1), (i + 1, j - 1)])
+    bridges = []
+    for (i, j) in sorted({tuple(sorted(pair)) for pair in bridge_candidates}):
+        if j - i < 3 or not same_fragment(i - 1, i, i + 1) or not same_fragment(j - 1, j, j + 1):
+            continue
+        if (((i - 1, j) in hbonds and (j, i + 1) in hbonds) or
+                ((j - 1, i) in hbonds and (i, j + 1) in hbonds)):
+            bridges.append((i, j, 'parallel'))
+        elif (((i, j) in hbonds and (j, i) in hbonds) or
+                ((i - 1, j + 1) in hbonds and (j - 1, i + 1) in hbonds)):
+            bridges.append((i, j, 'antiparallel'))
+    ladders = []
+    ladder_ends = {}
+    for (i, j, bridge_type) in bridges:
+        previous_bridge = (i - 1, j - 1 if bridge_type == 'parallel' else j + 1, bridge_type)
+        if previous_bridge in ladder_ends:
+            ladder = ladder_ends.pop(previous_bridge)
+        else:
+            ladder = (bridge_type, [])
+            ladders.append(ladder)
+        ladder[1].append((i, j))
+        ladder_ends[(i, j, bridge_type)] = ladder
+    strand_idxs = set()
+    for _, ladder in ladders:
+        if len(ladder) > 1:
+            for (i, j) in ladder:
+                strand_idxs.update([i, j])
+    # Ladders separated by a bulge (at most 1 and 4 extra residues on the two strands)
+    for (ladder_type_1, ladder_1), (ladder_type_2, ladder_2) in itertools.permutations(ladders, 2):
+        if ladder_type_1 != ladder_type_2:
+            continue
+        gap_i = ladder_2[0][0] - ladder_1[-1][0] - 1
+        if ladder_type_1 == 'parallel':
+            gap_j = ladder_2[0][1] - ladder_1[-1][1] - 1
+        else:
+            gap_j = ladder_1[-1][1] - ladder_2[0][1] - 1
+        if gap_i < 0 or gap_j < 0 or not (
+                (gap_i <= 1 and gap_j <= 4) or (gap_i <= 4 and gap_j <= 1)):
+            continue
+        j_start, j_end = sorted([ladder_1[0][1], ladder_2[-1][1]])
+        strand_idxs.update(range(ladder_1[0][0], ladder_2[-1][0] + 1))
+        strand_idxs.update(range(j_start, j_end + 1))
+    bridge_idxs = {idx for (i, j, _) in bridges for idx in (i, j)}
+    for idx in sorted(strand_idxs | bridge_idxs):
+        if ss_codes[idx] == 'C':
+            ss_codes[idx] = 'E' if idx in strand_idxs else 'B'
+
+    # 3-10 and pi helices are only assigned to residues that are not in other structures
+    assign_helices(3, 'G', False)
+    assign_helices(5, 'I', False)
+
+    # Turns
+    for turn_length in [3, 4, 5]:
+        for i in range(n_residues):
+            if turns[turn_length][i]:
+                for k in range(i + 1, i + turn_length):
+                    if ss_codes[k] == 'C':
+                        ss_codes[k] = 'T'
+
+    return ss_codes
+
+
+def _sum_by_group(df, key_columns, value_columns):
+    """Sum `value_columns` of `df` over groups of rows with the same `key_columns`.
+
+    Equivalent to ``df.groupby(key_columns)[value_columns].sum(min_count=1).reset_index()``,
+    but uses :func:`numpy.bincount`.
+    """
+    group_idxs, groups = pd.MultiIndex.from_arrays(
+        [df[column].values for column in key_columns]).factorize(sort=True)
+    result = pd.DataFrame(list(groups), columns=key_columns)
+    for column in value_columns:
+        values = df[column].values
+        is_valid = ~pd.isnull(values)
+        sums = np.bincount(
+            group_idxs, weights=np.where(is_valid, values, 0), minlength=len(groups))
+        counts = np.bincount(group_idxs, weights=is_valid, minlength=len(groups))
+        if values.dtype.kind in 'iu':
+            result[column] = sums.round().astype(values.dtype)
+        else:
+            result[column] = np.where(counts > 0, sums, np.nan)
+    return result
+
+
+def _run_concurrently(functions, in_threads=True):
+    """Call every function in `functions` in a pool of threads and return their results.
+
+    Used to wait on several external programs at the same time. If `in_threads` is False,
+    for example when the functions are in-process Python / NumPy code that would only
+    compete for the GIL, the functions are called one after another.
+    """
+    if not in_threads or len(functions) < 2:
+        return [fn() for fn in functions]
+    max_workers = min(len(functions), os.cpu_count() or 1)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(fn) for fn in functions]
+        return [future.result() for future in futures]
+
+
+def _get_vdw_radii(atoms):
+    """Van der Waals radius of every atom in a :class:`structure_tools.StructureArray`."""
+    radii = np.array(
+        [VDW_RADII.get(element, DEFAULT_VDW_RADIUS) for element in atoms.elements.tolist()])
+    radii[(atoms.elements == 'C') & (atoms.atom_names == 'C')] = CARBONYL_CARBON_RADIUS
+    return radii
+
+
+def _get_atom_types(atoms):
+    """Atom type code (see :data:`ATOM_TYPES`) of every atom in `atoms`.
+
+    In order to see what "interaction" type two atoms are forming, check the
+    individual label which every atom in every residue has (see pdb file
+    convention for an explanation of the labels).
+    With this label, one can determine which atom of the residue one is looking
+    at, and hence, one can determine which "interaction" two atoms are forming.
+    """
+    # This is based on the naming convention for the atoms in crystalography
+    residue_names = np.char.upper(atoms.residue_names[atoms.residue_idxs])
+    atom_names = atoms.atom_names
+    atom_types = np.full(len(atoms), ATOM_TYPES['ignore'], dtype=np.int8)
+    atom_types[np.char.startswith(atom_names, 'C') | (atom_names == 'SD')] = (
+        ATOM_TYPES['carbon'])
+    atom_types[np.in1d(atom_names, list(POLAR_ATOMS))] = ATOM_TYPES['polar']
+    atom_types[
+        np.in1d(residue_names, ['ASP', 'D', 'GLU', 'E']) &
+        np.in1d(atom_names, list(CHARGED_MINUS_ATOMS))
+    ] = ATOM_TYPES['charged_minus']
+    atom_types[
+        np.in1d(residue_names, ['ARG', 'R', 'LYS', 'K']) &
+        np.in1d(atom_names, list(CHARGED_PLUS_ATOMS))
+    ] = ATOM_TYPES['charged_plus']
+    return atom_types
+
 
 class AnalyzeStructure:
     """Calculate structural properties for a PDB containing one or more chains.
@@ -58,41 +388,44 @@ class AnalyzeStructure:
 
         self._prepare_temp_folder(self.working_dir)
 
-        self.sp = structure_tools.StructureParser(pdb_file)
+        self.sp = structure_tools.StructureParser(
+            pdb_file,
+            cache_dir=conf.CONFIGS.get('structure_cache_dir'),
+            cache_size=conf.CONFIGS.get('structure_cache_size', 1024) * 1024 ** 2)
         self.sp.extract()
         self.sp.save_structure(output_dir=self.working_dir)
 
         self.chain_ids = self.sp.chain_ids
+        #: Array representation of all atoms in the extracted structure
+        self.atoms = structure_tools.StructureArray.from_biopython(self.sp.structure)
+
+        # Per-chain atom arrays, atom types and KD-trees (built lazily)
+        self._chain_atoms = {}
+        self._chain_kdtrees = {}
+        self._atom_types = None
+        self._model_kdtree = None
+        self._seasa = None
+        self._residue_sasa = None
+        self._secondary_structure_df = None
+        self._secondary_structure_codes = None
 
     def _prepare_temp_folder(self, temp_folder):
         os.makedirs(temp_folder, exist_ok=True)
 
     def __call__(self, chain_id, mutation, chain_id_other=None):
         """Calculate all properties."""
-        # Solvent accessibility
-        (seasa_by_chain_together, seasa_by_chain_separately,
-         seasa_by_residue_together, seasa_by_residue_separately) = self.get_seasa()
-        seasa_info = (
-            seasa_by_residue_separately[
-                (seasa_by_residue_separately['pdb_chain'] == chain_id) &
-                (seasa_by_residue_separately['res_num'] == mutation[1:-1])
-            ].iloc[0]
+        # Solvent accessibility and secondary structure (may run external programs)
+        uses_external_programs = (
+            conf.CONFIGS.get('sasa_method', 'shrake_rupley') == 'msms' or
+            conf.CONFIGS.get('secondary_structure_method', 'dssp') == 'stride'
         )
-        self._validate_mutation(seasa_info['res_name'], mutation)
-        solvent_accessibility = seasa_info['rel_sasa']
+        residue_sasa, _ = _run_concurrently(
+            [self.get_residue_sasa, self.get_secondary_structure], uses_external_programs)
+        res_name, solvent_accessibility = residue_sasa[(chain_id, mutation[1:-1])]
+        self._validate_mutation(res_name, mutation)
 
         # Secondary structure
-        secondary_structure_df = self.get_secondary_structure()
-        secondary_structure_df = (
-            secondary_structure_df[
-                (secondary_structure_df.chain == chain_id) &
-                (secondary_structure_df.resnum == mutation[1:-1])
-            ]
-        )
-        assert len(secondary_structure_df) == 1
-        secondary_structure_df = secondary_structure_df.iloc[0]
-        self._validate_mutation(seasa_info['res_name'], mutation)
-        secondary_structure = secondary_structure_df.ss_code
+        secondary_structure = self._secondary_structure_codes[(chain_id, mutation[1:-1])]
 
         # Contact distance
         contact_distance = None
@@ -142,164 +475,167 @@ class AnalyzeStructure:
         chainIDs is a list of strings with the chain identifiers to be used
         if more than two chains are given, the chains not containing the mutation
         are considered as "opposing" chain
-        """
-        model = self.sp.structure[0]
-        mutated_chain = model[chain_id]
-        opposite_chains = [chain for chain in model.child_list if chain.id != chain_id]
-        main_chain_atoms = ['CA', 'C', 'N', 'O']
-
-        # Find the mutated residue (assuming mutation is in resnum)
-        for residue in mutated_chain:
-            if residue.resname in structure_tools.AMINO_ACIDS and not residue.id[0].strip():
-                if str(residue.id[1]) == mutation[1:-1]:
-                    self._validate_mutation(residue.resname, mutation)
-                    mutated_residue = residue
-                    break
-        mutated_atoms = [atom for atom in mutated_residue if atom.name not in main_chain_atoms]
-
-        # Go through each atom in each residue in each partner chain...
-        opposite_chain_contacts = {
-            'equal_charge': [],
-            'opposite_charge': [],
-            'h_bond': [],
-            'carbon_contact': []}
-        for opposite_chain in opposite_chains:
-            for partner_residue in opposite_chain:
-                self._increment_vector(
-                    mutated_residue, mutated_atoms, partner_residue, opposite_chain_contacts)
-
-        # Go through each atom in each residue in the mutated chain...
-        same_chain_contacts = {
-            'equal_charge': [],
-            'opposite_charge': [],
-            'h_bond': [],
-            'carbon_contact': []}
-        for partner_residue in mutated_chain:
-            # Skipping the mutated residue...
-            if partner_residue == mutated_residue:
-                continue
-            self._increment_vector(
-                mutated_residue, mutated_atoms, partner_residue, same_chain_contacts)
 
-        opposite_chain_contact_vector = [
-            len(opposite_chain_contacts['equal_charge']),
-            len(opposite_chain_contacts['opposite_charge']),
-            len(opposite_chain_contacts['h_bond']),
-            len(set(opposite_chain_contacts['carbon_contact']))]
+        Returns
+        -------
+        opposite_chain_contact_vector : list
+            Number of equal charge, opposite charge, hydrogen bond and "carbon" contacts
+            between the side chain of the mutated residue and all other chains.
+        same_chain_contact_vector : list
+            Same as above, but for the contacts within the mutated chain.
+        """
+        atoms = self.atoms
+        atom_types = self._get_atom_types()
+        mutated_residue_idx = self._get_mutated_residue_idx(chain_id, mutation)
+
+        # Side chain atoms of the mutated residue
+        mutated_atom_idxs = np.flatnonzero(
+            (atoms.residue_idxs == mutated_residue_idx) &
+            ~np.in1d(atoms.atom_names, list(MAIN_CHAIN_ATOMS)))
+
+        # All atoms with every coordinate within `vdw_distance` of a mutated atom
+        partner_atom_idxs = self._get_model_kdtree().query_ball_point(
+            atoms.coords[mutated_atom_idxs], r=self.vdw_distance, p=np.inf)
+        mutated_idxs = np.repeat(mutated_atom_idxs, [len(x) for x in partner_atom_idxs])
+        partner_idxs = np.array(
+            [idx for idxs in partner_atom_idxs for idx in idxs], dtype=np.int64)
+
+        # Skip atoms of the mutated residue and atoms that do not form contacts
+        keep = (
+            (atoms.residue_idxs[partner_idxs] != mutated_residue_idx) &
+            (atom_types[partner_idxs] != ATOM_TYPES['ignore'])
+        )
+        mutated_idxs = mutated_idxs[keep]
+        partner_idxs = partner_idxs[keep]
 
-        same_chain_contact_vector = [
-            len(same_chain_contacts['equal_charge']),
-            len(same_chain_contacts['opposite_charge']),
-            len(same_chain_contacts['h_bond']),
-            len(set(same_chain_contacts['carbon_contact']))]
+        same_chain = atoms.chain_idxs[partner_idxs] == atoms.chain_ids.index(chain_id)
+        opposite_chain_contact_vector = self._count_contacts(
+            mutated_idxs[~same_chain], partner_idxs[~same_chain])
+        same_chain_contact_vector = self._count_contacts(
+            mutated_idxs[same_chain], partner_idxs[same_chain])
 
         return opposite_chain_contact_vector, same_chain_contact_vector
 
-    def _validate_mutation(self, resname, mutation):
-        valid_aa = [mutation[0].upper(), mutation[-1].upper()]
-        if structure_tools.AAA_DICT.get(resname, resname) not in valid_aa:
-            logger.warning(resname)
-            logger.warning(mutation)
-            logger.warning(structure_tools.AAA_DICT[resname])
-            raise errors.MutationMismatchError()
+    def _count_contacts(self, mutated_idxs, partner_idxs):
+        """Count the different types of contacts formed by pairs of atoms.
 
-    def _increment_vector(
-            self, mutated_residue, mutated_atoms, partner_residue, contact_features_dict):
-        # For each residue each atom of the mutated residue has to be checked
-        for mutated_atom in mutated_atoms:
-            mutated_atom_type = self._get_atom_type(mutated_residue.resname, mutated_atom)
-            # And each partner residue and partner atom
-            for partner_atom in partner_residue:
-                r = structure_tools.calculate_distance(
-                    mutated_atom, partner_atom, self.vdw_distance)
-                if r is not None:
-                    partner_atom_type = self._get_atom_type(partner_residue.resname, partner_atom)
-                    if partner_atom_type == 'ignore':
-                        continue
-                    if mutated_atom_type == 'carbon' and partner_atom_type == 'carbon':
-                        # The Van der Waals packing should be determined
-                        # nonredundant. Thus, the atomic coordinates are
-                        # used to keep track of which interactions where
-                        # already counted. Does not matter as much for others.
-                        contact_features_dict['carbon_contact'].append(
-                            tuple(partner_atom.coord))
-                    if r <= self.min_contact_distance:
-                        if (mutated_atom_type == 'charged_plus' and
-                                partner_atom_type == 'charged_plus'):
-                            contact_features_dict['equal_charge'].append(
-                                tuple(mutated_atom.coord))
-                        if (mutated_atom_type == 'charged_minus' and
-                                partner_atom_type == 'charged_plus'):
-                            contact_features_dict['opposite_charge'].append(
-                                tuple(mutated_atom.coord))
-                        if (mutated_atom_type == 'charged_plus' and
-                                partner_atom_type == 'charged_minus'):
-                            contact_features_dict['opposite_charge'].append(
-                                tuple(mutated_atom.coord))
-                        if (mutated_atom_type == 'charged_minus' and
-                                partner_atom_type == 'charged_minus'):
-                            contact_features_dict['equal_charge'].append(
-                                tuple(mutated_atom.coord))
-                        if (mutated_atom_type == 'charged' and
-                                partner_atom_type == 'polar'):
-                            contact_features_dict['h_bond'].append(
-                                tuple(mutated_atom.coord))
-                        if (mutated_atom_type == 'polar' and
-                                partner_atom_type == 'charged'):
-                            contact_features_dict['h_bond'].append(
-                                tuple(mutated_atom.coord))
-                        if (mutated_atom_type == 'polar' and
-                                partner_atom_type == 'polar'):
-                            contact_features_dict['h_bond'].append(
-                                tuple(mutated_atom.coord))
-
-    def _get_atom_type(self, residue, atom):
-        """Get the type of atom we are dealing with (i.e. charged, polar, carbon).
-
-        In order to see what "interaction" type two atoms are forming, check the
-        individual label which every atom in every residue has (see pdb file
-        convention for an explanation of the labels).
-        With this label, one can determine which atom of the residue one is looking
-        at, and hence, one can determine which "interaction" two atoms are forming.
+        The Van der Waals packing is determined nonredundantly, i.e. each partner atom
+        is counted only once. All other contacts are counted once for every pair of atoms
+        closer than `min_contact_distance`.
         """
-        # This is based on the naming convention for the atoms in crystalography
-        charged_plus = ['NH1', 'NH2', 'NZ']
-        # Label of negatively charged atoms
-        charged_minus = ['OD1', 'OD2', 'OE1', 'OE2']
-        # Label of polar atoms
-        polar = [
-            'OG', 'OG1', 'OD1', 'OD2', 'ND1', 'OE1', 'NE', 'NE1', 'NE2', 'ND1', 'ND2', 'SG',
-            'OH', 'O', 'N'
+        atom_types = self._get_atom_types()
+        mutated_types = atom_types[mutated_idxs]
+        partner_types = atom_types[partner_idxs]
+        coords = self.atoms.coords.astype(np.float64)
+        r = np.sqrt(((coords[mutated_idxs] - coords[partner_idxs])**2).sum(axis=1))
+        is_close = r <= self.min_contact_distance
+
+        def is_pair(type_1, type_2):
+            return (mutated_types == ATOM_TYPES[type_1]) & (partner_types == ATOM_TYPES[type_2])
+
+        equal_charge = is_close & (
+            is_pair('charged_plus', 'charged_plus') | is_pair('charged_minus', 'charged_minus'))
+        opposite_charge = is_close & (
+            is_pair('charged_plus', 'charged_minus') | is_pair('charged_minus', 'charged_plus'))
+        h_bond = is_close & is_pair('polar', 'polar')
+        carbon_contact = is_pair('carbon', 'carbon')
+        carbon_contact_coords = coords[partner_idxs[carbon_contact]]
+
+        return [
+            int(equal_charge.sum()),
+            int(opposite_charge.sum()),
+            int(h_bond.sum()),
+            len(np.unique(carbon_contact_coords, axis=0)),
         ]
 
-        if residue.upper() in ['ARG', 'R', 'LYS', 'K']:
-            if atom.name in charged_plus:
-                return 'charged_plus'
+    def _get_mutated_residue_idx(self, chain_id, mutation):
+        """Return the index of the mutated residue in :attr:`atoms` residue arrays.
 
-        if residue.upper() in ['ASP', 'D', 'GLU', 'E']:
-            if atom.name in charged_minus:
-                return 'charged_minus'
+        Assumes that `mutation` uses PDB residue numbering.
+        """
+        atoms = self.atoms
+        chain_idx = atoms.chain_ids.index(chain_id) if chain_id in atoms.chain_ids else -1
+        residue_idxs = np.flatnonzero(
+            (atoms.residue_chain_idxs == chain_idx) &
+            atoms.residue_is_amino_acid &
+            (np.char.strip(atoms.residue_hetflags) == '') &
+            (atoms.residue_resseqs.astype(str) == mutation[1:-1]))
+        if not len(residue_idxs):
+            logger.warning(
+                "Could not find residue '{}' in chain '{}'!".format(mutation[1:-1], chain_id))
+            raise errors.MutationMismatchError()
+        self._validate_mutation(atoms.residue_names[residue_idxs[0]], mutation)
+        return residue_idxs[0]
 
-        if atom.name in polar:
-            return 'polar'
+    def _get_atom_types(self):
+        if self._atom_types is None:
+            self._atom_types = _get_atom_types(self.atoms)
+        return self._atom_types
 
-        if atom.name[0] == 'C' or atom.name == 'SD':
-            return 'carbon'
+    def _get_model_kdtree(self):
+        if self._model_kdtree is None:
+            self._model_kdtree = cKDTree(self.atoms.coords.astype(np.float64))
+        return self._model_kdtree
 
-        return 'ignore'
+    def _validate_mutation(self, resname, mutation):
+        valid_aa = [mutation[0].upper(), mutation[-1].upper()]
+        if structure_tools.AAA_DICT.get(resname, resname) not in valid_aa:
+            logger.warning(resname)
+            logger.warning(mutation)
+            logger.warning(structure_tools.AAA_DICT[resname])
+            raise errors.MutationMismatchError()
 
     # %% SASA New
+    def get_residue_sasa(self):
+        """Relative SASA of every residue, calculated with every chain separately.
+
+        Returns
+        -------
+        residue_sasa : dict
+            Maps ``(pdb_chain, res_num)`` to ``(res_name, rel_sasa)``.
+        """
+        if self._residue_sasa is None:
+            seasa_by_residue_separately = self.get_seasa()[3]
+            self._residue_sasa = {
+                (pdb_chain, res_num): (res_name, rel_sasa)
+                for pdb_chain, res_num, res_name, rel_sasa in zip(
+                    seasa_by_residue_separately['pdb_chain'].values,
+                    seasa_by_residue_separately['res_num'].values,
+                    seasa_by_residue_separately['res_name'].values,
+                    seasa_by_residue_separately['rel_sasa'].values)
+            }
+        return self._residue_sasa
+
     def get_seasa(self):
-        structure_file = self.get_structure_file(''.join(self.chain_ids))
-        seasa_by_chain, seasa_by_residue = self._run_msms(structure_file)
+        """Calculate the solvent accessibility of every residue and chain.
+
+        SASA is calculated with all chains together, and with every chain separately.
+        The algorithm is selected using the ``sasa_method`` option
+        (``'shrake_rupley'`` or ``'msms'``). Results are cached.
+        """
+        if self._seasa is None:
+            self._seasa = self._calculate_seasa()
+        return self._seasa
+
+    def _calculate_seasa(self):
+        sasa_method = conf.CONFIGS.get('sasa_method', 'shrake_rupley')
+        if sasa_method == 'shrake_rupley':
+            run_sasa = self._run_shrake_rupley
+        elif sasa_method == 'msms':
+            def run_sasa(chain_ids):
+                return self._run_msms(self.get_structure_file(''.join(chain_ids)))
+        else:
+            raise errors.ParameterError("Wrong sasa_method: '{}'".format(sasa_method))
+        chain_ids_list = [self.chain_ids]
         if len(self.chain_ids) > 1:
-            seasa_by_chain_separately = []
-            seasa_by_residue_separately = []
-            for chain_id in self.chain_ids:
-                structure_file = self.get_structure_file(chain_id)
-                seasa_by_chain, seasa_by_residue = self._run_msms(structure_file)
-                seasa_by_chain_separately.append(seasa_by_chain)
-                seasa_by_residue_separately.append(seasa_by_residue)
+            chain_ids_list += [[chain_id] for chain_id in self.chain_ids]
+        results = _run_concurrently(
+            [functools.partial(run_sasa, chain_ids) for chain_ids in chain_ids_list],
+            sasa_method == 'msms')
+        seasa_by_chain, seasa_by_residue = results[0]
+        if len(self.chain_ids) > 1:
+            seasa_by_chain_separately = [result[0] for result in results[1:]]
+            seasa_by_residue_separately = [result[1] for result in results[1:]]
             seasa_by_chain_separately = pd.concat(seasa_by_chain_separately, ignore_index=True)
             seasa_by_residue_separately = pd.concat(seasa_by_residue_separately, ignore_index=True)
             return [
@@ -316,11 +652,16 @@ class AnalyzeStructure:
         using Bio.PDB.ResidueDepth().residue_depth()...
         """
         base_filename = op.splitext(filename)[0]
+        # Several instances of msms may be running in the same folder at the same time
+        fd, area_file = tempfile.mkstemp(
+            prefix=op.basename(base_filename) + '_', suffix='.area', dir=self.working_dir)
+        os.close(fd)
 
         # Convert pdb to xyz coordiates
         assert(os.path.isfile(op.join(self.working_dir, filename)))
 
-        system_command = 'pdb_to_xyzrn {0}.pdb'.format(op.join(self.working_dir, base_filename))
+        system_command = '{0} {1}.pdb'.format(
+            helper.get_executable('pdb_to_xyzrn'), op.join(self.working_dir, base_filename))
         logger.debug('msms system command 1: %s' % system_command)
         p = helper.run(system_command, cwd=self.working_dir)
         if p.returncode != 0:
@@ -336,12 +677,13 @@ class AnalyzeStructure:
         # Calculate SASA and SESA (excluded)
         probe_radius = 1.4
         system_command_template = """\
-msms -probe_radius {probe_radius:.1f} -surface ases -if '{input_file}' -af '{area_file}' \
+{msms} -probe_radius {probe_radius:.1f} -surface ases -if '{input_file}' -af '{area_file}' \
 """
         system_command = system_command_template.format(
+            msms=helper.get_executable('msms'),
             probe_radius=probe_radius,
             input_file=tempfile_xyzrn.name,
-            area_file=op.join(self.working_dir, base_filename + '.area'))
+            area_file=area_file)
         logger.debug('msms system command 2: %s' % system_command)
         p = helper.run(system_command, cwd=self.working_dir)
         number_of_tries = 0
@@ -359,8 +701,9 @@ msms -probe_radius {probe_radius:.1f} -surface ases -if '{input_file}' -af '{are
         os.remove(tempfile_xyzrn.name)
 
         # Read and parse the output
-        with open(op.join(self.working_dir, base_filename + '.area'), 'r') as fh:
+        with open(area_file, 'r') as fh:
             file_data = fh.readlines()
+        os.remove(area_file)
         file_data = [
             [l.strip() for l in line.split()] for line in file_data
         ]
@@ -383,27 +726,135 @@ msms -probe_radius {probe_radius:.1f} -surface ases -if '{input_file}' -af '{are
         file_data = [msms_parse_row(row) for row in file_data if row]
         seasa_df = pd.DataFrame(data=file_data, columns=msms_columns)
         seasa_df['atom_num'] = seasa_df['atom_num'].apply(lambda x: x + 1)
-        seasa_df['rel_sasa'] = [
-            x[0] / STANDARD_SASA.get(x[1], x[0]) * 100
-            for x in zip(seasa_df['abs_sasa'], seasa_df['res_name'])
-        ]
+        return self._group_seasa(seasa_df)
 
-        seasa_gp_by_chain = seasa_df.groupby(['pdb_chain'])
-        seasa_gp_by_residue = seasa_df.groupby(['pdb_chain', 'res_name', 'res_num'])
-        seasa_by_chain = seasa_gp_by_chain.sum().reset_index()
-        seasa_by_residue = seasa_gp_by_residue.sum().reset_index()
+    def _run_shrake_rupley(self, chain_ids):
+        """Calculate SASA of chains `chain_ids` using :func:`get_sasa_shrake_rupley`.
 
+        Hetatms that are close to the chains are included, like in the structure files
+        saved by :meth:`structure_tools.StructureParser.save_structure`.
+        Solvent excluded surface area is not calculated (`abs_sesa` is NaN).
+        """
+        atoms = self.atoms.select(self._get_sasa_atom_idxs(chain_ids))
+        abs_sasa = get_sasa_shrake_rupley(atoms.coords, _get_vdw_radii(atoms))
+        seasa_df = pd.DataFrame({
+            'atom_num': np.arange(1, len(atoms) + 1),
+            'abs_sesa': np.nan,
+            'abs_sasa': abs_sasa,
+            'atom_id': atoms.atom_names.astype(object),
+            'res_name': atoms.residue_names[atoms.residue_idxs].astype(object),
+            'res_num': atoms.residue_resnums[atoms.residue_idxs].astype(object),
+            'pdb_chain': np.array(atoms.chain_ids, dtype=object)[atoms.chain_idxs],
+        })
+        return self._group_seasa(seasa_df)
+
+    def _get_sasa_atom_idxs(self, chain_ids):
+        """Indices of heavy atoms of chains `chain_ids` and of the hetatms within `r_cutoff`.
+
+        Atoms are ordered by chain, in the order given by `chain_ids`.
+        """
+        atoms = self.atoms
+        is_heavy_atom = (
+            ~np.in1d(atoms.elements, ['H', 'D']) &
+            (atoms.residue_hetflags[atoms.residue_idxs] != 'W')
+        )
+        atom_idxs = np.concatenate([
+            np.flatnonzero(is_heavy_atom & atoms.get_chain_mask([chain_id]))
+            for chain_id in chain_ids
+        ] + [np.zeros(0, dtype=np.int64)])
+        hetatm_chain_id = self.sp.hetatm_chain_id
+        if len(atom_idxs) and hetatm_chain_id is not None and hetatm_chain_id not in chain_ids:
+            hetatm_idxs = np.flatnonzero(is_heavy_atom & atoms.get_chain_mask([hetatm_chain_id]))
+            distances, _ = cKDTree(atoms.coords[atom_idxs].astype(np.float64)).query(
+                atoms.coords[hetatm_idxs].astype(np.float64),
+                distance_upper_bound=self.sp.r_cutoff)
+            close_residue_idxs = atoms.residue_idxs[hetatm_idxs[np.isfinite(distances)]]
+            atom_idxs = np.r_[
+                atom_idxs,
+                hetatm_idxs[np.in1d(atoms.residue_idxs[hetatm_idxs], close_residue_idxs)]
+            ]
+        return atom_idxs
+
+    def _group_seasa(self, seasa_df):
+        """Add relative SASA and sum the per-atom SEASA values over chains and residues."""
+        # Atoms of residues without a standard accessibility have `rel_sasa` == 100
+        standard_sasa = seasa_df['res_name'].map(STANDARD_SASA)
+        seasa_df['rel_sasa'] = np.where(
+            standard_sasa.notnull(), seasa_df['abs_sasa'] / standard_sasa * 100, 100.0)
+        seasa_by_chain = _sum_by_group(seasa_df, ['pdb_chain'], SEASA_VALUE_COLUMNS)
+        seasa_by_residue = _sum_by_group(
+            seasa_df, ['pdb_chain', 'res_name', 'res_num'], SEASA_VALUE_COLUMNS)
         return seasa_by_chain, seasa_by_residue
 
     # === Secondary Structure ===
     def get_secondary_structure(self):
+        """Calculate the secondary structure of every amino acid.
+
+        The algorithm is selected using the ``secondary_structure_method`` option
+        (``'dssp'`` or ``'stride'``). Results are cached.
+
+        Returns
+        -------
+        DataFrame
+            Columns 'amino_acid', 'chain', 'resnum', 'idx' and 'ss_code'.
+        """
+        if self._secondary_structure_df is not None:
+            return self._secondary_structure_df
+        secondary_structure_method = conf.CONFIGS.get('secondary_structure_method', 'dssp')
+        if secondary_structure_method == 'dssp':
+            secondary_structure_df = self._run_dssp()
+        elif secondary_structure_method == 'stride':
+            secondary_structure_df = self._run_stride()
+        else:
+            raise errors.ParameterError(
+                "Wrong secondary_structure_method: '{}'".format(secondary_structure_method))
+        self._secondary_structure_df = secondary_structure_df
+        self._secondary_structure_codes = {
+            (chain_id, resnum): ss_code
+            for chain_id, resnum, ss_code in secondary_structure_df[
+                ['chain', 'resnum', 'ss_code']].values
+        }
+        return secondary_structure_df
+
+    def _run_dssp(self):
+        """Calculate secondary structure using :func:`assign_secondary_structure`."""
+        atoms = self.atoms
+        residue_idxs = np.concatenate([
+            np.flatnonzero(
+                (atoms.residue_chain_idxs == atoms.chain_ids.index(chain_id)) &
+                atoms.residue_is_amino_acid)
+            for chain_id in self.chain_ids
+        ] + [np.zeros(0, dtype=np.int64)])
+        residue_positions = np.full(atoms.n_residues, -1)
+        residue_positions[residue_idxs] = np.arange(len(residue_idxs))
+        backbone_coords = np.full((len(residue_idxs), 4, 3), np.nan)
+        atom_positions = residue_positions[atoms.residue_idxs]
+        for atom_idx, atom_name in enumerate(['N', 'CA', 'C', 'O']):
+            is_backbone_atom = (atoms.atom_names == atom_name) & (atom_positions >= 0)
+            backbone_coords[atom_positions[is_backbone_atom], atom_idx] = (
+                atoms.coords[is_backbone_atom])
+        residue_names = atoms.residue_names[residue_idxs]
+        residue_chain_idxs = atoms.residue_chain_idxs[residue_idxs]
+        ss_codes = assign_secondary_structure(
+            backbone_coords, residue_chain_idxs, residue_names == 'PRO')
+        chain_ids = np.array(atoms.chain_ids, dtype=object)[residue_chain_idxs]
+        return pd.DataFrame({
+            'amino_acid': [structure_tools.AAA_DICT[resname] for resname in residue_names],
+            'chain': chain_ids,
+            'resnum': atoms.residue_resnums[residue_idxs].astype(object),
+            'idx': pd.Series(chain_ids).groupby(chain_ids).cumcount().values + 1,
+            'ss_code': ss_codes,
+        }, columns=['amino_acid', 'chain', 'resnum', 'idx', 'ss_code'])
+
+    def _run_stride(self):
         """Run `stride` to calculate protein secondary structure."""
         structure_file = self.get_structure_file(''.join(self.chain_ids))
-        stride_results_file = op.join(
-            op.dirname(structure_file),
-            structure_tools.get_pdb_id(structure_file) + '_stride_results.txt'
-        )
-        system_command = 'stride {} -f{}'.format(structure_file, stride_results_file)
+        fd, stride_results_file = tempfile.mkstemp(
+            prefix=structure_tools.get_pdb_id(structure_file) + '_stride_results_',
+            suffix='.txt', dir=op.dirname(structure_file))
+        os.close(fd)
+        system_command = '{} {} -f{}'.format(
+            helper.get_executable('stride'), structure_file, stride_results_file)
         logger.debug('stride system command: %s' % system_command)
         p = helper.run(system_command, cwd=self.working_dir)
         logger.debug('stride return code: %i' % p.returncode)
@@ -416,55 +867,57 @@ msms -probe_radius {probe_radius:.1f} -surface ases -if '{input_file}' -af '{are
                   row.split()[3], int(row.split()[4]), row.split()[5]]
                  for row in fh.readlines() if row[:3] == 'ASG'],
                 columns=['amino_acid', 'chain', 'resnum', 'idx', 'ss_code'])
+        os.remove(stride_results_file)
         return file_data_df
 
     def get_interchain_distances(self, pdb_chain=None, pdb_mutation=None, cutoff=None):
-        """Calculate distance between two chains."""
-        model = self.sp.structure[0]
+        """Calculate the shortest distance between amino acid atoms of every pair of chains.
+
+        Parameters
+        ----------
+        pdb_chain : str, optional
+            Only calculate distances between this chain and all other chains.
+        pdb_mutation : str, optional
+            Only consider atoms of the mutated residue in `pdb_chain`.
+        cutoff : float, optional
+            Distances larger than `cutoff` are reported as `cutoff`.
+
+        Returns
+        -------
+        shortest_interchain_distances : dict
+            ``{chain_1_id: {chain_2_id: distance}}`` for every pair of chains (both ways).
+        """
         shortest_interchain_distances = {}
         # Chain 1
         for i, chain_1_id in enumerate(self.sp.chain_ids):
             shortest_interchain_distances[chain_1_id] = {}
-            chain_1 = model[chain_1_id]
             if pdb_chain:
                 if chain_1_id == pdb_chain:
                     continue
                 chain_2_ids = [pdb_chain]
             else:
                 chain_2_ids = self.sp.chain_ids[i + 1:]
+            chain_1_atoms = self._get_chain_atoms(chain_1_id)
             # Chain 2
             for chain_2_id in chain_2_ids:
-                chain_2 = model[chain_2_id]
-                min_r = cutoff
-                # Residue 1
-                for residue_1 in chain_1:
-                    if (residue_1.resname not in structure_tools.AMINO_ACIDS or
-                            residue_1.id[0] != ' '):
-                        continue
-                    # Residue 2
-                    for residue_2_idx, residue_2 in enumerate(chain_2):
-                        if (residue_2.resname not in structure_tools.AMINO_ACIDS or
-                                residue_2.id[0] != ' '):
-                            continue
-                        if pdb_mutation:
-                            if str(residue_2.id[1]) != pdb_mutation[1:-1]:
-                                continue
-                            if ((structure_tools.convert_aa(residue_2.resname) !=
-                                    pdb_mutation[0]) and (
-                                    structure_tools.convert_aa(residue_2.resname) !=
-                                    pdb_mutation[-1])):
-                                logger.debug(pdb_mutation)
-                                logger.debug(structure_tools.convert_aa(residue_2.resname))
-                                logger.debug(residue_2.id)
-                                raise errors.MutationMismatchError()
-                        # Atom 1
-                        for atom_1 in residue_1:
-                            # Atom 2
-                            for atom_2 in residue_2:
-                                r = structure_tools.calculate_distance(atom_1, atom_2, min_r)
-                                if min_r is None or (r is not None and r < min_r):
-                                    min_r = r
-
+                chain_2_atoms = self._get_chain_atoms(chain_2_id)
+                if not len(chain_1_atoms.coords):
+                    min_r = cutoff
+                elif pdb_mutation:
+                    mutated_residues = (
+                        chain_2_atoms.residue_resseqs.astype(str) == pdb_mutation[1:-1])
+                    mutated_atoms = mutated_residues[chain_2_atoms.residue_idxs]
+                    for resname in set(chain_2_atoms.residue_names[mutated_residues]):
+                        if structure_tools.convert_aa(resname) not in \
+                                [pdb_mutation[0], pdb_mutation[-1]]:
+                            logger.debug(pdb_mutation)
+                            logger.debug(structure_tools.convert_aa(resname))
+                            raise errors.MutationMismatchError()
+                    min_r = self._get_shortest_distance(
+                        chain_1_id, chain_2_atoms.coords[mutated_atoms], cutoff)
+                else:
+                    min_r = self._get_shortest_distance(
+                        chain_1_id, chain_2_atoms.coords, cutoff)
                 shortest_interchain_distances[chain_1_id][chain_2_id] = min_r
 
         if not shortest_interchain_distances:
@@ -503,61 +956,131 @@ msms -probe_radius {probe_radius:.1f} -surface ases -if '{input_file}' -af '{are
 
         return shortest_interchain_distances
 
+    def _get_chain_atoms(self, chain_id):
+        """Return a :class:`structure_tools.StructureArray` of amino acid atoms in `chain_id`."""
+        if chain_id in self._chain_atoms:
+            return self._chain_atoms[chain_id]
+        atoms = self.atoms
+        is_amino_acid = atoms.residue_is_amino_acid & (atoms.residue_hetflags == ' ')
+        chain_atoms = atoms.select(
+            atoms.get_chain_mask([chain_id]) & is_amino_acid[atoms.residue_idxs])
+        self._chain_atoms[chain_id] = chain_atoms
+        return chain_atoms
+
+    def _get_chain_kdtree(self, chain_id):
+        if chain_id not in self._chain_kdtrees:
+            self._chain_kdtrees[chain_id] = cKDTree(
+                self._get_chain_atoms(chain_id).coords.astype(np.float64))
+        return self._chain_kdtrees[chain_id]
+
+    def _get_shortest_distance(self, chain_id, coords, cutoff=None):
+        """Find the shortest distance between atoms in chain `chain_id` and `coords`.
+
+        Returns `cutoff` if no pair of atoms is closer than `cutoff`.
+        """
+        if not len(coords):
+            return cutoff
+        distances, _ = self._get_chain_kdtree(chain_id).query(
+            coords, k=1, distance_upper_bound=np.inf if cutoff is None else cutoff)
+        min_r = distances.min()
+        if cutoff is not None and not min_r < cutoff:
+            return cutoff
+        return float(min_r)
+
     def get_interface_area(self, chain_ids):
-        """.
+        """Calculate the surface area buried in the interface between two chains.
 
-        .. note::
+        The algorithm is selected using the ``interface_area_method`` option
+        (``'shrake_rupley'`` or ``'pops'``).
 
-            Crashes all the time. Needs to be replaced (mdtraj?)
+        Returns
+        -------
+        list
+            Hydrophobic, hydrophilic, and total interface area.
         """
         assert len(chain_ids) == 2
+        interface_area_method = conf.CONFIGS.get('interface_area_method', 'shrake_rupley')
+        if interface_area_method == 'shrake_rupley':
+            return self._get_interface_area_shrake_rupley(chain_ids)
+        elif interface_area_method == 'pops':
+            return self._get_interface_area_pops(chain_ids)
+        else:
+            raise errors.ParameterError(
+                "Wrong interface_area_method: '{}'".format(interface_area_method))
 
-        termination, rc, e = self.__run_pops_area(self.get_structure_file(''.join(chain_ids)))
-        if rc != 0:
-            if termination != 'Clean termination':
-                logger.warning('Pops error for pdb: %s:' % self.pdb_file)
-                logger.warning(e)
-                return [None, None, None]
-        result = self.__read_pops_area(self.get_structure_file(''.join(chain_ids)) + '.out')
+    def _get_interface_area_shrake_rupley(self, chain_ids):
+        """Calculate the interface area using :func:`get_sasa_shrake_rupley`.
 
-        # Distinguish the surface area by hydrophobic, hydrophilic, and total
-        for item in result:
-            if item[0] == 'hydrophobic:':
-                hydrophobic = float(item[1])
-            elif item[0] == 'hydrophilic:':
-                hydrophilic = float(item[1])
-            elif item[0] == 'total:':
-                total = float(item[1])
-        sasa_complex = hydrophobic, hydrophilic, total
+        Carbon and sulfur atoms are hydrophobic and all other atoms are hydrophilic,
+        as in POPS.
+        """
+        atom_idxs = self._get_sasa_atom_idxs(chain_ids)
+        atoms = self.atoms.select(atom_idxs)
+        coords = atoms.coords
+        radii = _get_vdw_radii(atoms)
+        is_hydrophobic = np.in1d(atoms.elements, list(HYDROPHOBIC_ELEMENTS))
+        atom_positions = np.full(len(self.atoms), -1)
+        atom_positions[atom_idxs] = np.arange(len(atom_idxs))
+
+        def get_sasa(idxs):
+            sasa = get_sasa_shrake_rupley(coords[idxs], radii[idxs])
+            hydrophobic = sasa[is_hydrophobic[idxs]].sum()
+            return np.array([hydrophobic, sasa.sum() - hydrophobic, sasa.sum()])
+
+        sasa_complex = get_sasa(np.arange(len(atoms)))
+        sasa_chains = [
+            get_sasa(atom_positions[self._get_sasa_atom_idxs([chain_id])])
+            for chain_id in chain_ids
+        ]
+        sasa = (sasa_chains[0] + sasa_chains[1] - sasa_complex) / 2.0
+        return [float(x) for x in sasa]
 
-        # calculate SASA for chain, i.e. part one of the complex:
-        termination, rc, e = self.__run_pops_area(self.get_structure_file(chain_ids[0]))
-        if rc != 0:
-            if termination != 'Clean termination':
-                logger.warning('Error in pops for pdb: %s:' % self.pdb_file)
-                logger.warning(e)
-                return [None, None, None]
-        result = self.__read_pops_area(self.get_structure_file(chain_ids[0]) + '.out')
+    def _get_interface_area_pops(self, chain_ids):
+        """Calculate the interface area by running POPS for the complex and for each chain.
 
-        # Distinguish the surface area by hydrophobic, hydrophilic, and total
-        for item in result:
-            if item[0] == 'hydrophobic:':
-                hydrophobic = float(item[1])
-            elif item[0] == 'hydrophilic:':
-                hydrophilic = float(item[1])
-            elif item[0] == 'total:':
-                total = float(item[1])
-        sasa_chain = hydrophobic, hydrophilic, total
+        .. note::
+
+            Crashes all the time.
+        """
+        structure_files = [
+            self.get_structure_file(''.join(chain_ids)),
+            self.get_structure_file(chain_ids[0]),
+            self.get_structure_file(chain_ids[1]),
+        ]
+        results = _run_concurrently([
+            functools.partial(self._run_pops_partition, structure_file)
+            for structure_file in structure_files
+        ])
+        if any(result is None for result in results):
+            return [None, None, None]
+        sasa_complex, sasa_chain, sasa_oppositeChain = results
+
+        sasa = [0, 0, 0]
+        # hydrophobic
+        sasa[0] = (sasa_chain[0] + sasa_oppositeChain[0] - sasa_complex[0]) / 2.0
+        # hydrophilic
+        sasa[1] = (sasa_chain[1] + sasa_oppositeChain[1] - sasa_complex[1]) / 2.0
+        # total
+        sasa[2] = (sasa_chain[2] + sasa_oppositeChain[2] - sasa_complex[2]) / 2.0
 
-        # calculate SASA for oppositeChain, i.e. the second part of the complex:
-        termination, rc, e = self.__run_pops_area(self.get_structure_file(chain_ids[1]))
+        return sasa
+
+    def _run_pops_partition(self, structure_file):
+        """Run POPS and return the hydrophobic, hydrophilic, and total SASA."""
+        # Several instances of POPS may be running in the same folder at the same time
+        fd, output_file = tempfile.mkstemp(
+            prefix=op.basename(structure_file) + '_', suffix='.out', dir=self.working_dir)
+        os.close(fd)
+        termination, rc, e = self.__run_pops_area(structure_file, output_file)
         if rc != 0:
             if termination != 'Clean termination':
-                logger.warning('Error in pops for pdb: %s:' % self.pdb_file)
+                logger.warning('Pops error for pdb: %s:' % self.pdb_file)
                 logger.warning(e)
-                return [None, None, None]
-        result = self.__read_pops_area(self.get_structure_file(chain_ids[1]) + '.out')
+                return None
+        result = self.__read_pops_area(output_file)
+        os.remove(output_file)
 
+        # Distinguish the surface area by hydrophobic, hydrophilic, and total
         for item in result:
             if item[0] == 'hydrophobic:':
                 hydrophobic = float(item[1])
@@ -565,23 +1088,13 @@ msms -probe_radius {probe_radius:.1f} -surface ases -if '{input_file}' -af '{are
                 hydrophilic = float(item[1])
             elif item[0] == 'total:':
                 total = float(item[1])
-        sasa_oppositeChain = hydrophobic, hydrophilic, total
-
-        sasa = [0, 0, 0]
-        # hydrophobic
-        sasa[0] = (sasa_chain[0] + sasa_oppositeChain[0] - sasa_complex[0]) / 2.0
-        # hydrophilic
-        sasa[1] = (sasa_chain[1] + sasa_oppositeChain[1] - sasa_complex[1]) / 2.0
-        # total
-        sasa[2] = (sasa_chain[2] + sasa_oppositeChain[2] - sasa_complex[2]) / 2.0
-
-        return sasa
+        return hydrophobic, hydrophilic, total
 
-    def __run_pops_area(self, full_filename):
+    def __run_pops_area(self, full_filename, output_file):
         system_command = (
-            'pops --chainOut'
+            helper.get_executable('pops') + ' --chainOut'
             ' --pdb ' + full_filename +
-            ' --popsOut ' + full_filename + '.out')
+            ' --popsOut ' + output_file)
         p = helper.run(system_command, cwd=self.working_dir)
         # The returncode can be non zero even if pops calculated the surface
         # area. In that case it is indicated by "clean termination" written
@@ -1,14 +1,20 @@
+import os
 import os.path as op
 import gzip
+import json
+import shutil
+import tempfile
 import string
 import logging
 import urllib.request
 import re
+import itertools
+import weakref
 from functools import wraps
-from tempfile import NamedTemporaryFile
 from collections import defaultdict, OrderedDict
 import six
 import numpy as np
+from scipy.spatial import cKDTree
 import Bio
 from Bio.PDB import PDBIO, Select, NeighborSearch
 from Bio.PDB.PDBParser import PDBParser
@@ -17,7 +23,7 @@ from Bio.PDB.Polypeptide import PPBuilder
 from Bio.Alphabet import IUPAC
 from Bio.Seq import Seq
 
-from . import errors
+from . import errors, helper
 
 logger = logging.getLogger(__name__)
 
@@ -50,16 +56,16 @@ LYSINE_ATOMS = ['N', 'CA', 'CB', 'CG', 'CD', 'CE', 'NZ', 'C', 'O']
 
 # %% Functions for downloading and parsing pdb files
 class MMCIFParserMod(MMCIFParser):
-    def __init__(self, temp_dir):
+    def __init__(self, temp_dir=None):
+        super(MMCIFParserMod, self).__init__(QUIET=True)
         self.temp_dir = temp_dir
 
     def get_structure(self, structure_id, gzip_fh):
-        """Altered `get_structure` method which accepts gzip file handles as input."""
-        with NamedTemporaryFile(mode='w', dir=self.temp_dir) as temp_fh:
-            temp_fh.writelines(gzip_fh.readlines())
-            temp_fh.flush()
-            temp_fh.seek(0)
-            return super(MMCIFParserMod, self).get_structure(structure_id, temp_fh.name)
+        """Altered `get_structure` method which accepts gzip file handles as input.
+
+        The file handle is parsed directly, without copying it to a temporary file.
+        """
+        return super(MMCIFParserMod, self).get_structure(structure_id, gzip_fh)
 
 
 def get_pdb_id(pdb_file):
@@ -137,11 +143,14 @@ def download_pdb_file(pdb_id, output_dir):
     return output_pdb_filename
 
 
-def get_pdb_structure(pdb_file, pdb_id=None, quiet=True):
-    """Set QUIET to False to output warnings like incomplete chains etc."""
+def get_pdb_structure(pdb_file, pdb_id=None, quiet=True, get_header=True):
+    """Set QUIET to False to output warnings like incomplete chains etc.
+
+    Set `get_header` to False to skip parsing the PDB header.
+    """
     if pdb_id is None:
         pdb_id = get_pdb_id(pdb_file)
-    parser = PDBParser(get_header=True, QUIET=quiet)
+    parser = PDBParser(get_header=get_header, QUIET=quiet)
     if pdb_file.endswith('.gz'):
         with gzip.open(pdb_file, 'rt') as ifh:
             structure = parser.get_structure(pdb_id, ifh)
@@ -150,21 +159,393 @@ def get_pdb_structure(pdb_file, pdb_id=None, quiet=True):
 
     # Rename empty chains (i.e. chain.id == ' ')
     model = structure[0]
-    chain_ids = {chain.id for chain in model.child_list}
-    for chain in model.child_list:
-        if chain.id in [' ', 'Z']:
-            chain_ids.remove(chain.id)
-            chain.id = next(c for c in string.ascii_uppercase if c not in chain_ids)
-            chain_ids.add(chain.id)
+    for chain, chain_id in zip(
+            model.child_list, _rename_empty_chains([chain.id for chain in model.child_list])):
+        chain.id = chain_id
     model.child_dict = {chain.id: chain for chain in model.child_list}
 
     return structure
 
 
+def _rename_empty_chains(chain_ids):
+    """Give chains with id ' ' (and 'Z', which is used for hetatms) an unused letter."""
+    chain_ids = list(chain_ids)
+    used_chain_ids = set(chain_ids)
+    for i, chain_id in enumerate(chain_ids):
+        if chain_id in [' ', 'Z']:
+            used_chain_ids.remove(chain_id)
+            chain_ids[i] = next(c for c in string.ascii_uppercase if c not in used_chain_ids)
+            used_chain_ids.add(chain_ids[i])
+    return chain_ids
+
+
 def load_pdb(pdb_file, **kwargs):
     return get_pdb_structure(pdb_file, **kwargs)
 
 
+# %% Array-backed structures
+class StructureArray:
+    """Compact representation of the atoms in a structure, backed by NumPy arrays.
+
+    Atom attributes are arrays with one element per atom, and residue attributes are
+    arrays with one element per residue. Atoms are mapped to residues by `residue_idxs`,
+    and residues are mapped to chains by `residue_chain_idxs`.
+    Only the first model of a structure and the selected alternate location of
+    every atom are kept.
+
+    Attributes
+    ----------
+    structure_id : str
+        Id of the structure.
+    chain_ids : list
+        Ids of all chains, in the order in which they appear in the structure.
+    coords : ndarray
+        Coordinates of every atom (float32, ``(n_atoms, 3)``).
+    elements, atom_names : ndarray
+        Element and name of every atom.
+    occupancies, bfactors : ndarray
+        Occupancy and B-factor of every atom (float32).
+    residue_idxs, chain_idxs : ndarray
+        Index of the residue and of the chain of every atom.
+    residue_names, residue_hetflags, residue_icodes : ndarray
+        Name, hetero flag and insertion code of every residue.
+    residue_resseqs, residue_chain_idxs : ndarray
+        Sequence number and chain index of every residue.
+    """
+
+    __slots__ = [
+        'structure_id', 'chain_ids',
+        'coords', 'elements', 'atom_names', 'occupancies', 'bfactors',
+        'residue_idxs', 'chain_idxs',
+        'residue_names', 'residue_hetflags', 'residue_resseqs', 'residue_icodes',
+        'residue_chain_idxs',
+    ]
+
+    def __init__(
+            self, structure_id, chain_ids,
+            coords, elements, atom_names, occupancies, bfactors, residue_idxs,
+            residue_names, residue_hetflags, residue_resseqs, residue_icodes,
+            residue_chain_idxs):
+        self.structure_id = structure_id
+        self.chain_ids = list(chain_ids)
+        self.coords = np.asarray(coords, dtype=np.float32).reshape(-1, 3)
+        self.elements = np.asarray(elements, dtype=str)
+        self.atom_names = np.asarray(atom_names, dtype=str)
+        self.occupancies = np.asarray(occupancies, dtype=np.float32)
+        self.bfactors = np.asarray(bfactors, dtype=np.float32)
+        self.residue_idxs = np.asarray(residue_idxs, dtype=np.int32)
+        self.residue_names = np.asarray(residue_names, dtype=str)
+        self.residue_hetflags = np.asarray(residue_hetflags, dtype=str)
+        self.residue_resseqs = np.asarray(residue_resseqs, dtype=np.int32)
+        self.residue_icodes = np.asarray(residue_icodes, dtype=str)
+        self.residue_chain_idxs = np.asarray(residue_chain_idxs, dtype=np.int32)
+        self.chain_idxs = self.residue_chain_idxs[self.residue_idxs]
+
+    @classmethod
+    def from_biopython(cls, entity):
+        """Create a :class:`StructureArray` from a Bio.PDB structure, model or chain."""
+        if isinstance(entity, Bio.PDB.Structure.Structure):
+            entity = entity.child_list[0]
+        if isinstance(entity, Bio.PDB.Chain.Chain):
+            chains = [entity]
+        else:
+            chains = entity.child_list
+        structure = entity
+        while structure.get_parent() is not None:
+            structure = structure.get_parent()
+        structure_id = (
+            structure.id if isinstance(structure, Bio.PDB.Structure.Structure) else None
+        )
+
+        coords, elements, atom_names, occupancies, bfactors, residue_idxs = (
+            [], [], [], [], [], [])
+        residue_names, residue_hetflags, residue_resseqs, residue_icodes = [], [], [], []
+        residue_chain_idxs = []
+        for chain_idx, chain in enumerate(chains):
+            for residue in chain:
+                for atom in residue:
+                    coords.append(atom.coord)
+                    elements.append(atom.element)
+                    atom_names.append(atom.name)
+                    occupancies.append(np.nan if atom.occupancy is None else atom.occupancy)
+                    bfactors.append(atom.bfactor)
+                    residue_idxs.append(len(residue_names))
+                hetflag, resseq, icode = residue.id
+                residue_names.append(residue.resname)
+                residue_hetflags.append(hetflag)
+                residue_resseqs.append(resseq)
+                residue_icodes.append(icode)
+                residue_chain_idxs.append(chain_idx)
+        return cls(
+            structure_id, [chain.id for chain in chains],
+            coords, elements, atom_names, occupancies, bfactors, residue_idxs,
+            residue_names, residue_hetflags, residue_resseqs, residue_icodes,
+            residue_chain_idxs)
+
+    def to_biopython(self):
+        """Convert to a Bio.PDB structure with a single model."""
+        structure = Bio.PDB.Structure.Structure(self.structure_id)
+        model = Bio.PDB.Model.Model(0)
+        structure.add(model)
+        chains = []
+        for chain_id in self.chain_ids:
+            chain = Bio.PDB.Chain.Chain(chain_id)
+            model.add(chain)
+            chains.append(chain)
+        residues = []
+        for resname, hetflag, resseq, icode, chain_idx in zip(
+                self.residue_names.tolist(), self.residue_hetflags.tolist(),
+                self.residue_resseqs.tolist(), self.residue_icodes.tolist(),
+                self.residue_chain_idxs.tolist()):
+            residue = Bio.PDB.Residue.Residue((hetflag, resseq, icode), resname, '    ')
+            chains[chain_idx].add(residue)
+            residues.append(residue)
+        for atom_idx, (coord, element, name, occupancy, bfactor, residue_idx) in enumerate(zip(
+                self.coords, self.elements.tolist(), self.atom_names.tolist(),
+                self.occupancies.tolist(), self.bfactors.tolist(),
+                self.residue_idxs.tolist())):
+            residues[residue_idx].add(Bio.PDB.Atom.Atom(
+                name, coord.copy(), bfactor, occupancy, ' ', name, atom_idx + 1, element))
+        return structure
+
+    def __len__(self):
+        return len(self.coords)
+
+    @property
+    def n_residues(self):
+        return len(self.residue_names)
+
+    @property
+    def residue_resnums(self):
+        """Residue number of every residue (sequence number and insertion code)."""
+        return np.array(
+            [str(resseq) + icode.strip() for resseq, icode in zip(
+                self.residue_resseqs.tolist(), self.residue_icodes.tolist())],
+            dtype=str)
+
+    @property
+    def residue_is_amino_acid(self):
+        return np.in1d(self.residue_names, AMINO_ACIDS)
+
+    def get_chain_mask(self, chain_ids):
+        """Return a boolean mask selecting the atoms of chains `chain_ids`."""
+        chain_idxs = [self.chain_ids.index(chain_id) for chain_id in chain_ids]
+        return np.in1d(self.chain_idxs, chain_idxs)
+
+    def select(self, atom_idxs):
+        """Return a new :class:`StructureArray` containing only atoms `atom_idxs`.
+
+        `atom_idxs` can be a boolean mask or an array of indices. Atoms are kept in the
+        given order, and residues without any selected atoms are dropped.
+        """
+        atom_idxs = np.arange(len(self))[atom_idxs]
+        residue_idxs, new_residue_idxs = np.unique(
+            self.residue_idxs[atom_idxs], return_inverse=True)
+        return self.__class__(
+            self.structure_id, self.chain_ids,
+            self.coords[atom_idxs], self.elements[atom_idxs], self.atom_names[atom_idxs],
+            self.occupancies[atom_idxs], self.bfactors[atom_idxs], new_residue_idxs,
+            self.residue_names[residue_idxs], self.residue_hetflags[residue_idxs],
+            self.residue_resseqs[residue_idxs], self.residue_icodes[residue_idxs],
+            self.residue_chain_idxs[residue_idxs])
+
+    def get_chain_sequence_and_numbering(self, chain_id, include_hetatms=False):
+        """Same as :func:`get_chain_sequence_and_numbering`, for chain `chain_id`."""
+        residue_mask = self.residue_chain_idxs == self.chain_ids.index(chain_id)
+        if not include_hetatms:
+            residue_mask &= self.residue_is_amino_acid
+        chain_sequence = ''.join(
+            AAA_DICT.get(resname, '.') for resname in self.residue_names[residue_mask])
+        chain_numbering_extended = self.residue_resnums[residue_mask].tolist()
+        return chain_sequence, chain_numbering_extended
+
+
+# %% Fast structure reader
+#: Tokens of an mmCIF data line (quoted or unquoted values)
+_MMCIF_TOKEN_RE = re.compile(r"""'(.*?)'(?=\s|$)|"(.*?)"(?=\s|$)|(\S+)""")
+#: ``_atom_site`` columns read by :func:`read_structure_array`
+_MMCIF_ATOM_SITE_COLUMNS = [
+    'group_PDB', 'label_atom_id', 'label_alt_id', 'label_comp_id', 'auth_asym_id',
+    'auth_seq_id', 'pdbx_PDB_ins_code', 'Cartn_x', 'Cartn_y', 'Cartn_z',
+    'occupancy', 'B_iso_or_equiv', 'type_symbol',
+]
+
+
+def read_structure_array(structure_file, structure_id=None, sequence_only=False):
+    """Read the first model of a PDB or mmCIF file into a :class:`StructureArray`.
+
+    ATOM and HETATM records (``_atom_site`` rows for mmCIF files) are streamed
+    from the file, which may be gzipped, and all other records are skipped.
+    Like :func:`get_pdb_structure`, the alternate location with the highest occupancy
+    is selected for every atom, and chains with ids ' ' and 'Z' are renamed.
+
+    Parameters
+    ----------
+    structure_file : str
+        PDB or mmCIF (``*.cif`` or ``*.cif.gz``) file.
+    structure_id : str, optional
+        Defaults to the id returned by :func:`get_pdb_id`.
+    sequence_only : bool
+        Only read residues. Every residue is represented by its first atom,
+        and coordinates are not parsed (they are NaN).
+        This is enough to get chain sequences and residue numbering.
+    """
+    if structure_id is None:
+        structure_id = get_pdb_id(structure_file)
+    open_fn = gzip.open if structure_file.endswith('.gz') else open
+    with open_fn(structure_file, 'rt') as ifh:
+        if re.search(r'\.cif(\.gz)?$', structure_file):
+            atom_records = _iter_mmcif_atom_records(ifh)
+        else:
+            atom_records = _iter_pdb_atom_records(ifh)
+        return _build_structure_array(structure_id, atom_records, sequence_only)
+
+
+def _iter_pdb_atom_records(ifh):
+    """Yield tuples of strings for every ATOM and HETATM record of the first model."""
+    for line in ifh:
+        record_type = line[:6]
+        if record_type == 'ATOM  ' or record_type == 'HETATM':
+            fullname = line[12:16]
+            element = line[76:78].strip().upper() or _guess_element(fullname)
+            yield (
+                record_type == 'HETATM', fullname.strip(), line[16], line[17:20], line[21],
+                line[22:26], line[26], line[30:38], line[38:46], line[46:54],
+                line[54:60], line[60:66], element,
+            )
+        elif record_type == 'ENDMDL':
+            break
+
+
+def _iter_mmcif_atom_records(ifh):
+    """Yield tuples of strings for every ``_atom_site`` row of the first model.
+
+    The tuples have the same format as the ones produced by :func:`_iter_pdb_atom_records`.
+    """
+    columns = []
+    for line in ifh:
+        if line.startswith('_atom_site.'):
+            columns.append(line.split()[0][len('_atom_site.'):])
+        elif columns:
+            break
+    else:
+        return
+    idxs = [columns.index(c) if c in columns else None for c in _MMCIF_ATOM_SITE_COLUMNS]
+    model_idx = columns.index('pdbx_PDB_model_num') if 'pdbx_PDB_model_num' in columns else None
+
+    first_model = None
+    values = []
+    for line in itertools.chain([line], ifh):
+        if line.startswith(('#', '_', 'loop_', 'data_')):
+            break
+        for quoted_1, quoted_2, unquoted in _MMCIF_TOKEN_RE.findall(line):
+            values.append(quoted_1 or quoted_2 or unquoted)
+        while len(values) >= len(columns):
+            row, values = values[:len(columns)], values[len(columns):]
+            if model_idx is not None:
+                if first_model is None:
+                    first_model = row[model_idx]
+                elif row[model_idx] != first_model:
+                    return
+            (group, name, altloc, resname, chain_id, resseq, icode, x, y, z, occupancy,
+             bfactor, element) = (
+                '' if idx is None or row[idx] in ['?', '.'] else row[idx] for idx in idxs)
+            yield (
+                group == 'HETATM', name, altloc or ' ', resname, chain_id, resseq, icode or ' ',
+                x, y, z, occupancy, bfactor, element.upper(),
+            )
+
+
+def _guess_element(fullname):
+    """Guess the element of an atom from its name (columns 13-16 of a PDB record).
+
+    Uses the same rules as Bio.PDB.
+    """
+    name = fullname.strip()
+    if fullname[0].isalpha() and not fullname[2:].isdigit():
+        element = name
+    elif name[:1].isdigit():
+        element = name[1:2]
+    else:
+        element = name[:1]
+    return element.upper()
+
+
+def _build_structure_array(structure_id, atom_records, sequence_only):
+    residue_keys = {}
+    atom_keys = {}
+    chain_ids = []
+    coords, elements, atom_names, occupancies, bfactors, residue_idxs = (
+        [], [], [], [], [], [])
+    residue_names, residue_hetflags, residue_resseqs, residue_icodes = [], [], [], []
+    residue_chain_idxs = []
+    for (is_hetatm, name, altloc, resname, chain_id, resseq, icode, x, y, z, occupancy,
+         bfactor, element) in atom_records:
+        resseq = int(resseq)
+        if not is_hetatm:
+            hetflag = ' '
+        elif resname == 'HOH' or resname == 'WAT':
+            hetflag = 'W'
+        else:
+            hetflag = 'H_' + resname
+        residue_key = (chain_id, hetflag, resseq, icode)
+        residue_idx = residue_keys.get(residue_key)
+        if residue_idx is None:
+            if chain_id not in chain_ids:
+                chain_ids.append(chain_id)
+            residue_idx = residue_keys[residue_key] = len(residue_names)
+            residue_names.append(resname)
+            residue_hetflags.append(hetflag)
+            residue_resseqs.append(resseq)
+            residue_icodes.append(icode)
+            residue_chain_idxs.append(chain_ids.index(chain_id))
+        elif sequence_only:
+            continue
+
+        if sequence_only:
+            coord = (np.nan, np.nan, np.nan)
+            occupancy = bfactor = np.nan
+        else:
+            coord = (float(x), float(y), float(z))
+            occupancy = float(occupancy) if occupancy.strip() else np.nan
+            bfactor = float(bfactor) if bfactor.strip() else 0.0
+
+        atom_key = (residue_idx, name)
+        atom_idx = atom_keys.get(atom_key)
+        if atom_idx is not None:
+            # Alternate location of an atom that we have already seen
+            if altloc != ' ' and occupancy > occupancies[atom_idx]:
+                coords[atom_idx] = coord
+                occupancies[atom_idx] = occupancy
+                bfactors[atom_idx] = bfactor
+            continue
+        atom_keys[atom_key] = len(atom_names)
+        coords.append(coord)
+        elements.append(element)
+        atom_names.append(name)
+        occupancies.append(occupancy)
+        bfactors.append(bfactor)
+        residue_idxs.append(residue_idx)
+
+    # Residues of chains that are split into several blocks are kept together
+    residue_order = np.argsort(np.array(residue_chain_idxs, dtype=np.int64), kind='stable')
+    residue_idxs = np.argsort(residue_order)[np.array(residue_idxs, dtype=np.int64)]
+    atom_order = np.argsort(residue_idxs, kind='stable')
+    return StructureArray(
+        structure_id, _rename_empty_chains(chain_ids),
+        np.array(coords, dtype=np.float32).reshape(-1, 3)[atom_order],
+        np.array(elements, dtype=str)[atom_order],
+        np.array(atom_names, dtype=str)[atom_order],
+        np.array(occupancies, dtype=np.float32)[atom_order],
+        np.array(bfactors, dtype=np.float32)[atom_order],
+        residue_idxs[atom_order],
+        np.array(residue_names, dtype=str)[residue_order],
+        np.array(residue_hetflags, dtype=str)[residue_order],
+        np.array(residue_resseqs, dtype=np.int32)[residue_order],
+        np.array(residue_icodes, dtype=str)[residue_order],
+        np.array(residue_chain_idxs, dtype=np.int32)[residue_order])
+
+
 # %%
 def euclidean_distance(a, b):
     """Calculate the Euclidean distance between two lists or tuples of arbitrary length."""
@@ -265,10 +646,22 @@ def get_structure_sequences(file_or_structure, seqres_sequence=False):
 
     Parameters
     ----------
-    file_or_structure : str | biopython.Structure | biopython.Model | biopython.Chain
-        PDB filename or biopython object from which to extract the sequence.
+    file_or_structure : str | biopython.Structure | biopython.Model | biopython.Chain \
+            | StructureArray
+        PDB filename or structure object from which to extract the sequence.
     """
-    if isinstance(file_or_structure, six.string_types):
+    if isinstance(file_or_structure, StructureArray):
+        if seqres_sequence:
+            return get_structure_sequences(file_or_structure.to_biopython(), True)
+        chain_sequences = defaultdict(list)
+        for chain_id in file_or_structure.chain_ids:
+            chain_sequences[chain_id] = (
+                file_or_structure.get_chain_sequence_and_numbering(chain_id)[0])
+        return chain_sequences
+    elif isinstance(file_or_structure, six.string_types):
+        if not seqres_sequence:
+            return get_structure_sequences(
+                read_structure_array(file_or_structure, sequence_only=True))
         structure = get_pdb_structure(file_or_structure)
         model = structure[0]
     elif isinstance(file_or_structure, Bio.PDB.Structure.Structure):
@@ -485,8 +878,12 @@ def get_interacting_residues(model, r_cutoff=5, skip_hetatm_chains=True):
 
     Parameters
     ----------
-    model : biopython.Model
+    model : biopython.Model | StructureArray
         Model to analyse.
+    r_cutoff : float
+        Two residues interact if any of their atoms are within `r_cutoff` of each other.
+    skip_hetatm_chains : bool
+        Ignore chains that are made up entirely of HETATMs.
 
     Returns
     -------
@@ -513,66 +910,59 @@ def get_interacting_residues(model, r_cutoff=5, skip_hetatm_chains=True):
          for value in values}
 
     """
-    from Bio.PDB import NeighborSearch
-
-    interactions_between_chains = dict()
-
-    # Chain 1
-    for chain_1_idx, chain_1 in enumerate(model):
-        if skip_hetatm_chains and chain_is_hetatm(chain_1):
+    if not isinstance(model, StructureArray):
+        model = StructureArray.from_biopython(model)
+
+    # Amino acid residues of all chains that are not made up entirely of hetatms
+    residue_is_amino_acid = model.residue_is_amino_acid
+    if skip_hetatm_chains:
+        chain_is_hetatm = np.bincount(
+            model.residue_chain_idxs[residue_is_amino_acid], minlength=len(model.chain_ids)
+        ) == 0
+        for chain_idx in np.flatnonzero(chain_is_hetatm):
             message = (
-                "Skipping chain_1 with idx {} because it contains only hetatms."
-                .format(chain_1_idx)
+                "Skipping chain with idx {} because it contains only hetatms."
+                .format(chain_idx)
             )
             logger.debug(message)
-            continue
-        chain_1_residue_ids = get_aa_residues(chain_1)
-
-        # Chain 2
-        for j, chain_2 in enumerate(model.child_list[chain_1_idx + 1:]):
-            chain_2_idx = chain_1_idx + 1 + j
-            if skip_hetatm_chains and chain_is_hetatm(chain_2):
-                message = (
-                    "Skipping chain_2 with idx {} because it contains only hetatms."
-                    .format(chain_2_idx)
-                )
-                logger.debug(message)
-                continue
-            chain_2_residue_ids = get_aa_residues(chain_2)
-            ns = NeighborSearch(list(chain_2.get_atoms()))
-
-            # Residue 1
-            for residue_1 in chain_1:
-                try:
-                    residue_1_idx = chain_1_residue_ids.index(residue_1.id)
-                except ValueError:
-                    continue
-                residue_1_resnum = str(residue_1.id[1]) + residue_1.id[2].strip()
-                residue_1_aa = convert_aa(residue_1.resname, quiet=True)
-                residue_1_key = (
-                    chain_1_idx, chain_1.id, residue_1_idx, residue_1_resnum, residue_1_aa
-                )
-                interacting_residues = set()
-                for atom_1 in residue_1:
-                    interacting_residues.update(ns.search(atom_1.get_coord(), r_cutoff, 'R'))
-
-                # Residue 2
-                interacting_residue_ids = []
-                for residue_2 in interacting_residues:
-                    try:
-                        residue_2_idx = chain_2_residue_ids.index(residue_2.id)
-                    except ValueError:
-                        continue
-                    residue_2_resnum = str(residue_2.id[1]) + residue_2.id[2].strip()
-                    residue_2_aa = convert_aa(residue_2.get_resname(), quiet=True)
-                    residue_2_key = (
-                        chain_2_idx, chain_2.id, residue_2_idx, residue_2_resnum, residue_2_aa
-                    )
-                    interacting_residue_ids.append(residue_2_key)
-                if interacting_residue_ids:
-                    interactions_between_chains\
-                        .setdefault(residue_1_key, set())\
-                        .update(interacting_residue_ids)
+        residue_is_amino_acid &= ~chain_is_hetatm[model.residue_chain_idxs]
+
+    residue_keys = {}
+    chain_residue_counts = defaultdict(int)
+    for residue_idx, chain_idx, residue_resnum, residue_name in zip(
+            np.flatnonzero(residue_is_amino_acid).tolist(),
+            model.residue_chain_idxs[residue_is_amino_acid].tolist(),
+            model.residue_resnums[residue_is_amino_acid].tolist(),
+            model.residue_names[residue_is_amino_acid].tolist()):
+        residue_keys[residue_idx] = (
+            chain_idx, model.chain_ids[chain_idx], chain_residue_counts[chain_idx],
+            residue_resnum, AAA_DICT[residue_name]
+        )
+        chain_residue_counts[chain_idx] += 1
+
+    interactions_between_chains = dict()
+    atom_idxs = np.flatnonzero(residue_is_amino_acid[model.residue_idxs])
+    if len(atom_idxs) < 2:
+        return interactions_between_chains
+
+    # All pairs of atoms within `r_cutoff` of each other, found using a single KD-tree
+    atom_pairs = (
+        cKDTree(model.coords[atom_idxs].astype(np.float64))
+        .query_pairs(r_cutoff, output_type='ndarray')
+    )
+    residue_pairs = model.residue_idxs[atom_idxs][atom_pairs]
+    residue_pairs = residue_pairs[
+        model.residue_chain_idxs[residue_pairs[:, 0]] !=
+        model.residue_chain_idxs[residue_pairs[:, 1]]
+    ]
+    # Residues are numbered in chain order, so the first residue in each sorted pair
+    # belongs to the chain with the lower index
+    residue_pairs = np.unique(np.sort(residue_pairs, axis=1), axis=0)
+
+    for residue_1_idx, residue_2_idx in residue_pairs.tolist():
+        interactions_between_chains\
+            .setdefault(residue_keys[residue_1_idx], set())\
+            .add(residue_keys[residue_2_idx])
 
     return interactions_between_chains
 
@@ -633,7 +1023,8 @@ class StructureParser:
 
     """
 
-    def __init__(self, pdb_file, chain_ids=None, domain_defs=[]):
+    def __init__(self, pdb_file, chain_ids=None, domain_defs=[], cache_dir=None,
+                 cache_size=None):
         """.
 
         Parameters
@@ -644,13 +1035,24 @@ class StructureParser:
             Folder where to save extracted structures and sequences.
         chain_ids : list
             Chains of the structure that should be kept.
+        cache_dir : str, optional
+            Folder in which to cache the results of :meth:`extract`
+            (see :class:`helper.FileCache`).
+        cache_size : int, optional
+            Maximum size of the cache, in bytes.
         """
         self.pdb_id = get_pdb_id(pdb_file)
         self.pdb_file = pdb_file
-        self.input_structure = get_pdb_structure(self.pdb_file, self.pdb_id)
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self._input_structure = None
+        self._structure = None
+        self._chain_sequences = None
+        self._cached_structure_dir = None
 
         if chain_ids is None:
-            self.chain_ids = [chain.id for chain in self.input_structure[0].child_list]
+            self.chain_ids = read_structure_array(
+                self.pdb_file, self.pdb_id, sequence_only=True).chain_ids
         elif isinstance(chain_ids, str):
             self.chain_ids = chain_ids.split(',')
         elif isinstance(chain_ids, list) or isinstance(chain_ids, tuple):
@@ -667,13 +1069,118 @@ class StructureParser:
             )
 
         self.unique_id = ('pdb_id: {}, chain_ids: {}'.format(self.pdb_id, self.chain_ids))
+        self._cache_key = helper.get_hash(
+            self.pdb_file, pdb_id=self.pdb_id, chain_ids=self.chain_ids,
+            domain_boundaries=self.domain_boundaries, r_cutoff=self.r_cutoff)
+
+    @property
+    def input_structure(self):
+        """The structure in `pdb_file` (parsed on first use)."""
+        if self._input_structure is None:
+            self._input_structure = get_pdb_structure(
+                self.pdb_file, self.pdb_id, get_header=False)
+        return self._input_structure
+
+    @property
+    def structure(self):
+        """The extracted structure.
+
+        When :meth:`extract` finds its results in the cache, the structure is parsed
+        on first use from a private copy of the cached structure file.
+        """
+        if self._structure is None and self._cached_structure_dir is not None:
+            self._structure = PDBParser(get_header=False, QUIET=True).get_structure(
+                self.pdb_id, op.join(self._cached_structure_dir, self._get_structure_filename()))
+        return self._structure
+
+    @structure.setter
+    def structure(self, structure):
+        self._structure = structure
+
+    def _get_structure_filename(self):
+        return self.pdb_id + ''.join(self.chain_ids) + '.pdb'
 
     def extract(self):
         """Extract the wanted chains out of the PDB file.
 
         Remove water atoms and selects the domain regions (i.e. selects only those parts
         of the domain that are within the domain boundaries specified).
+
+        If `cache_dir` is set, the results (including the files written by
+        :meth:`save_structure`) are cached using a hash of the PDB file, `chain_ids`,
+        `domain_boundaries` and `r_cutoff` as the key.
         """
+        if self.cache_dir is None:
+            self._extract()
+            return
+
+        cache = helper.FileCache(self.cache_dir, max_size=self.cache_size)
+        entry_dir = cache.get(self._cache_key)
+        if entry_dir is not None:
+            structure_dir = tempfile.mkdtemp(prefix='structure_')
+            try:
+                self._load_extract_results(entry_dir, structure_dir)
+            except FileNotFoundError:
+                # The entry was evicted by another process
+                shutil.rmtree(structure_dir, ignore_errors=True)
+            else:
+                logger.debug('Using cached extraction results: {}'.format(self._cache_key))
+                return
+
+        self._extract()
+        temp_dir = tempfile.mkdtemp(prefix='.', dir=self.cache_dir)
+        try:
+            self.save_structure(temp_dir)
+            extract_results = dict(
+                chain_ids=self.chain_ids,
+                hetatm_chain_id=self.hetatm_chain_id,
+                interactions_between_chains=[
+                    [key, sorted(values)]
+                    for key, values in self.interactions_between_chains.items()
+                ],
+                chain_sequences={
+                    chain_id: self.get_chain_sequence_and_numbering(chain_id)
+                    for chain_id in self.chain_ids
+                },
+                structure_files=sorted(os.listdir(temp_dir)),
+            )
+            with open(op.join(temp_dir, 'extract_results.json'), 'w') as ofh:
+                json.dump(extract_results, ofh)
+            cache.put(self._cache_key, [
+                op.join(temp_dir, filename) for filename in os.listdir(temp_dir)
+            ])
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _load_extract_results(self, entry_dir, structure_dir):
+        """Load the results of :meth:`extract` from the cache entry `entry_dir`.
+
+        The cached structure files are copied to `structure_dir`, so that they can still
+        be read after the entry is evicted by another process. `structure_dir` is removed
+        when the parser is garbage collected.
+        """
+        with open(op.join(entry_dir, 'extract_results.json')) as ifh:
+            extract_results = json.load(ifh)
+        for filename in extract_results['structure_files']:
+            shutil.copyfile(op.join(entry_dir, filename), op.join(structure_dir, filename))
+        self.chain_ids = extract_results['chain_ids']
+        self.hetatm_chain_id = extract_results['hetatm_chain_id']
+        self.interactions_between_chains = {
+            tuple(key): {tuple(value) for value in values}
+            for key, values in extract_results['interactions_between_chains']
+        }
+        self._set_interacting_chains()
+        self._chain_sequences = {
+            chain_id: (chain_sequence, chain_numbering)
+            for chain_id, (chain_sequence, chain_numbering)
+            in extract_results['chain_sequences'].items()
+        }
+        self._structure_files = extract_results['structure_files']
+        self._structure = None
+        self._cached_structure_dir = structure_dir
+        weakref.finalize(self, shutil.rmtree, structure_dir, True)
+
+    def _extract(self):
         logger.debug('Extracting {}...'.format(self.unique_id))
 
         model = self.input_structure[0]  # assuming that model 0 is always the desired one
@@ -768,7 +1275,11 @@ class StructureParser:
         self.interactions_between_chains = (
             get_interacting_residues(self.structure[0], self.r_cutoff, True)
         )
+        self._set_interacting_chains()
+        self._chain_sequences = None
+        self._cached_structure_dir = None
 
+    def _set_interacting_chains(self):
         self.interacting_chain_ids = {
             (key[1], value[1])
             for (key, values) in self.interactions_between_chains.items()
@@ -791,6 +1302,13 @@ class StructureParser:
         return get_chain_seqres_sequence(chain, *args, **varargs)
 
     def save_structure(self, output_dir='', remove_disordered=False):
+        if self._structure is None and self._cached_structure_dir is not None:
+            # Copy the structure files that were restored from the cache
+            for filename in self._structure_files:
+                shutil.copyfile(
+                    op.join(self._cached_structure_dir, filename), op.join(output_dir, filename))
+            return
+
         if remove_disordered:
             self._unset_disordered_flags()
 
@@ -836,9 +1354,12 @@ class StructureParser:
         self.chain_numbering_extended_dict = {}
         self.chain_sequence_dict = {}
         for chain_id in self.chain_ids:
-            chain_sequence, chain_numbering_extended = (
-                self.get_chain_sequence_and_numbering(chain_id)
-            )
+            if self._chain_sequences is not None:
+                chain_sequence, chain_numbering_extended = self._chain_sequences[chain_id]
+            else:
+                chain_sequence, chain_numbering_extended = (
+                    self.get_chain_sequence_and_numbering(chain_id)
+                )
             self.chain_numbering_extended_dict[chain_id] = chain_numbering_extended
             self.chain_sequence_dict[chain_id] = chain_sequence
             with open(op.join(output_dir, self.pdb_id + chain_id + '.fasta'), 'w') as f:
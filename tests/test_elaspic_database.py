@@ -0,0 +1,89 @@
+import os.path as op
+import logging
+import functools
+import pytest
+from elaspic import conf
+
+logger = logging.getLogger(__name__)
+
+# The database tables are defined using the collations of `db_type`
+conf.CONFIGS.setdefault('db_type', 'sqlite')
+
+from elaspic import elaspic_database, elaspic_database_tables as tables  # noqa
+
+
+@pytest.fixture
+def db(tmpdir, monkeypatch):
+    if conf.CONFIGS['db_type'] != 'sqlite':
+        pytest.skip("Database tables were defined for '{}'".format(conf.CONFIGS['db_type']))
+    for key, value in [
+            ('connection_string', 'sqlite:///' + op.join(str(tmpdir), 'elaspic.db')),
+            ('db_is_immutable', False),
+            ('archive_dir', str(tmpdir)),
+            ('archive_type', 'directory')]:
+        monkeypatch.setitem(conf.CONFIGS, key, value)
+    db = elaspic_database.MyDatabase()
+    tables.Base.metadata.create_all(db.engine)
+    with db.session_scope() as session:
+        session.add(tables.Domain(
+            cath_id='1abcA01', pdb_id='1abc', pdb_chain='A', pdb_domain_def='1:100',
+            pdb_pdbfam_name='Pkinase'))
+        for uniprot_id in ['P00001', 'P00002', 'P00003']:
+            session.add(tables.UniprotSequence(
+                db='sp', uniprot_id=uniprot_id, uniprot_name=uniprot_id,
+                uniprot_sequence='MQ'))
+        session.flush()
+        # The second domain of P00001 does not have a template
+        for uniprot_domain_id, uniprot_id in [
+                (1, 'P00001'), (2, 'P00002'), (3, 'P00003'), (4, 'P00001')]:
+            session.add(tables.UniprotDomain(
+                uniprot_domain_id=uniprot_domain_id, uniprot_id=uniprot_id,
+                pdbfam_name='Pkinase', pdbfam_idx=1))
+        session.flush()
+        for uniprot_domain_id in [1, 2, 3]:
+            session.add(tables.UniprotDomainTemplate(
+                uniprot_domain_id=uniprot_domain_id, cath_id='1abcA01'))
+        # Heterodimer within the batch, homodimer, heterodimer with a protein outside
+        # the batch, and a pair without a template
+        for uniprot_domain_pair_id, (domain_1, uniprot_id_1), (domain_2, uniprot_id_2) in [
+                (1, (1, 'P00001'), (2, 'P00002')),
+                (2, (1, 'P00001'), (1, 'P00001')),
+                (3, (2, 'P00002'), (3, 'P00003')),
+                (4, (4, 'P00001'), (2, 'P00002'))]:
+            session.add(tables.UniprotDomainPair(
+                uniprot_domain_pair_id=uniprot_domain_pair_id,
+                uniprot_domain_id_1=domain_1, uniprot_domain_id_2=domain_2,
+                uniprot_id_1=uniprot_id_1, uniprot_id_2=uniprot_id_2))
+        session.flush()
+        for uniprot_domain_pair_id in [1, 2, 3]:
+            session.add(tables.UniprotDomainPairTemplate(
+                uniprot_domain_pair_id=uniprot_domain_pair_id,
+                cath_id_1='1abcA01', cath_id_2='1abcA01'))
+    return db
+
+
+@pytest.mark.parametrize('chunk_size', [1, 500])
+def test_get_uniprot_domains_and_pairs(db, monkeypatch, chunk_size):
+    monkeypatch.setattr(
+        elaspic_database, '_get_chunks',
+        functools.partial(elaspic_database._get_chunks, chunk_size=chunk_size))
+    uniprot_ids = ['P00001', 'P00002', 'P00001']
+
+    uniprot_domains = db.get_uniprot_domains(uniprot_ids)
+    assert {
+        uniprot_id: [d.uniprot_domain_id for d in domains]
+        for uniprot_id, domains in uniprot_domains.items()
+    } == {'P00001': [1], 'P00002': [2]}
+
+    uniprot_domain_pairs = db.get_uniprot_domain_pairs(uniprot_ids)
+    assert {
+        uniprot_id: sorted(d.uniprot_domain_pair_id for d in domain_pairs)
+        for uniprot_id, domain_pairs in uniprot_domain_pairs.items()
+    } == {'P00001': [1, 2], 'P00002': [1, 3]}
+
+    # Restricting the analysis to some domain pairs
+    uniprot_domain_pairs = db.get_uniprot_domain_pairs(uniprot_ids, False, [2])
+    assert {
+        uniprot_id: [d.uniprot_domain_pair_id for d in domain_pairs]
+        for uniprot_id, domain_pairs in uniprot_domain_pairs.items()
+    } == {'P00001': [2], 'P00002': []}
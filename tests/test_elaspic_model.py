@@ -1,5 +1,9 @@
-import elaspic.elaspic_model
+import os.path as op
+import json
+import types
 import pytest
+import elaspic.conf
+import elaspic.elaspic_model
 
 
 @pytest.mark.parametrize("alignment, scores", [
@@ -7,3 +11,84 @@ import pytest
 ])
 def test_analyze_alignment(alignment, scores):
     assert elaspic.elaspic_model.analyze_alignment(alignment) == scores
+
+
+@pytest.fixture
+def model_analysis_calls(monkeypatch):
+    calls = []
+
+    def _analyse_core(self):
+        calls.append('core')
+        self.relative_sasa_scores = {'A': [0.1, 0.5], 'B': [0.2]}
+
+    def _analyse_interface(self):
+        calls.append('interface')
+        self.interacting_aa_1 = [1, 2]
+        self.interacting_aa_2 = [1]
+        self.interface_area_hydrophobic = 10.0
+        self.interface_area_hydrophilic = 20.0
+        self.interface_area_total = 30.0
+
+    monkeypatch.setattr(elaspic.elaspic_model.Model, '_analyse_core', _analyse_core)
+    monkeypatch.setattr(elaspic.elaspic_model.Model, '_analyse_interface', _analyse_interface)
+    return calls
+
+
+def _get_model(modeller_results_file):
+    """Create a two-chain model from `modeller_results_file`, without building it."""
+    model = elaspic.elaspic_model.Model.__new__(elaspic.elaspic_model.Model)
+    model.sequence_seqrecords = [None, None]
+    model.modeller_results_file = modeller_results_file
+    with open(modeller_results_file) as ifh:
+        model.modeller_results = json.load(ifh)
+    model._modeller_structure = [[
+        types.SimpleNamespace(id='A'), types.SimpleNamespace(id='B')
+    ]]
+    return model
+
+
+def test_load_model_analysis(tmpdir, monkeypatch, model_analysis_calls):
+    monkeypatch.setitem(elaspic.conf.CONFIGS, 'unique_temp_dir', str(tmpdir))
+    monkeypatch.setitem(elaspic.conf.CONFIGS, 'sasa_method', 'shrake_rupley')
+    model_file = op.join(str(tmpdir), 'model.pdb')
+    with open(model_file, 'w') as ofh:
+        ofh.write('ATOM\n')
+    modeller_results_file = op.join(str(tmpdir), 'modeller_results.json')
+    with open(modeller_results_file, 'w') as ofh:
+        json.dump({'model_file': 'model.pdb'}, ofh)
+
+    # The model is analysed and the results are saved to the modeller results file
+    model = _get_model(modeller_results_file)
+    model._load_model_analysis()
+    assert model_analysis_calls == ['core', 'interface']
+    with open(modeller_results_file) as ifh:
+        model_analysis = json.load(ifh)['model_analysis']
+    assert model_analysis['model_hash'] == model._get_model_hash()
+    assert model_analysis['interface_area_total'] == 30.0
+
+    # The analysis is restored when the hash matches
+    model = _get_model(modeller_results_file)
+    model._load_model_analysis()
+    assert model_analysis_calls == ['core', 'interface']
+    assert model.modeller_chain_ids == ['A', 'B']
+    assert model.relative_sasa_scores == {'A': [0.1, 0.5], 'B': [0.2]}
+    assert (model.interacting_aa_1, model.interacting_aa_2) == ([1, 2], [1])
+    assert (
+        model.interface_area_hydrophobic,
+        model.interface_area_hydrophilic,
+        model.interface_area_total,
+    ) == (10.0, 20.0, 30.0)
+
+    # A different model file or SASA method invalidates the analysis
+    with open(model_file, 'w') as ofh:
+        ofh.write('ATOM\nATOM\n')
+    model = _get_model(modeller_results_file)
+    model._load_model_analysis()
+    assert model_analysis_calls == ['core', 'interface'] * 2
+
+    monkeypatch.setitem(elaspic.conf.CONFIGS, 'sasa_method', 'msms')
+    model = _get_model(modeller_results_file)
+    model._load_model_analysis()
+    assert model_analysis_calls == ['core', 'interface'] * 3
+    with open(modeller_results_file) as ifh:
+        assert json.load(ifh)['model_analysis']['model_hash'] == model._get_model_hash()
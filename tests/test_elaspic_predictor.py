@@ -1,7 +1,11 @@
+import os
 import os.path as op
 import pickle
+import tempfile
+import pytest
 import pandas as pd
 import elaspic
+import elaspic.errors
 import elaspic.elaspic_predictor
 
 
@@ -122,3 +126,49 @@ def test_core_predictor():
         df = elaspic.elaspic_predictor.convert_features_to_differences(df)
         df['ddg'] = clf.predict(df[clf.features])
         assert df['ddg'].notnull().all()
+
+
+def _get_dummy_classifier(features):
+    import sklearn.dummy
+    clf = sklearn.dummy.DummyRegressor(strategy='constant', constant=1.5)
+    clf.fit([[0] * len(features)], [1.5])
+    clf.features = features
+    return clf
+
+
+def test_predict_batch():
+    data_dir = tempfile.mkdtemp()
+    features = ['dg_change', 'provean_score']
+    with open(op.join(data_dir, 'core_clf.pickle'), 'wb') as fh:
+        pickle.dump(_get_dummy_classifier(features), fh)
+    df = pd.read_csv(op.join(op.splitext(__file__)[0], 'df2.tsv'), sep='\t')
+    df = elaspic.elaspic_predictor.format_mutation_features(df)
+    df = elaspic.elaspic_predictor.convert_features_to_differences(df)
+    ddg = elaspic.elaspic_predictor.predict_batch(df, 'core', data_dir)
+    assert len(ddg) == len(df)
+    assert (ddg == 1.5).all()
+    # The classifier is loaded only once
+    os.remove(op.join(data_dir, 'core_clf.pickle'))
+    ddg = elaspic.elaspic_predictor.predict_batch(df, 'core', data_dir)
+    assert len(ddg) == len(df)
+
+
+def test_validate_classifier():
+    clf = _get_dummy_classifier(['dg_change', 'intraclashes_energy_1_wt'])
+    elaspic.elaspic_predictor._validate_classifier(clf, 'interface')
+    with pytest.raises(elaspic.errors.PredictorError):
+        elaspic.elaspic_predictor._validate_classifier(clf, 'core')
+
+
+def test_score_features():
+    data_dir = tempfile.mkdtemp()
+    features = ['dg_change', 'secondary_structure_change', 'pcv_vdw_wt']
+    with open(op.join(data_dir, 'core_clf.pickle'), 'wb') as fh:
+        pickle.dump(_get_dummy_classifier(features), fh)
+    df = pd.read_csv(op.join(op.splitext(__file__)[0], 'df2.tsv'), sep='\t')
+    df.index = df.index + 100
+    df.loc[df.index[0], 'stability_energy_mut'] = None
+    ddg = elaspic.elaspic_predictor.score_features(df, 'core', data_dir)
+    assert (ddg.index == df.index).all()
+    assert ddg.isnull().sum() == 1
+    assert (ddg.dropna() == 1.5).all()
@@ -0,0 +1,151 @@
+import os.path as op
+import time
+import signal
+import logging
+import subprocess
+import pytest
+import elaspic.conf
+import elaspic.errors
+import elaspic.elaspic_sequence
+
+logger = logging.getLogger(__name__)
+
+
+PROVEAN_OUTPUT = """\
+[23:28:34] clustering subject sequences...
+[23:28:34] selecting clusters...
+[23:28:34] 0 subject sequences in 0 clusters were selected for supporting sequences.
+[23:28:34] use the query itself as a supporting sequence
+[23:28:34] loading subject sequences from a FASTA file...
+[23:28:34] scores were computed based on the query sequence itself.
+## Number of clusters:	1
+## Number of supporting sequences used:	1
+[23:28:34] computing delta alignment scores...
+[23:28:34] printing PROVEAN scores...
+## PROVEAN scores ##
+# VARIATION	SCORE
+M1A	-6.000
+Q2W	-2.500
+"""
+
+
+def test_parse_provean_scores():
+    provean_scores = elaspic.elaspic_sequence._parse_provean_scores(PROVEAN_OUTPUT)
+    assert list(provean_scores.items()) == [('M1A', -6.0), ('Q2W', -2.5)]
+    assert not elaspic.elaspic_sequence._parse_provean_scores(PROVEAN_OUTPUT[:-24])
+
+
+@pytest.fixture
+def sequence(tmpdir, monkeypatch):
+    monkeypatch.setitem(elaspic.conf.CONFIGS, 'sequence_dir', str(tmpdir))
+    monkeypatch.setitem(elaspic.conf.CONFIGS, 'matrix_type', 'blosum80')
+    monkeypatch.setitem(elaspic.conf.CONFIGS, 'gap_start', -16)
+    monkeypatch.setitem(elaspic.conf.CONFIGS, 'gap_extend', -4)
+    sequence_file = op.join(str(tmpdir), 'test.fasta')
+    with open(sequence_file, 'w') as ofh:
+        ofh.write('>test\nMQKL\n')
+    for suffix in ['', '.fasta']:
+        with open(op.join(str(tmpdir), 'test_provean_supset' + suffix), 'w') as ofh:
+            ofh.write('# supporting set\n')
+    return elaspic.elaspic_sequence.Sequence(sequence_file)
+
+
+def test_mutate_many(sequence, monkeypatch):
+    provean_runs = []
+
+    def _run_provean(mutations, *args, **kwargs):
+        provean_runs.append(list(mutations))
+        return {mutation: -float(len(provean_runs)) for mutation in mutations}
+
+    monkeypatch.setattr(sequence, '_run_provean', _run_provean)
+    results = sequence.mutate_many(['M1A', 'Q2W', 'M1A'])
+    assert provean_runs == [['M1A', 'Q2W']]
+    assert [result['mutation'] for result in results] == ['M1A', 'Q2W', 'M1A']
+    assert results[0]['provean_score'] == -1.0
+    assert results[0]['matrix_score'] == sequence.score_pairwise('M', 'A')
+    # Mutations that have already been scored are not sent to PROVEAN again
+    assert sequence.mutate('Q2W') == results[1]
+    sequence.mutate_many(['Q2W', 'L4P'])
+    assert provean_runs == [['M1A', 'Q2W'], ['L4P']]
+    with pytest.raises(elaspic.errors.MutationMismatchError):
+        sequence.mutate_many(['K4P'])
+
+
+def test_provean_supset_cache(tmpdir, monkeypatch):
+    monkeypatch.setitem(
+        elaspic.conf.CONFIGS, 'provean_supset_cache_dir', str(tmpdir.join('cache')))
+    monkeypatch.setitem(elaspic.conf.CONFIGS, 'provean_supset_cache_size', 10)
+    monkeypatch.setitem(elaspic.conf.CONFIGS, 'blast_db_dir', None)
+    supset_builds = []
+
+    def _build_provean_supset(self, mutations=None):
+        supset_builds.append(self.protein_id)
+        for suffix in ['', '.fasta']:
+            with open(self.provean_supset_file + suffix, 'w') as ofh:
+                ofh.write('# supporting set of {}\n'.format(self.protein_id))
+
+    monkeypatch.setattr(
+        elaspic.elaspic_sequence.Sequence, '_build_provean_supset', _build_provean_supset)
+    sequences = []
+    # The same sequence under a different id, and in a different folder
+    for i, sequence_id in enumerate(['test_1', 'test_2', 'test_1']):
+        sequence_dir = tmpdir.mkdir('sequence_{}'.format(i))
+        monkeypatch.setitem(elaspic.conf.CONFIGS, 'sequence_dir', str(sequence_dir))
+        sequence_file = str(sequence_dir.join('test.fasta'))
+        with open(sequence_file, 'w') as ofh:
+            ofh.write('>{}\nMQKL\n'.format(sequence_id))
+        sequence = elaspic.elaspic_sequence.Sequence(sequence_file)
+        assert sequence.provean_supset_exists
+        assert sequence.provean_supset_length == 0
+        sequences.append(sequence)
+    assert supset_builds == ['test_1']
+    assert len({sequence.provean_supset_key for sequence in sequences}) == 1
+
+
+@pytest.mark.parametrize('min_memory, returncode', [(0, 0), (float('inf'), -signal.SIGTERM)])
+def test_resource_monitor(tmpdir, min_memory, returncode):
+    start_time = time.time()
+    p = subprocess.Popen(['sleep', '0.5'], start_new_session=True)
+    monitor = elaspic.elaspic_sequence.ResourceMonitor(
+        p.pid, str(tmpdir), 0, 0, min_disk_space=0, min_memory=min_memory)
+    monitor.start()
+    p.wait()
+    monitor.stop()
+    assert p.returncode == returncode
+    assert time.time() - start_time < 5
+    if returncode:
+        assert isinstance(monitor.error, elaspic.errors.ProveanResourceError)
+        assert monitor.error.child_process_group_id == p.pid
+    else:
+        assert monitor.error is None
+
+
+def test_resource_monitor_kill(tmpdir):
+    # Processes that ignore SIGTERM are killed
+    p = subprocess.Popen(['sh', '-c', 'trap "" TERM; sleep 30'], start_new_session=True)
+    monitor = elaspic.elaspic_sequence.ResourceMonitor(
+        p.pid, str(tmpdir), 0, 0, min_disk_space=0, min_memory=float('inf'), kill_timeout=0.5)
+    monitor.start()
+    p.wait(timeout=5)
+    monitor.stop()
+    assert p.returncode == -signal.SIGKILL
+
+
+def test_get_saturation_mutations():
+    mutations = elaspic.elaspic_sequence.get_saturation_mutations('MXQ')
+    assert len(mutations) == 2 * 19
+    assert mutations[:2] == ['M1A', 'M1R']
+    assert not any(mutation[0] == mutation[-1] for mutation in mutations)
+    assert elaspic.elaspic_sequence.get_saturation_mutations('MXQ', [2]) == []
+    with pytest.raises(ValueError):
+        elaspic.elaspic_sequence.get_saturation_mutations('MXQ', [4])
+
+
+def test_get_mutation_matrix():
+    df = elaspic.elaspic_sequence.get_mutation_matrix('MQ', {'M1A': -6.0, 'Q2W': -2.5})
+    assert list(df.columns[:3]) == ['position', 'wt', 'A']
+    assert list(df['position']) == [1, 2]
+    assert list(df['wt']) == ['M', 'Q']
+    assert df.loc[0, 'A'] == -6.0 and df.loc[0, 'M'] == 0.0
+    assert df.loc[1, 'W'] == -2.5 and df.loc[1, 'Q'] == 0.0
+    assert df.iloc[:, 2:].isnull().sum().sum() == 2 * 19 - 2
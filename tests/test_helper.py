@@ -0,0 +1,98 @@
+import os
+import os.path as op
+import logging
+import elaspic.helper
+
+logger = logging.getLogger(__name__)
+
+
+def _write_file(filename, data):
+    with open(filename, 'w') as ofh:
+        ofh.write(data)
+    return filename
+
+
+def test_get_hash(tmpdir):
+    working_dir = str(tmpdir)
+    file_1 = _write_file(op.join(working_dir, 'file_1.txt'), 'ABC')
+    file_2 = _write_file(op.join(working_dir, 'file_2.txt'), 'ABC')
+    assert elaspic.helper.get_hash(file_1) == elaspic.helper.get_hash(file_2)
+    assert (
+        elaspic.helper.get_hash(file_1, water='-IGNORE') !=
+        elaspic.helper.get_hash(file_1, water='-CRYSTAL')
+    )
+
+
+def test_atomic_open(tmpdir):
+    working_dir = str(tmpdir)
+    output_file = _write_file(op.join(working_dir, 'output.txt'), 'old')
+    try:
+        with elaspic.helper.atomic_open(output_file) as ofh:
+            ofh.write('new')
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    with open(output_file) as ifh:
+        assert ifh.read() == 'old'
+    with elaspic.helper.atomic_open(output_file) as ofh:
+        ofh.write('new')
+    with open(output_file) as ifh:
+        assert ifh.read() == 'new'
+    assert os.listdir(working_dir) == ['output.txt']
+
+
+def test_file_cache(tmpdir):
+    working_dir = str(tmpdir)
+    cache = elaspic.helper.FileCache(op.join(working_dir, 'cache'), max_size=10)
+    input_file = _write_file(op.join(working_dir, 'input.txt'), '12345')
+    output_file = op.join(working_dir, 'output.txt')
+
+    assert not cache.copy('key_1', 'data.txt', output_file)
+    cache.put('key_1', {'data.txt': input_file})
+    assert cache.copy('key_1', 'data.txt', output_file)
+    with open(output_file) as ifh:
+        assert ifh.read() == '12345'
+
+    # Adding the same entry twice is fine
+    cache.put('key_1', {'data.txt': input_file})
+
+    # Entries that were used least recently are evicted first
+    cache.put('key_2', {'data.txt': input_file})
+    os.utime(op.join(cache.cache_dir, 'key_1'), (0, 0))
+    cache.put('key_3', {'data.txt': input_file})
+    assert cache.get('key_1') is None
+    assert cache.get('key_2') is not None
+    assert cache.get('key_3') is not None
+    assert not [f for f in os.listdir(cache.cache_dir) if f.startswith('.')]
+
+
+def test_tool_registry(tmpdir, monkeypatch):
+    working_dir = str(tmpdir)
+    bin_dir = op.join(working_dir, 'bin')
+    os.makedirs(bin_dir)
+    counter_file = op.join(working_dir, 'counter.txt')
+    psiblast = _write_file(
+        op.join(bin_dir, 'psiblast'),
+        '#!/bin/sh\necho x >> {}\necho "psiblast: 2.2.31+"\n'.format(counter_file))
+    os.chmod(psiblast, 0o755)
+    monkeypatch.setenv('PATH', bin_dir)
+
+    for i in range(2):
+        # The second registry reads the version from the cache file
+        tools = elaspic.helper.ToolRegistry(cache_dir=op.join(working_dir, 'cache'))
+        os.makedirs(tools.cache_dir, exist_ok=True)
+        assert tools.get('psiblast') == ('psiblast', psiblast, 'psiblast: 2.2.31+')
+        assert tools.get('psiblast') == ('psiblast', psiblast, 'psiblast: 2.2.31+')
+        assert tools.get('cd-hit') == ('cd-hit', None, None)
+    with open(counter_file) as ifh:
+        assert len(ifh.readlines()) == 1
+
+    # A different PATH uses a different cache file
+    cache_file = tools.cache_file
+    monkeypatch.setenv('PATH', bin_dir + ':' + working_dir)
+    assert tools.cache_file != cache_file
+
+
+def test_get_hostname():
+    hostname = elaspic.helper.get_hostname()
+    assert hostname and '.' not in hostname
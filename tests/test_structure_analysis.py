@@ -2,11 +2,61 @@ import os
 import os.path as op
 import tempfile
 import logging
+import threading
+import pytest
+import numpy as np
 import elaspic.structure_analysis
+import elaspic.elaspic_predictor
 
 logger = logging.getLogger(__name__)
 
 
+@pytest.mark.parametrize('in_threads', [True, False])
+def test_run_concurrently(in_threads):
+    functions = [threading.current_thread, threading.current_thread, lambda: 1]
+    results = elaspic.structure_analysis._run_concurrently(functions, in_threads)
+    assert results[2] == 1
+    # In-process functions are called in the current thread
+    assert (results[0] is threading.main_thread()) is not in_threads
+
+
+def test_get_sasa_shrake_rupley():
+    # An isolated atom is fully exposed
+    sasa = elaspic.structure_analysis.get_sasa_shrake_rupley([[0, 0, 0]], [1.0])
+    assert abs(sasa[0] - 4 * np.pi * 2.4**2) < 1e-6
+    # Two overlapping atoms bury a spherical cap of each other
+    sasa = elaspic.structure_analysis.get_sasa_shrake_rupley(
+        [[0, 0, 0], [3, 0, 0]], [1.0, 1.0], n_points=1000)
+    expected_sasa = 4 * np.pi * 2.4**2 - 2 * np.pi * 2.4 * (2.4 - 1.5)
+    assert np.allclose(sasa, expected_sasa, rtol=0.01)
+
+
+def test_assign_secondary_structure():
+    """Compare with the HELIX and SHEET records in the PDB file (calculated using DSSP)."""
+    pdb_file = op.join(op.dirname(__file__), 'test_structure_tools', '1S1Q.pdb')
+    reference = {}
+    with open(pdb_file) as ifh:
+        for line in ifh:
+            if line.startswith('HELIX') and int(line[38:40]) == 1:
+                chain_id, start, end, ss_code = line[19], line[21:25], line[33:37], 'H'
+            elif line.startswith('SHEET'):
+                chain_id, start, end, ss_code = line[21], line[22:26], line[33:37], 'E'
+            else:
+                continue
+            for resnum in range(int(start), int(end) + 1):
+                reference[(chain_id, str(resnum))] = ss_code
+    analyse_structure = elaspic.structure_analysis.AnalyzeStructure(
+        pdb_file=pdb_file, working_dir=tempfile.mkdtemp())
+    df = analyse_structure.get_secondary_structure()
+    assert set(df['ss_code']) <= set(elaspic.elaspic_predictor.secondary_structure_to_int)
+    ss_codes = df['ss_code'].where(df['ss_code'].isin(['H', 'E']), 'C')
+    ss_codes_reference = [
+        reference.get((chain_id, resnum), 'C')
+        for chain_id, resnum in zip(df['chain'], df['resnum'])
+    ]
+    assert (ss_codes == ss_codes_reference).mean() > 0.9
+
+
 class TestAnalyseStructure:
 
     @classmethod
@@ -30,3 +80,64 @@ class TestAnalyseStructure:
     def test_get_seasa(self):
         (seasa_by_chain, seasa_by_chain_separately,
          seasa_by_residue, seasa_by_residue_separately) = self.analyse_structure.get_seasa()
+        for df in [seasa_by_residue, seasa_by_residue_separately]:
+            assert set(df.columns) >= {'pdb_chain', 'res_name', 'res_num', 'abs_sasa', 'rel_sasa'}
+            assert len(df[df['pdb_chain'] != 'Z']) == 345
+        # Residues in the interface are more exposed when chains are separated
+        sasa_together = seasa_by_chain.set_index('pdb_chain')['abs_sasa']
+        sasa_separately = seasa_by_chain_separately.set_index('pdb_chain')['abs_sasa']
+        assert (sasa_separately[['I', 'B']] > sasa_together[['I', 'B']]).all()
+
+    def test_get_residue_sasa(self):
+        residue_sasa = self.analyse_structure.get_residue_sasa()
+        seasa_by_residue_separately = self.analyse_structure.get_seasa()[3]
+        assert len(residue_sasa) == len(seasa_by_residue_separately)
+        for _, row in seasa_by_residue_separately.iterrows():
+            assert residue_sasa[(row['pdb_chain'], row['res_num'])] == (
+                row['res_name'], row['rel_sasa'])
+
+    def test_get_interface_area(self):
+        hydrophobic, hydrophilic, total = (
+            self.analyse_structure.get_interface_area(['I', 'B'])
+        )
+        assert hydrophobic > 0 and hydrophilic > 0
+        assert abs(hydrophobic + hydrophilic - total) < 1e-6
+        # Buried area is the same when the order of chains is reversed
+        assert abs(self.analyse_structure.get_interface_area(['B', 'I'])[2] - total) < 1e-6
+
+    def test_get_interchain_distances(self):
+        from scipy.spatial.distance import cdist
+        model = self.analyse_structure.sp.structure[0]
+
+        def get_coords(chain_id, resnum=None):
+            return [
+                atom.coord for residue in model[chain_id]
+                if residue.id[0] == ' ' and (resnum is None or residue.id[1] == resnum)
+                for atom in residue
+            ]
+
+        shortest_interchain_distances = self.analyse_structure.get_interchain_distances()
+        min_r = cdist(get_coords('I'), get_coords('B')).min()
+        assert abs(shortest_interchain_distances['I']['B'] - min_r) < 1e-6
+        assert abs(shortest_interchain_distances['B']['I'] - min_r) < 1e-6
+
+        shortest_interchain_distances = (
+            self.analyse_structure.get_interchain_distances('B', 'T43A')
+        )
+        min_r = cdist(get_coords('I'), get_coords('B', 43)).min()
+        assert abs(shortest_interchain_distances['I']['B'] - min_r) < 1e-6
+
+    @pytest.mark.parametrize('chain_id, mutation, physchem, physchem_ownchain', [
+        ('I', 'H2A', [0, 0, 4, 4], [0, 0, 2, 6]),
+        ('I', 'D15A', [0, 0, 0, 0], [0, 0, 0, 11]),
+        ('I', 'W21A', [0, 0, 3, 17], [0, 0, 6, 20]),
+        ('B', 'R164A', [0, 0, 0, 0], [4, 6, 4, 35]),
+        ('B', 'Y235A', [0, 0, 4, 5], [0, 0, 5, 39]),
+        ('B', 'E255A', [0, 0, 0, 0], [4, 2, 0, 32]),
+        ('B', 'R313A', [0, 0, 2, 14], [0, 0, 0, 13]),
+    ])
+    def test_get_physi_chem(self, chain_id, mutation, physchem, physchem_ownchain):
+        assert (
+            self.analyse_structure.get_physi_chem(chain_id, mutation) ==
+            (physchem, physchem_ownchain)
+        )
@@ -0,0 +1,143 @@
+import os
+import os.path as op
+import gzip
+import shutil
+import logging
+import pytest
+import numpy as np
+import elaspic.structure_tools
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture(scope='module')
+def structure():
+    return elaspic.structure_tools.get_pdb_structure(
+        op.join(op.dirname(__file__), 'test_structure_tools', '1S1Q.pdb'))
+
+
+@pytest.mark.parametrize('r_cutoff', [5, 6.0])
+def test_get_interacting_residues(structure, r_cutoff):
+    """Compare with interactions found by calculating all atom-atom distances."""
+    model = structure[0]
+    residues = []
+    for chain_idx, chain in enumerate(model):
+        if elaspic.structure_tools.chain_is_hetatm(chain):
+            continue
+        aa_residues = [
+            residue for residue in chain if residue.resname in elaspic.structure_tools.AAA_DICT
+        ]
+        for residue_idx, residue in enumerate(aa_residues):
+            key = (
+                chain_idx, chain.id, residue_idx,
+                str(residue.id[1]) + residue.id[2].strip(),
+                elaspic.structure_tools.convert_aa(residue.resname),
+            )
+            residues.append((key, np.array([atom.coord for atom in residue])))
+
+    reference = dict()
+    for key_1, coords_1 in residues:
+        for key_2, coords_2 in residues:
+            if key_1[0] >= key_2[0]:
+                continue
+            distances = np.sqrt(((coords_1[:, None, :] - coords_2[None, :, :])**2).sum(axis=2))
+            if (distances <= r_cutoff).any():
+                reference.setdefault(key_1, set()).add(key_2)
+
+    interacting_residues = elaspic.structure_tools.get_interacting_residues(model, r_cutoff)
+    assert interacting_residues
+    assert interacting_residues == reference
+
+
+def test_structure_array(structure, tmpdir):
+    structure_array = elaspic.structure_tools.StructureArray.from_biopython(structure)
+    atoms = list(structure[0].get_atoms())
+    assert len(structure_array) == len(atoms)
+    assert structure_array.coords.dtype == np.float32
+    assert (structure_array.coords == np.array([atom.coord for atom in atoms])).all()
+    assert (
+        elaspic.structure_tools.get_structure_sequences(structure_array) ==
+        elaspic.structure_tools.get_structure_sequences(structure)
+    )
+
+    # Convert to biopython, save, and read back in
+    pdb_file = op.join(str(tmpdir), '1S1Q.pdb')
+    io = elaspic.structure_tools.PDBIO()
+    io.set_structure(structure_array.to_biopython())
+    io.save(pdb_file)
+    structure_array_2 = elaspic.structure_tools.StructureArray.from_biopython(
+        elaspic.structure_tools.get_pdb_structure(pdb_file))
+    for attr in elaspic.structure_tools.StructureArray.__slots__[1:]:
+        assert np.all(getattr(structure_array, attr) == getattr(structure_array_2, attr)), attr
+
+    # Select atoms
+    chain_atoms = structure_array.select(structure_array.get_chain_mask(['B']))
+    assert chain_atoms.n_residues == len(structure[0]['B'])
+    assert (
+        chain_atoms.get_chain_sequence_and_numbering('B') ==
+        elaspic.structure_tools.get_chain_sequence_and_numbering(structure[0]['B'])
+    )
+
+
+PDB_RECORDS = """\
+HEADER    TEST STRUCTURE
+MODEL        1
+ATOM      1  N   MET A   1      11.104   6.134  -6.504  1.00  0.00           N
+ATOM      2  CA AMET A   1      11.639   6.071  -5.147  0.40  0.00           C
+ATOM      3  CA BMET A   1      11.700   6.100  -5.100  0.60  0.00           C
+ATOM      4  N   LYS B   1      13.104   6.134  -6.504  1.00  0.00           N
+ATOM      5  N   GLN A   2      12.104   6.134  -6.504  1.00  0.00
+ATOM      6  N   GLN A   2A     12.504   6.134  -6.504  1.00  0.00           N
+HETATM    7 ZN    ZN A 101      10.000   6.000  -6.000  1.00  0.00          ZN
+HETATM    8  O   HOH A 201      10.000   8.000  -6.000  1.00  0.00           O
+ENDMDL
+MODEL        2
+ATOM      1  N   MET A   1      11.104   6.134  -6.504  1.00  0.00           N
+ENDMDL
+"""
+
+
+@pytest.mark.parametrize('suffix', ['.pdb', '.pdb.gz'])
+def test_read_structure_array(tmpdir, suffix):
+    pdb_file = op.join(str(tmpdir), 'test' + suffix)
+    open_fn = gzip.open if suffix.endswith('.gz') else open
+    with open_fn(pdb_file, 'wt') as ofh:
+        ofh.write(PDB_RECORDS)
+    structure_array = elaspic.structure_tools.read_structure_array(pdb_file)
+    structure_array_ref = elaspic.structure_tools.StructureArray.from_biopython(
+        elaspic.structure_tools.get_pdb_structure(pdb_file))
+    assert len(structure_array) == 7
+    assert structure_array.chain_ids == ['A', 'B']
+    for attr in elaspic.structure_tools.StructureArray.__slots__:
+        assert np.all(getattr(structure_array, attr) == getattr(structure_array_ref, attr)), attr
+    assert (
+        elaspic.structure_tools.get_structure_sequences(pdb_file) ==
+        {'A': 'MQQ', 'B': 'K'}
+    )
+
+
+def test_structure_parser_cache(tmpdir):
+    pdb_file = op.join(op.dirname(__file__), 'test_structure_tools', '1S1Q.pdb')
+    cache_dir = op.join(str(tmpdir), 'cache')
+    results = []
+    for i in range(2):
+        output_dir = op.join(str(tmpdir), 'output_{}'.format(i))
+        os.makedirs(output_dir)
+        sp = elaspic.structure_tools.StructureParser(pdb_file, cache_dir=cache_dir)
+        sp.extract()
+        if i == 1:
+            # Structure should only be parsed when it is needed
+            assert sp._structure is None
+            # and it should not be affected by the eviction of the cache entry
+            shutil.rmtree(cache_dir)
+        sp.save_structure(output_dir)
+        sp.save_sequences(output_dir)
+        files = {
+            filename: open(op.join(output_dir, filename)).read()
+            for filename in sorted(os.listdir(output_dir))
+        }
+        results.append((
+            sp.chain_ids, sp.interactions_between_chains, sp.chain_sequence_dict, files,
+            elaspic.structure_tools.get_structure_sequences(sp.structure),
+        ))
+    assert results[0] == results[1]